@@ -0,0 +1,154 @@
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+# Admission control in front of the app: requests over a concurrency limit get
+# 503 and requests over a token-bucket rate get 429, both with Retry-After, so
+# overload sheds quickly instead of queueing on the Mongo pool. Limits are keyed
+# "METHOD /path" with a per-method fallback ("GET", "POST", ...), which keeps
+# cheap reads in their own pool while writes are throttled. Location-scoped
+# paths (/api/locations/<id>/...) share the limits of the unscoped route.
+#
+# Several routes can share one concurrency pool (`pools` maps the route to the
+# pool's name), so slow reads such as search, PDFs and exports queue against
+# each other instead of taking the cheap reads' slots. Rates are per client:
+# each client address gets its own bucket per route, so one busy client is
+# throttled without using up everyone else's allowance. Behind a proxy, set
+# `client_header` (e.g. "x-forwarded-for"; its last entry is used, which is the
+# address the proxy itself saw). Buckets live in a bounded LRU.
+
+_LOCATION_SCOPE = re.compile(r"/locations/[^/]+(?=/)")
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = burst
+        self._updated = clock()
+
+    def take(self) -> float:
+        """Take a token; returns 0 on success, else seconds until one is available."""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class AdmissionControl:
+    """Limits and counters shared by every AdmissionMiddleware instance built from it."""
+
+    def __init__(
+        self,
+        concurrency: Optional[Dict[str, int]] = None,
+        rates: Optional[Dict[str, Tuple[float, float]]] = None,
+        retry_after: int = 1,
+        pools: Optional[Dict[str, str]] = None,
+        client_header: Optional[str] = None,
+        max_clients: int = 100000,
+    ):
+        self.limits = dict(concurrency or {})
+        self.pools = dict(pools or {})
+        unknown = set(self.pools.values()) - self.limits.keys()
+        if unknown:
+            raise ValueError(f"pools without a concurrency limit: {', '.join(sorted(unknown))}")
+        self.rates = dict(rates or {})
+        self.buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self.client_header = client_header.lower().encode() if client_header else None
+        self.max_clients = max_clients
+        self.retry_after = retry_after
+        self.in_flight: Dict[str, int] = {key: 0 for key in self.limits}
+        self.shed = 0
+        self.throttled = 0
+
+    @staticmethod
+    def _key(table, method: str, path: str) -> Optional[str]:
+        for key in (f"{method} {path}", method):
+            if key in table:
+                return key
+        return None
+
+    def client(self, scope) -> str:
+        if self.client_header is not None:
+            for name, value in scope.get("headers", ()):
+                if name == self.client_header:
+                    return value.decode("latin-1").rsplit(",", 1)[-1].strip()
+        client = scope.get("client")
+        return client[0] if client else ""
+
+    def throttle(self, method: str, path: str, client: str = "") -> float:
+        """Seconds the caller should wait before retrying, or 0 if under the rate limit."""
+        key = self._key(self.rates, method, path)
+        if key is None:
+            return 0.0
+        bucket = self.buckets.get((key, client))
+        if bucket is None:
+            bucket = self.buckets[key, client] = TokenBucket(*self.rates[key])
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end((key, client))
+        wait = bucket.take()
+        if wait:
+            self.throttled += 1
+        return wait
+
+    def acquire(self, method: str, path: str) -> Tuple[bool, Optional[str]]:
+        key = self.pools.get(f"{method} {path}") or self._key(self.limits, method, path)
+        if key is None:
+            return True, None
+        if self.in_flight[key] >= self.limits[key]:
+            self.shed += 1
+            return False, key
+        self.in_flight[key] += 1
+        return True, key
+
+    def release(self, key: Optional[str]) -> None:
+        if key is not None:
+            self.in_flight[key] -= 1
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "shed": self.shed,
+            "throttled": self.throttled,
+            "in_flight": sum(self.in_flight.values()),
+            "clients": len(self.buckets),
+        }
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, control: AdmissionControl):
+        self.app = app
+        self.control = control
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method, path = scope["method"], _LOCATION_SCOPE.sub("", scope["path"], count=1)
+
+        wait = self.control.throttle(method, path, self.control.client(scope))
+        if wait:
+            await self._reject(scope, receive, send, 429, "Rate limit exceeded", math.ceil(wait))
+            return
+
+        admitted, key = self.control.acquire(method, path)
+        if not admitted:
+            await self._reject(scope, receive, send, 503, "Server busy, retry shortly", self.control.retry_after)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.control.release(key)
+
+    async def _reject(self, scope, receive, send, status: int, detail: str, retry_after: int):
+        response = JSONResponse({"detail": detail}, status_code=status, headers={"Retry-After": str(retry_after)})
+        await response(scope, receive, send)
@@ -0,0 +1,193 @@
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from locations import DEFAULT_LOCATION
+
+# Seat capacity is tracked per fixed-length slot in the booking_slots
+# collection. Slot documents are keyed by their local start time
+# ("YYYY-MM-DDTHH:MM"), so an evening's availability is one range scan on _id,
+# and reserving seats is a conditional $inc on `remaining` - never read-then-write.
+# Slot documents are created lazily with the schedule's default capacity.
+#
+# Each location has its own seats. The default location's slot documents keep
+# the bare start time as ``_id`` (as before branches existed); other locations
+# prefix it with "<location_id>/". Location ids start with a letter, so every
+# location's evening is still a single _id range scan that no other location's
+# documents fall inside. Slot ids handed to callers are always the bare times.
+
+SLOT_ID_FORMAT = "%Y-%m-%dT%H:%M"
+
+
+class SlotUnavailable(Exception):
+    """Raised when a booking cannot be seated at the requested time."""
+
+
+class SeatsBooked(Exception):
+    """Raised when a slot's capacity would drop below the seats already booked in it."""
+
+
+def slot_id(start: datetime) -> str:
+    return start.strftime(SLOT_ID_FORMAT)
+
+
+def parse_slot_time(value: str) -> Optional[datetime]:
+    """Local wall-clock time for an ISO datetime, or None for dates and free text.
+
+    Values with a UTC offset are converted to the server's local time.
+    """
+    try:
+        date.fromisoformat(value)
+        return None
+    except ValueError:
+        pass
+    try:
+        when = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if when.tzinfo is not None:
+        when = when.astimezone().replace(tzinfo=None)
+    return when
+
+
+class SlotSchedule:
+    def __init__(
+        self,
+        open_time: time = time(12, 0),
+        close_time: time = time(23, 0),
+        slot_minutes: int = 30,
+        seats: int = 40,
+        dining_minutes: int = 90,
+    ):
+        if close_time <= open_time:
+            raise ValueError("close_time must be after open_time")
+        self.open_time = open_time
+        self.close_time = close_time
+        self.slot = timedelta(minutes=slot_minutes)
+        self.seats = seats
+        # A booking holds its seats for every slot its dining window overlaps
+        self.slots_per_booking = max(1, -(-dining_minutes // slot_minutes))
+
+    def slot_starts(self, day: date) -> List[datetime]:
+        start = datetime.combine(day, self.open_time)
+        end = datetime.combine(day, self.close_time)
+        starts = []
+        while start < end:
+            starts.append(start)
+            start += self.slot
+        return starts
+
+    def on_boundary(self, when: datetime) -> bool:
+        return not (when - datetime.combine(when.date(), self.open_time)) % self.slot
+
+    def covering(self, when: datetime) -> Optional[List[datetime]]:
+        """Slots a booking starting at ``when`` occupies, or None if it can't be seated then."""
+        day_start = datetime.combine(when.date(), self.open_time)
+        offset = when - day_start
+        if offset < timedelta(0) or offset % self.slot:
+            return None
+        slots = [when + i * self.slot for i in range(self.slots_per_booking)]
+        if slots[-1] + self.slot > datetime.combine(when.date(), self.close_time):
+            return None
+        return slots
+
+
+class AvailabilityEngine:
+    def __init__(self, db, schedule: Optional[SlotSchedule] = None):
+        self.db = db
+        self.schedule = schedule or SlotSchedule()
+
+    @staticmethod
+    def _doc_id(sid: str, location: str) -> str:
+        return sid if location == DEFAULT_LOCATION else f"{location}/{sid}"
+
+    async def availability(
+        self,
+        first: date,
+        last: date,
+        party_size: Optional[int] = None,
+        location: str = DEFAULT_LOCATION,
+    ) -> List[Dict[str, Any]]:
+        prefix = self._doc_id("", location)
+        query = {"_id": {"$gte": prefix + slot_id(datetime.combine(first, time.min)),
+                         "$lt": prefix + slot_id(datetime.combine(last + timedelta(days=1), time.min))}}
+        stored = {doc["_id"][len(prefix):]: doc async for doc in self.db.booking_slots.find(query)}
+
+        slots = []
+        day = first
+        while day <= last:
+            for start in self.schedule.slot_starts(day):
+                doc = stored.get(slot_id(start))
+                capacity = doc["capacity"] if doc else self.schedule.seats
+                remaining = doc["remaining"] if doc else capacity
+                slots.append({"start": slot_id(start), "capacity": capacity, "remaining": remaining})
+            day += timedelta(days=1)
+
+        if party_size is not None:
+            remaining_by_id = {s["start"]: s["remaining"] for s in slots}
+            for s in slots:
+                covered = self.schedule.covering(datetime.strptime(s["start"], SLOT_ID_FORMAT))
+                s["bookable"] = bool(covered) and all(
+                    remaining_by_id.get(slot_id(c), 0) >= party_size for c in covered
+                )
+        return slots
+
+    async def _ensure(self, doc_ids: List[str]) -> None:
+        ops = [
+            UpdateOne({"_id": i}, {"$setOnInsert": {"capacity": self.schedule.seats, "remaining": self.schedule.seats}}, upsert=True)
+            for i in doc_ids
+        ]
+        try:
+            await self.db.booking_slots.bulk_write(ops, ordered=False)
+        except BulkWriteError as exc:
+            # Concurrent upserts of the same new slot race on _id; the loser's
+            # document already exists, which is all we need.
+            if any(e.get("code") != 11000 for e in exc.details.get("writeErrors", [])):
+                raise
+
+    async def reserve(self, when: datetime, party_size: int, location: str = DEFAULT_LOCATION) -> List[str]:
+        covered = self.schedule.covering(when)
+        if not covered:
+            raise ValueError("Requested time is outside bookable hours or not on a slot boundary")
+        ids = [slot_id(s) for s in covered]
+        await self._ensure([self._doc_id(i, location) for i in ids])
+
+        taken: List[str] = []
+        for i in ids:
+            res = await self.db.booking_slots.update_one(
+                {"_id": self._doc_id(i, location), "remaining": {"$gte": party_size}},
+                {"$inc": {"remaining": -party_size}},
+            )
+            if res.modified_count != 1:
+                await self.release(taken, party_size, location)
+                raise SlotUnavailable(f"Not enough seats at {i}")
+            taken.append(i)
+        return taken
+
+    async def release(self, ids: List[str], party_size: int, location: str = DEFAULT_LOCATION) -> None:
+        if ids:
+            doc_ids = [self._doc_id(i, location) for i in ids]
+            await self.db.booking_slots.update_many({"_id": {"$in": doc_ids}}, {"$inc": {"remaining": party_size}})
+
+    async def set_capacity(self, sid: str, capacity: int, location: str = DEFAULT_LOCATION) -> Dict[str, Any]:
+        """Change a slot's seat count, shifting `remaining` by the same delta.
+
+        Raises SeatsBooked rather than lower it below the seats already booked.
+        """
+        doc_id = self._doc_id(sid, location)
+        await self._ensure([doc_id])
+        while True:
+            doc = await self.db.booking_slots.find_one({"_id": doc_id})
+            delta = capacity - doc["capacity"]
+            if doc["remaining"] + delta < 0:
+                raise SeatsBooked(f"{doc['capacity'] - doc['remaining']} seats are already booked at {sid}")
+            # Both conditions guard against a concurrent reserve or capacity change
+            res = await self.db.booking_slots.update_one(
+                {"_id": doc_id, "capacity": doc["capacity"], "remaining": {"$gte": -delta}},
+                {"$set": {"capacity": capacity}, "$inc": {"remaining": delta}},
+            )
+            if res.modified_count == 1 or delta == 0:
+                doc = await self.db.booking_slots.find_one({"_id": doc_id})
+                return {"start": sid, "capacity": doc["capacity"], "remaining": doc["remaining"]}
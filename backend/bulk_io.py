@@ -0,0 +1,167 @@
+import asyncio
+import codecs
+import csv
+import io
+import json
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, Field, ValidationError, create_model
+from pymongo import UpdateOne
+
+# Streaming bulk import/export. Uploads are parsed as they arrive, validated in
+# fixed-size chunks and written as unordered bulk upserts keyed on ``id``; the
+# write for one chunk overlaps with parsing the next, so memory stays at about
+# two chunks however large the file is. Exports stream straight off a cursor.
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+class RowError(Exception):
+    pass
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """(line number, parsed object or RowError) for every non-blank line."""
+    number = 0
+    async for line in _lines(chunks):
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as exc:
+            yield number, RowError(f"Invalid JSON: {exc}")
+
+
+async def csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """(line number, dict or RowError) per record; the first record is the header."""
+    header: Optional[List[str]] = None
+    record, start, number = "", 0, 0
+    async for line in _lines(chunks):
+        number += 1
+        record = f"{record}\n{line}" if record else line
+        start = start or number
+        # A quoted field may contain newlines: wait until the quotes balance
+        if record.count('"') % 2:
+            continue
+        text, first = record, start
+        record, start = "", 0
+        if not text.strip():
+            continue
+        values = next(csv.reader(io.StringIO(text)))
+        if header is None:
+            header = [h.strip() for h in values]
+        elif len(values) != len(header):
+            yield first, RowError(f"Expected {len(header)} columns, got {len(values)}")
+        else:
+            yield first, dict(zip(header, values))
+    if record:
+        yield start, RowError("Unterminated quoted field")
+
+
+async def _chunks(rows: AsyncIterator, size: int) -> AsyncIterator[list]:
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@lru_cache(maxsize=None)
+def _with_required_id(model: Type[BaseModel]) -> Type[BaseModel]:
+    # A generated default id would make every re-import of an id-less row a new document
+    return create_model(f"{model.__name__}Import", __base__=model, id=(str, Field(min_length=1)))
+
+
+async def import_rows(
+    collection,
+    model: Type[BaseModel],
+    rows: AsyncIterator[Tuple[int, Any]],
+    chunk_size: int = CHUNK_SIZE,
+    extra: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Upsert validated rows on ``id``; ``extra`` fields (e.g. location_id) scope the match and are set on every row.
+
+    Rows must carry their ``id`` even when ``model`` would generate one.
+    """
+    model = _with_required_id(model)
+    summary = {"received": 0, "valid": 0, "upserted": 0, "modified": 0, "error_count": 0, "errors": []}
+
+    def error(row: int, detail):
+        summary["error_count"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"row": row, "errors": detail})
+
+    async def write(ops: List[UpdateOne]):
+        result = await collection.bulk_write(ops, ordered=False)
+        summary["upserted"] += result.upserted_count
+        summary["modified"] += result.modified_count
+
+    inflight: Optional[asyncio.Task] = None
+    try:
+        async for batch in _chunks(rows, chunk_size):
+            ops = []
+            for row, value in batch:
+                summary["received"] += 1
+                if isinstance(value, RowError):
+                    error(row, [{"msg": str(value)}])
+                    continue
+                if not isinstance(value, dict):
+                    error(row, [{"msg": "Row must be an object"}])
+                    continue
+                try:
+                    doc = model.model_validate(value).model_dump()
+                except ValidationError as exc:
+                    error(row, exc.errors(include_url=False, include_input=False, include_context=False))
+                    continue
+                ops.append(UpdateOne({**(extra or {}), "id": doc["id"]}, {"$set": {**doc, **(extra or {})}}, upsert=True))
+            summary["valid"] += len(ops)
+            if inflight is not None:
+                await inflight
+                inflight = None
+            if ops:
+                inflight = asyncio.ensure_future(write(ops))
+        if inflight is not None:
+            await inflight
+    finally:
+        if inflight is not None and not inflight.done():
+            inflight.cancel()
+    return summary
+
+
+async def export_lines(cursor, fields: Iterable[str], fmt: str) -> AsyncIterator[str]:
+    fields = list(fields)
+    if fmt == "ndjson":
+        async for doc in cursor:
+            yield json.dumps({f: doc.get(f) for f in fields}, separators=(",", ":"), ensure_ascii=False) + "\n"
+        return
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(fields)
+    async for doc in cursor:
+        writer.writerow(["" if doc.get(f) is None else doc.get(f) for f in fields])
+        # Flush in modest pieces rather than one write per row
+        if out.tell() >= 64 * 1024:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+    yield out.getvalue()
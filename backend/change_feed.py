@@ -0,0 +1,227 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, Iterable, Optional, Set, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+
+from locations import DEFAULT_LOCATION
+
+logger = logging.getLogger(__name__)
+
+# One change feed per process, fanned out to SSE subscribers. It also keeps
+# every worker's content cache in step with writes made by the others.
+#
+# A write through the API records a new version of the (collection, location)
+# it touched: a counter document in content_versions (see record). Every
+# worker polls those counters, which is one small query per tick however large
+# the content is. When a counter has moved, the worker drops that location's
+# cache partition and notifies that location's subscribers. On a replica set a
+# change stream on content_versions wakes the poll immediately.
+#
+# Versions are the counters, so they agree across workers and restarts: a
+# reconnecting client compares them with what it last saw and refetches only
+# on a difference. Edits made directly in Mongo bypass the counters; cache
+# TTLs still pick them up, but they are not announced.
+#
+# Every subscriber has a small bounded queue. A client that falls that far
+# behind is evicted (it gets a final "evicted" event and should reconnect and
+# refetch) rather than letting its backlog grow without bound.
+
+# Public topic name -> collection, matching the /api/home section names
+TOPICS = {"menu": "menu_items", "chefs_choice": "chefs_choice", "special": "specials"}
+
+_EVICTED = object()
+
+Key = Tuple[str, Optional[str]]
+
+
+def _version_id(collection: str, location: Optional[str]) -> str:
+    return f"{collection}:{location or ''}"
+
+
+class Subscriber:
+    __slots__ = ("topics", "location", "queue", "evicted")
+
+    def __init__(self, topics: Set[str], location: str, size: int):
+        self.topics = topics
+        self.location = location
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.evicted = False
+
+
+class ChangeFeed:
+    def __init__(
+        self,
+        db,
+        cache=None,
+        poll_interval: float = 2.0,
+        queue_size: int = 16,
+        heartbeat: float = 15.0,
+        max_subscribers: int = 10000,
+    ):
+        self.db = db
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self.mode = "stopped"
+        self.sequence = 0
+        self.versions: Dict[Key, int] = {}
+        self.published = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._subscribers: Set[Subscriber] = set()
+        self._wake = asyncio.Event()
+        self._tasks = []
+        self._topic_of = {collection: topic for topic, collection in TOPICS.items()}
+
+    # ---------- Versions ----------
+    async def record(self, collections: Iterable[str], location: Optional[str] = None) -> None:
+        """Record a write to ``collections`` at ``location`` (None for shared collections)."""
+        for collection in collections:
+            try:
+                doc = await self.db.content_versions.find_one_and_update(
+                    {"_id": _version_id(collection, location)},
+                    {"$inc": {"version": 1}, "$set": {"collection": collection, "location_id": location}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+            except PyMongoError:
+                # The write itself succeeded; other workers fall back to their cache TTLs
+                logger.exception("change feed: recording a %s version failed", collection)
+                continue
+            # This worker already bumped its own cache for the write
+            self._observe(collection, location, doc["version"], invalidate=False)
+
+    async def refresh(self, collections: Iterable[str], location: Optional[str] = None) -> None:
+        """Pick up other workers' writes to ``collections`` now rather than at the next poll."""
+        await self._check({"_id": {"$in": [_version_id(c, location) for c in collections]}})
+
+    async def _check(self, query=None, announce: bool = True) -> None:
+        async for doc in self.db.content_versions.find(query or {}):
+            self._observe(doc["collection"], doc.get("location_id"), doc["version"], invalidate=announce, announce=announce)
+
+    def _observe(self, collection: str, location: Optional[str], version: int, invalidate: bool, announce: bool = True) -> None:
+        key = (collection, location)
+        # Counters only grow; an older reading (a poll racing a local write) changes nothing
+        if version <= self.versions.get(key, 0):
+            return
+        self.versions[key] = version
+        if invalidate and self.cache is not None:
+            self.invalidations += 1
+            self.cache.bump(collection, partition=location, notify=False)
+        if announce and collection in self._topic_of:
+            self._publish(self._topic_of[collection], location or DEFAULT_LOCATION)
+
+    def version(self, topic: str, location: str) -> str:
+        return str(self.versions.get((TOPICS[topic], location), 0))
+
+    async def _watch(self) -> None:
+        try:
+            async with self.db.content_versions.watch() as stream:
+                self.mode = "change_stream"
+                async for _ in stream:
+                    self._wake.set()
+        except OperationFailure as exc:
+            # Standalone servers don't support change streams
+            logger.info("change feed: change streams unavailable (%s), polling every %.1fs", exc, self.poll_interval)
+        except Exception as exc:
+            logger.warning("change feed: change stream stopped (%s), polling every %.1fs", exc, self.poll_interval)
+        self.mode = "polling"
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self._check()
+            except PyMongoError:
+                logger.exception("change feed: reading content versions failed")
+
+    # ---------- Fan-out ----------
+    def _publish(self, topic: str, location: str) -> None:
+        self.sequence += 1
+        self.published += 1
+        event = (self.sequence, "change", {"topic": topic, "version": self.version(topic, location)})
+        for sub in list(self._subscribers):
+            if topic not in sub.topics or sub.location != location or sub.evicted:
+                continue
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._evict(sub)
+
+    def _evict(self, sub: Subscriber) -> None:
+        sub.evicted = True
+        self.evictions += 1
+        self._subscribers.discard(sub)
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(_EVICTED)
+
+    def subscribe(self, topics: Set[str], location: str = DEFAULT_LOCATION) -> Optional[Subscriber]:
+        if len(self._subscribers) >= self.max_subscribers:
+            return None
+        sub = Subscriber(topics, location, self.queue_size)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self._subscribers.discard(sub)
+
+    async def stream(self, sub: Subscriber) -> AsyncIterator[str]:
+        """SSE text for one subscriber: current versions first, then changes and heartbeats."""
+        try:
+            versions = {topic: self.version(topic, sub.location) for topic in sorted(sub.topics)}
+            yield _sse("versions", versions, self.sequence, retry=3000)
+            while True:
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if item is _EVICTED:
+                    yield _sse("evicted", {"reason": "slow consumer"}, self.sequence)
+                    return
+                sequence, name, data = item
+                yield _sse(name, data, sequence)
+        finally:
+            self.unsubscribe(sub)
+
+    # ---------- Lifecycle ----------
+    async def start(self) -> None:
+        # Current versions, without invalidating or announcing anything
+        await self._check(announce=False)
+        loop = asyncio.get_running_loop()
+        self.mode = "polling"
+        self._tasks = [loop.create_task(self._watch()), loop.create_task(self._run())]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.mode = "stopped"
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "sequence": self.sequence,
+        }
+
+
+def _sse(event: str, data, id_: int, retry: Optional[int] = None) -> str:
+    lines = [f"event: {event}", f"id: {id_}"]
+    if retry is not None:
+        lines.append(f"retry: {retry}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
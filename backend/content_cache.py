@@ -0,0 +1,141 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+# Seconds a cached read stays fresh, per Mongo collection. Content changes
+# roughly daily, writes bump the collection version so TTLs only bound staleness
+# for out-of-band edits (e.g. someone editing Mongo by hand).
+DEFAULT_TTLS = {
+    "menu_items": 300.0,
+    "chefs_choice": 300.0,
+    "specials": 60.0,
+    "reviews": 120.0,
+    "timeline": 3600.0,
+    "video": 3600.0,
+    "assets": 3600.0,
+    "pricing_rules": 300.0,
+    # Order price indexes, keyed on the menu_items and pricing_rules versions
+    "pricing": 300.0,
+    # Staff inbox counts; new submissions don't bump these, so they lag by up to the TTL
+    "bookings": 15.0,
+    "contact_messages": 15.0,
+    "orders": 15.0,
+    "locations": 300.0,
+}
+
+
+class ContentCache:
+    """Read-through cache for content collections.
+
+    Entries are keyed on (collection, partition, key) and are valid while the
+    version they were loaded under is current and their TTL has not expired.
+    A partition (a location id) has its own version on top of the collection's,
+    so a write to one branch only invalidates that branch's entries.
+    Concurrent misses on the same key share a single loader call. At most
+    ``max_entries`` entries are kept; the least recently used is evicted first.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 60.0,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._versions: Dict[str, int] = {}
+        self._partition_versions: Dict[Tuple[str, Hashable], int] = {}
+        self._entries: "OrderedDict[Tuple[str, Hashable, Hashable], Tuple[int, float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, Hashable, Hashable, int], asyncio.Future] = {}
+        self._listeners: List[Callable[[Tuple[str, ...]], None]] = []
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def version(self, collection: str, partition: Hashable = None) -> int:
+        # Both counters only grow, so their sum changes whenever either does
+        version = self._versions.get(collection, 0)
+        if partition is not None:
+            version += self._partition_versions.get((collection, partition), 0)
+        return version
+
+    def add_listener(self, listener: Callable[[Tuple[str, ...]], None]) -> None:
+        """Call ``listener(collections)`` whenever a write bumps collection versions."""
+        self._listeners.append(listener)
+
+    def bump(self, *collections: str, partition: Hashable = None, notify: bool = True) -> None:
+        """Invalidate ``collections``, or only their ``partition`` entries when one is given."""
+        for name in collections:
+            if partition is None:
+                self._versions[name] = self._versions.get(name, 0) + 1
+                stale = [k for k in self._entries if k[0] == name]
+            else:
+                self._partition_versions[name, partition] = self._partition_versions.get((name, partition), 0) + 1
+                stale = [k for k in self._entries if k[0] == name and k[1] == partition]
+            for key in stale:
+                del self._entries[key]
+        if notify:
+            for listener in self._listeners:
+                listener(collections)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get(
+        self,
+        collection: str,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        partition: Hashable = None,
+    ) -> Any:
+        version = self.version(collection, partition)
+        entry_key = (collection, partition, key)
+        entry = self._entries.get(entry_key)
+        if entry is not None:
+            entry_version, expires_at, value = entry
+            if entry_version == version and expires_at > self._clock():
+                self.hits += 1
+                self._entries.move_to_end(entry_key)
+                return value
+
+        flight_key = (*entry_key, version)
+        task = self._inflight.get(flight_key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # The load runs as its own task so a cancelled (disconnected) caller
+            # doesn't abort the query other waiters are sharing.
+            task = asyncio.ensure_future(loader())
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda t: self._store(entry_key, version, t))
+        return await asyncio.shield(task)
+
+    def _store(self, entry_key: Tuple[str, Hashable, Hashable], version: int, task: asyncio.Future) -> None:
+        self._inflight.pop((*entry_key, version), None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        collection, partition, _ = entry_key
+        if self.version(collection, partition) == version:
+            ttl = self.ttls.get(collection, self.default_ttl)
+            self._entries[entry_key] = (version, self._clock() + ttl, task.result())
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "versions": dict(self._versions),
+            "partitions": len(self._partition_versions),
+        }
@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+# Idempotency-Key support for POST endpoints. The first request with a key
+# claims it in Mongo (``_id`` = scope:key, so the claim is a unique insert) and
+# stores its response there; retries get that response back without running
+# the handler again. Recent keys are also held in a per-process LRU so hot
+# retries don't reach Mongo at all. Claims expire through a TTL index on
+# ``created_at`` (see server startup).
+#
+# A pending claim is a lease: if its worker dies mid-request the key would
+# otherwise answer 409 until the TTL removes it. A retry arriving more than
+# ``pending_lease`` seconds after ``claimed_at`` takes the claim over and runs
+# the handler itself. Each claim carries a random ``claim`` token, so the
+# takeover is a conditional update only one retry can win, and a slow original
+# can no longer complete or release a claim it has lost.
+
+COLLECTION = "idempotency_keys"
+
+
+class IdempotencyConflict(Exception):
+    """The key was reused with a different payload, or its first request is still running."""
+
+    def __init__(self, detail: str, status_code: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, db, max_entries: int = 10000, pending_lease: float = 30.0):
+        self.collection = db[COLLECTION]
+        self.max_entries = max_entries
+        self.pending_lease = pending_lease
+        self._recent: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.replays = 0
+        self.takeovers = 0
+
+    def _remember(self, id_: str, fp: str, response: Any) -> None:
+        self._recent[id_] = (fp, response)
+        self._recent.move_to_end(id_)
+        while len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+
+    def _replay(self, fp: str, stored_fp: str, response: Any) -> Tuple[Any, bool]:
+        if stored_fp != fp:
+            raise IdempotencyConflict("Idempotency-Key was already used with a different request", 422)
+        self.replays += 1
+        return response, True
+
+    async def run(self, scope: str, key: str, fp: str, handler: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """(response, replayed) for ``key``; ``handler`` runs at most once per key across workers."""
+        id_ = f"{scope}:{key}"
+        hit = self._recent.get(id_)
+        if hit is not None:
+            self._recent.move_to_end(id_)
+            return self._replay(fp, *hit)
+
+        # Concurrent retries within this process wait for the first one
+        task = self._inflight.get(id_)
+        if task is not None:
+            stored_fp, response, _ = await asyncio.shield(task)
+            return self._replay(fp, stored_fp, response)
+
+        task = asyncio.ensure_future(self._claim_and_run(id_, fp, handler))
+        self._inflight[id_] = task
+        task.add_done_callback(lambda _: self._inflight.pop(id_, None))
+        stored_fp, response, replayed = await asyncio.shield(task)
+        if replayed:
+            return self._replay(fp, stored_fp, response)
+        return response, False
+
+    async def _claim_and_run(self, id_: str, fp: str, handler):
+        claim = uuid.uuid4().hex
+        now = datetime.utcnow()
+        try:
+            await self.collection.insert_one(
+                {"_id": id_, "fingerprint": fp, "state": "pending", "claim": claim, "created_at": now, "claimed_at": now}
+            )
+        except DuplicateKeyError:
+            doc = await self.collection.find_one({"_id": id_})
+            if doc is not None and doc.get("state") == "done":
+                self._remember(id_, doc["fingerprint"], doc["response"])
+                return doc["fingerprint"], doc["response"], True
+            if doc is None or not await self._take_over(doc, fp, claim):
+                raise IdempotencyConflict("A request with this Idempotency-Key is still in progress", 409)
+
+        mine = {"_id": id_, "state": "pending", "claim": claim}
+        try:
+            response = await handler()
+        except BaseException:
+            # Failed requests don't hold the key, so the client can retry them
+            await asyncio.shield(self.collection.delete_one(mine))
+            raise
+        await self.collection.update_one(mine, {"$set": {"state": "done", "response": response}})
+        self._remember(id_, fp, response)
+        return fp, response, False
+
+    async def _take_over(self, doc: Dict[str, Any], fp: str, claim: str) -> bool:
+        """Claim a pending key whose lease ran out; False while the current holder's lease is valid."""
+        # Claims written before leases existed only have created_at
+        claimed_at = doc.get("claimed_at") or doc["created_at"]
+        now = datetime.utcnow()
+        if now - claimed_at < timedelta(seconds=self.pending_lease):
+            return False
+        if doc["fingerprint"] != fp:
+            raise IdempotencyConflict("Idempotency-Key was already used with a different request", 422)
+        taken = await self.collection.update_one(
+            {"_id": doc["_id"], "state": "pending", "claimed_at": doc.get("claimed_at"), "claim": doc.get("claim")},
+            {"$set": {"claim": claim, "claimed_at": now}},
+        )
+        if taken.modified_count:
+            self.takeovers += 1
+        return bool(taken.modified_count)
+
+    def stats(self):
+        return {"entries": len(self._recent), "replays": self.replays, "takeovers": self.takeovers}
+
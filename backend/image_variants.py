@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+import io
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # optional: the image endpoint answers 503 without Pillow
+    Image = None
+
+# Responsive image variants built from local originals. A variant is keyed by
+# the original's content hash plus width/format/quality, rendered once in a
+# process pool (resizing is CPU-bound and would stall the event loop) and kept
+# in a size-bounded LRU directory on disk, so later requests are a file send.
+#
+# Workers may share the directory while each keeps its own LRU, so any file can
+# be evicted by another worker at any moment. A missing file is just a miss, and
+# responses are served from a file opened up front, which an unlink can't break.
+
+WIDTHS = (160, 320, 480, 640, 960, 1280, 1920)
+FORMATS = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+QUALITY = {"avif": 50, "webp": 75, "jpeg": 80}
+
+
+class ImageNotFound(Exception):
+    pass
+
+
+CHUNK = 64 * 1024
+
+
+def iter_file(fh: BinaryIO) -> Iterator[bytes]:
+    """Chunks of an open file, closing it at the end."""
+    with fh:
+        for chunk in iter(lambda: fh.read(CHUNK), b""):
+            yield chunk
+
+
+def snap_width(width: int) -> int:
+    """Round a requested width up to the next bucket so clients can't multiply variants."""
+    for bucket in WIDTHS:
+        if width <= bucket:
+            return bucket
+    return WIDTHS[-1]
+
+
+def local_name(src: str) -> str:
+    """Originals directory entry for ``src``; remote URLs (as stored in seed data) map to ``remote/<hash>``."""
+    if src.startswith(("http://", "https://")):
+        return "remote/" + hashlib.sha1(src.encode()).hexdigest()[:20]
+    return src
+
+
+def supported_formats():
+    if Image is None:
+        return []
+    return [fmt for fmt in FORMATS if fmt == "jpeg" or features.check(fmt)]
+
+
+def negotiate(accept: str, formats) -> str:
+    """Best format the client accepts, preferring avif, then webp, then jpeg."""
+    accept = accept or ""
+    for fmt in ("avif", "webp"):
+        if fmt in formats and FORMATS[fmt] in accept:
+            return fmt
+    return "jpeg"
+
+
+def render(path: str, width: int, fmt: str, quality: int) -> bytes:
+    """Resize and encode one variant; runs in a worker process."""
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.width > width:
+            img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+        if fmt == "jpeg" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        out = io.BytesIO()
+        img.save(out, format=fmt.upper(), quality=quality, **({"optimize": True, "progressive": True} if fmt == "jpeg" else {}))
+        return out.getvalue()
+
+
+class ImageVariants:
+    def __init__(
+        self,
+        originals: str,
+        cache_dir: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        executor: Optional[Executor] = None,
+        workers: Optional[int] = None,
+    ):
+        self.originals = Path(originals).resolve()
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.formats = supported_formats()
+        self._executor = executor
+        self._workers = workers
+        # (path, size, mtime_ns) -> content hash, so originals are hashed once per change
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.renders = 0
+        self.evictions = 0
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        # Rebuild the LRU from the directory, least recently used (oldest mtime) first
+        entries = [(p.stat().st_mtime, p.name, p.stat().st_size) for p in self.cache_dir.iterdir() if p.is_file() and not p.name.startswith(".")]
+        for _, name, size in sorted(entries):
+            self._lru[name] = size
+            self._bytes += size
+        self._evict()
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def _resolve(self, src: str) -> Path:
+        path = (self.originals / local_name(src)).resolve()
+        # Only files inside the originals directory are served
+        if self.originals not in path.parents or not path.is_file():
+            raise ImageNotFound(src)
+        return path
+
+    def _content_hash(self, path: Path) -> str:
+        st = path.stat()
+        key = (str(path), st.st_size, st.st_mtime_ns)
+        digest = self._hashes.get(key)
+        if digest is None:
+            h = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            digest = self._hashes[key] = h.hexdigest()[:32]
+        return digest
+
+    async def variant(self, src: str, width: int, fmt: str) -> Tuple[Path, str]:
+        """Path of the cached variant file and its ETag, rendering it if needed."""
+        path = self._resolve(src)
+        width, quality = snap_width(width), QUALITY[fmt]
+        digest = await asyncio.get_running_loop().run_in_executor(None, self._content_hash, path)
+        name = f"{digest}-w{width}-q{quality}.{fmt}"
+        target = self.cache_dir / name
+        try:
+            os.utime(target)
+            size = target.stat().st_size
+        except FileNotFoundError:
+            self._forget(name)
+        else:
+            # Re-inserted as most recent; it may have been rendered by another worker
+            self.hits += 1
+            self._bytes += size - self._lru.pop(name, 0)
+            self._lru[name] = size
+            self._evict()
+            return target, f'"{name}"'
+
+        task = self._inflight.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self._render(path, name, width, fmt, quality))
+            self._inflight[name] = task
+            task.add_done_callback(lambda _: self._inflight.pop(name, None))
+        await asyncio.shield(task)
+        return target, f'"{name}"'
+
+    async def open_variant(self, src: str, width: int, fmt: str) -> Tuple[BinaryIO, str]:
+        """Like variant, but returns the file already open, so it can be served even if evicted meanwhile."""
+        for _ in range(3):
+            target, etag = await self.variant(src, width, fmt)
+            try:
+                return open(target, "rb"), etag
+            except FileNotFoundError:
+                self._forget(target.name)
+        raise FileNotFoundError(f"variant of {src} keeps being evicted; IMAGE_CACHE_MB is too small")
+
+    def _forget(self, name: str) -> None:
+        self._bytes -= self._lru.pop(name, 0)
+
+    async def _render(self, path: Path, name: str, width: int, fmt: str, quality: int) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._workers)
+        data = await asyncio.get_running_loop().run_in_executor(
+            self._executor, render, str(path), width, fmt, quality
+        )
+        tmp = self.cache_dir / f".{name}.{os.getpid()}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, self.cache_dir / name)
+        self.renders += 1
+        self._bytes += len(data) - self._lru.pop(name, 0)
+        self._lru[name] = len(data)
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._lru) > 1:
+            name, size = self._lru.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                (self.cache_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "renders": self.renders,
+            "evictions": self.evictions,
+            "entries": len(self._lru),
+            "bytes": self._bytes,
+        }
+
+
+if __name__ == "__main__":
+    # Download the remote images referenced by the seed data into the originals
+    # directory, so the variant endpoint can serve them without network access.
+    import argparse
+    import urllib.request
+
+    from seed import seed_data_dict
+
+    parser = argparse.ArgumentParser(description="Fetch seed image originals for local variants")
+    parser.add_argument("--originals", default=str(Path(__file__).parent / "images"))
+    args = parser.parse_args()
+
+    def urls(value):
+        if isinstance(value, dict):
+            for k, v in value.items():
+                if k in ("img", "avatar") and isinstance(v, str) and v.startswith(("http://", "https://")):
+                    yield v
+                else:
+                    yield from urls(v)
+        elif isinstance(value, list):
+            for v in value:
+                yield from urls(v)
+
+    for url in sorted(set(urls(seed_data_dict()))):
+        target = Path(args.originals) / local_name(url)
+        if target.exists():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with urllib.request.urlopen(url, timeout=30) as resp:
+                target.write_bytes(resp.read())
+            print(f"fetched {url} -> {target}")
+        except OSError as exc:
+            print(f"skipped {url}: {exc}")
@@ -0,0 +1,16 @@
+import re
+
+# Branches share one database. Every document in a location-scoped collection
+# carries a ``location_id``, and every query index on those collections leads with it,
+# so a branch's queries only ever touch that branch's slice of each index.
+# Unscoped API routes serve DEFAULT_LOCATION (the original restaurant); the
+# same routes are mounted again under /api/locations/{location_id}.
+
+DEFAULT_LOCATION = "main"
+SCOPED_COLLECTIONS = (
+    "menu_items", "chefs_choice", "specials", "reviews", "timeline", "bookings", "orders", "pricing_rules",
+)
+
+# Lowercase slugs starting with a letter, so they never collide with the
+# date-keyed booking slot ids of the default location (see availability)
+LOCATION_ID = re.compile(r"^[a-z][a-z0-9-]{0,39}$")
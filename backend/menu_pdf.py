@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import re
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+from snapshot import etag_matches
+
+# Downloadable menu rendered from menu_items and chefs_choice. The PDF is plain
+# text on A4 pages in the standard Helvetica fonts, written directly so no
+# layout library is needed. Rendering runs in a worker process and the result
+# is kept in memory until the source snapshots' ETags change.
+
+PAGE_W, PAGE_H = 595, 842
+MARGIN = 56
+CATEGORY_ORDER = ("classic", "specials", "sides", "drinks", "desserts")
+
+# Helvetica advance widths (1/1000 em) for the characters used in prices; the
+# rest of the text is left-aligned, so an average width is enough to wrap it.
+_PRICE_WIDTHS = {" ": 278, ".": 278, "R": 722, "s": 500, **{d: 556 for d in "0123456789"}}
+_AVG_WIDTH = 520
+
+
+def _pdf_text(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _wrap(text: str, size: float, width: float) -> List[str]:
+    per_line = max(1, int(width / (size * _AVG_WIDTH / 1000)))
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > per_line:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _price(value) -> str:
+    return f"Rs {value:g}" if isinstance(value, (int, float)) else str(value)
+
+
+class _Pages:
+    def __init__(self):
+        self.pages: List[List[bytes]] = []
+        self.y = 0.0
+        self._new_page()
+
+    def _new_page(self):
+        self.pages.append([])
+        self.y = PAGE_H - MARGIN
+
+    def need(self, height: float):
+        if self.y - height < MARGIN:
+            self._new_page()
+
+    def text(self, x: float, text: str, size: float, bold: bool = False):
+        font = b"F2" if bold else b"F1"
+        self.pages[-1].append(b"BT /%s %g Tf %g %g Td (%s) Tj ET" % (font, size, x, self.y, _pdf_text(text)))
+
+    def price(self, text: str, size: float):
+        width = sum(_PRICE_WIDTHS.get(c, _AVG_WIDTH) for c in text) * size / 1000
+        self.text(PAGE_W - MARGIN - width, text, size, bold=True)
+
+
+def render_menu_pdf(menu_items: List[dict], chefs_choice: List[dict], title: str = "Rony’s Pizza Hub") -> bytes:
+    """Render the menu as PDF bytes; deterministic for the same input."""
+    doc = _Pages()
+    doc.text(MARGIN, title, 22, bold=True)
+    doc.y -= 22
+    doc.text(MARGIN, "Menu", 12)
+    doc.y -= 30
+
+    categories: Dict[str, List[dict]] = {}
+    for item in menu_items:
+        categories.setdefault(item.get("category") or "other", []).append(item)
+    ordered = sorted(categories, key=lambda c: (CATEGORY_ORDER.index(c) if c in CATEGORY_ORDER else len(CATEGORY_ORDER), c))
+    sections = ([("Chef’s Choice", chefs_choice)] if chefs_choice else []) + [
+        (c.replace("_", " ").title(), categories[c]) for c in ordered
+    ]
+
+    text_width = PAGE_W - 2 * MARGIN - 80
+    for heading, items in sections:
+        doc.need(50)
+        doc.text(MARGIN, heading, 15, bold=True)
+        doc.y -= 24
+        for item in items:
+            desc = _wrap(item.get("desc") or "", 9.5, text_width)
+            doc.need(16 + 12 * len(desc) + 8)
+            doc.text(MARGIN, item.get("name") or "", 11.5, bold=True)
+            doc.price(_price(item.get("price")), 11.5)
+            doc.y -= 14
+            for line in desc:
+                doc.text(MARGIN, line, 9.5)
+                doc.y -= 12
+            doc.y -= 8
+        doc.y -= 10
+
+    # Objects: 1 catalog, 2 page tree, 3/4 fonts, then a (page, content) pair per page
+    objects: List[bytes] = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+                            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for ops in doc.pages:
+        stream = zlib.compress(b"\n".join(ops), 9)
+        page_id, content_id = len(objects) + 1, len(objects) + 2
+        kids.append(b"%d 0 R" % page_id)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_W, PAGE_H, content_id)
+        )
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+class MenuPdf:
+    """The current menu PDF per partition (location), re-rendered only when its content key changes."""
+
+    def __init__(self, executor: Optional[Executor] = None):
+        self._executor = executor
+        self._current: Dict[Hashable, Tuple[Hashable, bytes, str]] = {}
+        self._inflight: Dict[Tuple[Hashable, Hashable], asyncio.Future] = {}
+        self.renders = 0
+
+    async def get(
+        self,
+        key: Hashable,
+        sources: Callable[[], Tuple[List[dict], List[dict]]],
+        partition: Hashable = None,
+    ) -> Tuple[bytes, str]:
+        """PDF bytes and ETag for ``key``; ``sources()`` returns (menu_items, chefs_choice) on a miss."""
+        current = self._current.get(partition)
+        if current is not None and current[0] == key:
+            return current[1], current[2]
+        flight = (partition, key)
+        task = self._inflight.get(flight)
+        if task is None:
+            task = asyncio.ensure_future(self._render(partition, key, *sources()))
+            self._inflight[flight] = task
+            task.add_done_callback(lambda _: self._inflight.pop(flight, None))
+        return await asyncio.shield(task)
+
+    async def _render(self, partition, key, menu_items, chefs_choice) -> Tuple[bytes, str]:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1)
+        body = await asyncio.get_running_loop().run_in_executor(self._executor, render_menu_pdf, menu_items, chefs_choice)
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+        self._current[partition] = (key, body, etag)
+        self.renders += 1
+        return body, etag
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def byte_range(header: Optional[str], size: int):
+    """(start, end) inclusive for a single-range header, None to send everything, or "unsatisfiable"."""
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    # Multiple or malformed ranges: fall back to the full body, which RFC 9110 allows
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return "unsatisfiable"
+    return start, end
+
+
+def pdf_response(request: Request, body: bytes, etag: str, filename: str = "menu.pdf") -> Response:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'inline; filename="{filename}"',
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    requested = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # A stale If-Range means the client's partial copy is outdated: send it all
+    span = byte_range(requested, len(body)) if not if_range or if_range == etag else None
+    if span == "unsatisfiable":
+        headers["Content-Range"] = f"bytes */{len(body)}"
+        return Response(status_code=416, headers=headers)
+    if span is None:
+        return Response(body, media_type="application/pdf", headers=headers)
+    start, end = span
+    headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+    return Response(body[start:end + 1], status_code=206, media_type="application/pdf", headers=headers)
@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from pymongo import monitoring
+
+# Minimal Prometheus text-format metrics: route latency from an ASGI middleware,
+# Mongo command latency and pool checkout wait from pymongo event listeners.
+# Listener callbacks run on Motor's executor threads, hence the lock.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _fmt_labels(labels: Labels, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            # [bucket counts..., count, sum]
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for labels, series in sorted(items):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_fmt_labels(labels, [('le', repr(bound))])} {count}")
+            lines.append(f"{self.name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {series[-2]}")
+            lines.append(f"{self.name}_count{_fmt_labels(labels)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_fmt_labels(labels)} {series[-1]:.6f}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, kind: str = "counter"):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] += amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_fmt_labels(labels)} {value:g}" for labels, value in items)
+        return lines
+
+
+class Gauge(Counter):
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help, kind="gauge")
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Tuple[str, Callable[[], Dict[str, float]]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, prefix: str, collect: Callable[[], Dict[str, float]]) -> None:
+        """Expose numeric values from ``collect()`` (e.g. cache stats) as gauges named ``prefix_key``."""
+        self._collectors.append((prefix, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, collect in self._collectors:
+            for key, value in collect().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+http_latency = registry.register(Histogram("http_request_duration_seconds", "HTTP request latency by route"))
+http_in_flight = registry.register(Gauge("http_requests_in_flight", "HTTP requests currently being served"))
+http_responses = registry.register(Counter("http_responses_total", "HTTP responses by route and status"))
+mongo_latency = registry.register(Histogram("mongo_command_duration_seconds", "Mongo command latency by collection"))
+mongo_failures = registry.register(Counter("mongo_command_failures_total", "Failed Mongo commands"))
+pool_wait = registry.register(Histogram("mongo_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection"))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency per matched route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        http_in_flight.inc(1, method=method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.inc(-1, method=method)
+            # The router stores the matched route in scope; unmatched paths are
+            # bucketed together so arbitrary URLs can't blow up label cardinality.
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "<unmatched>"
+            http_latency.observe(elapsed, method=method, route=path)
+            http_responses.inc(1, method=method, route=path, status=str(status["code"]))
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[int, int], Tuple[str, str]] = {}
+
+    def started(self, event):
+        name = event.command_name
+        target = event.command.get(name)
+        collection = target if isinstance(target, str) else "<db>"
+        with self._lock:
+            self._pending[(event.request_id, event.operation_id)] = (name, collection)
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            name, collection = self._pending.pop((event.request_id, event.operation_id), (event.command_name, "<db>"))
+        mongo_latency.observe(event.duration_micros / 1e6, command=name, collection=collection)
+        if failed:
+            mongo_failures.inc(1, command=name, collection=collection)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Checkout wait, keyed by thread: pymongo checks a connection out synchronously on the calling thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started: Dict[int, float] = {}
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self._started[threading.get_ident()] = time.perf_counter()
+
+    def _done(self, event, outcome: str):
+        with self._lock:
+            started = self._started.pop(threading.get_ident(), None)
+        if started is not None:
+            pool_wait.observe(time.perf_counter() - started, address="%s:%s" % event.address, outcome=outcome)
+
+    def connection_checked_out(self, event):
+        self._done(event, "ok")
+
+    def connection_check_out_failed(self, event):
+        self._done(event, "failed")
+
+    # Remaining pool events are not needed for these metrics
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
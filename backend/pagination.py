@@ -0,0 +1,51 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+
+# Keyset ("seek") pagination: pages are sorted on (field, id) and the cursor
+# carries the last row's values, so page N costs the same index seek as page 1.
+
+def encode_cursor(value: Any, id_: str) -> str:
+    # Datetimes (e.g. inbox ``ts``) round-trip as {"$date": iso}, so the seek compares dates, not strings
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    raw = json.dumps([value, id_], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, id_ = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["$date"])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(id_, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, id_
+
+
+def keyset_filter(field: str, direction: int, cursor: Optional[str]) -> Dict[str, Any]:
+    if not cursor:
+        return {}
+    value, id_ = decode_cursor(cursor)
+    op = "$gt" if direction > 0 else "$lt"
+    return {"$or": [{field: {op: value}}, {field: value, "id": {op: id_}}]}
+
+
+def keyset_sort(field: str, direction: int) -> List[Tuple[str, int]]:
+    return [(field, direction), ("id", direction)]
+
+
+def next_cursor(docs: List[dict], field: str, limit: int) -> Optional[str]:
+    """Trim an over-fetched page (limit + 1 rows) and return the cursor for the next one."""
+    if len(docs) <= limit:
+        return None
+    del docs[limit:]
+    last = docs[-1]
+    return encode_cursor(last.get(field), last["id"])
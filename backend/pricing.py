@@ -0,0 +1,165 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Cart pricing against an in-memory index of one location's menu prices and
+# pricing rules. The index is built from two Mongo reads and cached under the
+# content versions of menu_items and pricing_rules (see routes), so a quote is
+# pure dict lookups however many lines the cart has.
+#
+# Amounts are integer paise internally so totals never pick up float drift.
+# Rules live in the pricing_rules collection, one document per rule:
+#   addon:    {id, kind, name, price, categories?}  extras for items in those categories (any when empty)
+#   combo:    {id, kind, name, price, components: [{category | item_id}, ...]}
+#             one unit per component for a fixed price; applied greedily to the
+#             priciest matching units while it saves the customer money
+#   discount: {id, kind, name, percent | amount_off, min_subtotal?, categories?, code?}
+#             the single best applicable discount is taken, after combos; a
+#             category discount only covers units no combo took
+
+RULE_KINDS = ("addon", "combo", "discount")
+MAX_QUANTITY = 50
+
+
+class PricingError(Exception):
+    """The cart refers to unknown items or add-ons, or pairs an add-on with an item it doesn't apply to."""
+
+
+def to_paise(amount) -> int:
+    return int(round(float(amount) * 100))
+
+
+def to_amount(paise: int) -> float:
+    return paise / 100
+
+
+class PriceIndex:
+    def __init__(self, items: Iterable[Dict[str, Any]], rules: Iterable[Dict[str, Any]]):
+        self.items: Dict[str, Tuple[str, str, int]] = {
+            doc["id"]: (doc["name"], doc["category"], to_paise(doc["price"])) for doc in items
+        }
+        self.addons: Dict[str, Tuple[str, int, frozenset]] = {}
+        self.combos: List[Dict[str, Any]] = []
+        self.discounts: List[Dict[str, Any]] = []
+        for rule in rules:
+            kind = rule.get("kind")
+            if kind == "addon":
+                self.addons[rule["id"]] = (rule["name"], to_paise(rule["price"]), frozenset(rule.get("categories") or ()))
+            elif kind == "combo" and rule.get("components"):
+                self.combos.append({**rule, "price": to_paise(rule["price"])})
+            elif kind == "discount":
+                self.discounts.append(rule)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def quote(self, lines: List[Dict[str, Any]], code: Optional[str] = None) -> Dict[str, Any]:
+        """Price ``[{item_id, quantity, addons}]``; raises PricingError for anything not on the menu."""
+        unknown = sorted({line["item_id"] for line in lines} - self.items.keys())
+        if unknown:
+            raise PricingError(f"Unknown menu items: {', '.join(unknown)}")
+
+        priced, units = [], []
+        subtotal = 0
+        for line in lines:
+            name, category, price = self.items[line["item_id"]]
+            extras = []
+            for addon_id in line.get("addons") or ():
+                addon = self.addons.get(addon_id)
+                if addon is None:
+                    raise PricingError(f"Unknown add-on: {addon_id}")
+                if addon[2] and category not in addon[2]:
+                    raise PricingError(f"Add-on {addon_id} is not available for {name}")
+                extras.append({"id": addon_id, "name": addon[0], "price": addon[1]})
+            unit_price = price + sum(e["price"] for e in extras)
+            total = unit_price * line["quantity"]
+            subtotal += total
+            priced.append({
+                "item_id": line["item_id"],
+                "name": name,
+                "quantity": line["quantity"],
+                "unit_price": unit_price,
+                "addons": extras,
+                "line_total": total,
+            })
+            # Combos replace base prices only; add-ons are always charged
+            units.extend([(price, category, line["item_id"], unit_price)] * line["quantity"])
+
+        adjustments, leftover = self._apply_combos(units)
+        discounted = subtotal + sum(a["amount"] for a in adjustments)
+        best = self._best_discount(leftover, discounted, code)
+        if best is not None:
+            adjustments.append(best)
+        total = subtotal + sum(a["amount"] for a in adjustments)
+        return {
+            "lines": [
+                {**p, "unit_price": to_amount(p["unit_price"]), "line_total": to_amount(p["line_total"]),
+                 "addons": [{**e, "price": to_amount(e["price"])} for e in p["addons"]]}
+                for p in priced
+            ],
+            "adjustments": [{**a, "amount": to_amount(a["amount"])} for a in adjustments],
+            "subtotal": to_amount(subtotal),
+            "discount": to_amount(subtotal - total),
+            "total": to_amount(total),
+        }
+
+    def _apply_combos(self, units: List[Tuple[int, str, str, int]]) -> Tuple[List[Dict[str, Any]], List[Tuple[str, int]]]:
+        """Combo adjustments, and (category, unit price) of every unit no combo took."""
+        adjustments = []
+        # Priciest units first, so each combo takes the units it saves most on.
+        # Units are listed per item id and per category; a cursor per list only
+        # moves forward, so matching is linear in the number of units.
+        units = sorted(units, key=lambda u: -u[0])
+        used = [False] * len(units)
+        candidates: Dict[Tuple[str, str], List[int]] = {}
+        for i, (_, category, item_id, _) in enumerate(units):
+            candidates.setdefault(("category", category), []).append(i)
+            candidates.setdefault(("item_id", item_id), []).append(i)
+        for combo in self.combos:
+            keys = [("item_id", c["item_id"]) if c.get("item_id") else ("category", c.get("category")) for c in combo["components"]]
+            cursors = dict.fromkeys(keys, 0)
+            applied = saved = 0
+            while True:
+                taken = []
+                for key in keys:
+                    pool, i = candidates.get(key, ()), cursors[key]
+                    while i < len(pool) and (used[pool[i]] or pool[i] in taken):
+                        i += 1
+                    cursors[key] = i
+                    if i == len(pool):
+                        break
+                    taken.append(pool[i])
+                else:
+                    saving = sum(units[i][0] for i in taken) - combo["price"]
+                    if saving > 0:
+                        for i in taken:
+                            used[i] = True
+                        applied += 1
+                        saved += saving
+                        continue
+                break
+            if applied:
+                adjustments.append({"rule_id": combo["id"], "name": combo["name"], "times": applied, "amount": -saved})
+        leftover = [(unit[1], unit[3]) for unit, taken in zip(units, used) if not taken]
+        return adjustments, leftover
+
+    def _best_discount(self, leftover: List[Tuple[str, int]], subtotal: int, code: Optional[str]) -> Optional[Dict[str, Any]]:
+        best = None
+        for rule in self.discounts:
+            if rule.get("code") and (code or "").strip().upper() != rule["code"].upper():
+                continue
+            if subtotal < to_paise(rule.get("min_subtotal") or 0):
+                continue
+            categories = set(rule.get("categories") or ())
+            if categories:
+                # Units already in a combo are priced by the combo, not discounted again
+                eligible = sum(price for category, price in leftover if category in categories)
+            else:
+                eligible = subtotal
+            eligible = min(eligible, subtotal)
+            if rule.get("percent"):
+                amount = eligible * float(rule["percent"]) / 100
+            else:
+                amount = to_paise(rule.get("amount_off") or 0)
+            amount = min(int(round(amount)), eligible)
+            if amount > 0 and (best is None or amount > -best["amount"]):
+                best = {"rule_id": rule["id"], "name": rule["name"], "times": 1, "amount": -amount}
+        return best
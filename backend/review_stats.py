@@ -0,0 +1,64 @@
+from typing import Any, Dict
+
+from locations import DEFAULT_LOCATION
+
+# Pre-aggregated review stats live in one document per location (``_id`` is the
+# location id) so the summary read is O(1) regardless of how many reviews
+# exist. New reviews $inc it in place; rebuild_review_stats recomputes it from
+# the reviews collection for repairs.
+
+
+def _inc_for(review: Dict[str, Any], sign: int = 1) -> Dict[str, int]:
+    rating = int(review["rating"])
+    kind = review.get("type") or "customer"
+    return {
+        "count": sign,
+        "rating_sum": sign * rating,
+        f"histogram.{rating}": sign,
+        f"by_type.{kind}.count": sign,
+        f"by_type.{kind}.rating_sum": sign * rating,
+    }
+
+
+async def apply_review(db, review: Dict[str, Any], sign: int = 1) -> None:
+    location = review.get("location_id", DEFAULT_LOCATION)
+    await db.review_stats.update_one({"_id": location}, {"$inc": _inc_for(review, sign)}, upsert=True)
+
+
+async def rebuild_review_stats(db, location: str = DEFAULT_LOCATION) -> Dict[str, Any]:
+    pipeline = [
+        {"$match": {"location_id": location}},
+        {"$group": {
+            "_id": {"type": {"$ifNull": ["$type", "customer"]}, "rating": "$rating"},
+            "count": {"$sum": 1},
+        }},
+    ]
+    stats = {"count": 0, "rating_sum": 0, "histogram": {}, "by_type": {}}
+    async for row in db.reviews.aggregate(pipeline):
+        kind, rating, count = row["_id"]["type"], int(row["_id"]["rating"]), row["count"]
+        stats["count"] += count
+        stats["rating_sum"] += rating * count
+        stats["histogram"][str(rating)] = stats["histogram"].get(str(rating), 0) + count
+        bucket = stats["by_type"].setdefault(kind, {"count": 0, "rating_sum": 0})
+        bucket["count"] += count
+        bucket["rating_sum"] += rating * count
+    await db.review_stats.replace_one({"_id": location}, stats, upsert=True)
+    return stats
+
+
+def summarize(stats: Dict[str, Any]) -> Dict[str, Any]:
+    def average(count, rating_sum):
+        return round(rating_sum / count, 2) if count else 0.0
+
+    histogram = {str(r): 0 for r in range(1, 6)}
+    histogram.update({k: v for k, v in (stats.get("histogram") or {}).items()})
+    count = stats.get("count", 0)
+    return {
+        "count": count,
+        "average": average(count, stats.get("rating_sum", 0)),
+        "histogram": histogram,
+        "by_type": {
+            kind: {"count": b.get("count", 0), "average": average(b.get("count", 0), b.get("rating_sum", 0))}
+            for kind, b in (stats.get("by_type") or {}).items()
+        },
+    }
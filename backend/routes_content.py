@@ -1,12 +1,61 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
-from typing import List, Optional
-from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, create_model
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
+from functools import partial
+import asyncio
+import hmac
+import json
+import logging
+import os
+import time
 import uuid
 
+from pymongo import ReturnDocument
 
-def make_router(db):
+from availability import AvailabilityEngine, SeatsBooked, SlotUnavailable, parse_slot_time
+from change_feed import TOPICS as FEED_TOPICS, ChangeFeed
+from bulk_io import FORMATS as BULK_FORMATS, csv_rows, export_lines, import_rows, ndjson_rows
+from content_cache import ContentCache
+from idempotency import IdempotencyConflict, IdempotencyStore, fingerprint
+from image_variants import FORMATS, ImageNotFound, ImageVariants, iter_file, negotiate
+from locations import DEFAULT_LOCATION, LOCATION_ID, SCOPED_COLLECTIONS
+from snapshot import Snapshot, etag_matches
+from menu_pdf import MenuPdf, pdf_response
+from pagination import keyset_filter, keyset_sort, next_cursor
+from pricing import MAX_QUANTITY, PriceIndex, PricingError
+from search import SearchIndex
+from shared_snapshot import SharedSnapshotStore
+from review_stats import apply_review, rebuild_review_stats, summarize
+from write_behind import DURABILITY_FLUSH, WriteBehindClosed, WriteBehindFull, WriteBehindQueue
+
+logger = logging.getLogger(__name__)
+
+
+def make_router(
+    db,
+    cache: Optional[ContentCache] = None,
+    writer: Optional[WriteBehindQueue] = None,
+    availability: Optional[AvailabilityEngine] = None,
+    search: Optional[SearchIndex] = None,
+    shared: Optional[SharedSnapshotStore] = None,
+    images: Optional[ImageVariants] = None,
+    menu_pdf: Optional[MenuPdf] = None,
+    idempotency: Optional[IdempotencyStore] = None,
+    feed: Optional[ChangeFeed] = None,
+    admin_token: Optional[str] = None,
+):
     router = APIRouter()
+    # Routes on `scoped` serve one location: they are mounted as-is for the
+    # default location and again under /locations/{location_id}
+    scoped = APIRouter()
+    cache = cache if cache is not None else ContentCache()
+    availability = availability if availability is not None else AvailabilityEngine(db)
+    # One search index per location, so a branch's queries never score other branches' documents
+    search_indexes: Dict[str, SearchIndex] = {DEFAULT_LOCATION: search if search is not None else SearchIndex()}
+    menu_pdf = menu_pdf if menu_pdf is not None else MenuPdf()
+    idempotency = idempotency if idempotency is not None else IdempotencyStore(db)
 
     # ---------- Schemas ----------
     class MenuItem(BaseModel):
@@ -20,6 +69,10 @@ def make_router(db):
     class MenuResponse(BaseModel):
         items: List[MenuItem]
 
+    class MenuPage(BaseModel):
+        items: List[MenuItem]
+        next_cursor: Optional[str] = None
+
     class Special(BaseModel):
         name: str
         price: float
@@ -37,7 +90,30 @@ def make_router(db):
     class ReviewsResponse(BaseModel):
         items: List[Review]
 
+    class ReviewsPage(BaseModel):
+        items: List[Review]
+        next_cursor: Optional[str] = None
+
+    class ReviewCreate(BaseModel):
+        name: str
+        rating: int = Field(ge=1, le=5)
+        text: str
+        # An http(s) URL or a path on this site; never a javascript: or data: URL
+        avatar: str = Field("", max_length=500, pattern=r"^(https?://\S+|/[^/\s]\S*)?$")
+        type: Literal["customer", "blogger"] = "customer"
+
+    class TypeSummary(BaseModel):
+        count: int
+        average: float
+
+    class ReviewSummary(BaseModel):
+        count: int
+        average: float
+        histogram: Dict[str, int]
+        by_type: Dict[str, TypeSummary]
+
     class TimelineEvent(BaseModel):
+        id: str = Field(default_factory=lambda: str(uuid.uuid4()))
         year: int
         title: str
         text: str
@@ -53,6 +129,36 @@ def make_router(db):
     class Assets(BaseModel):
         menu_pdf_url: str
 
+    class Location(BaseModel):
+        id: str
+        name: str
+        address: Optional[str] = None
+
+    class LocationsResponse(BaseModel):
+        items: List[Location]
+
+    class LocationUpdate(BaseModel):
+        name: str
+        address: Optional[str] = None
+
+    class SearchHit(BaseModel):
+        kind: str
+        id: str
+        score: float
+        doc: Dict[str, Any]
+
+    class SearchResponse(BaseModel):
+        items: List[SearchHit]
+
+    class HomeBundle(BaseModel):
+        menu: Optional[MenuResponse] = None
+        chefs_choice: Optional[MenuResponse] = None
+        special: Optional[Special] = None
+        reviews: Optional[ReviewsResponse] = None
+        timeline: Optional[TimelineResponse] = None
+        video: Optional[Video] = None
+        assets: Optional[Assets] = None
+
     class ContactMessageCreate(BaseModel):
         name: str
         email: str
@@ -69,72 +175,897 @@ def make_router(db):
         name: str
         email: Optional[str] = None
         phone: Optional[str] = None
-        party_size: Optional[int] = None
+        party_size: Optional[int] = Field(None, ge=1)
         when: Optional[str] = None
         note: Optional[str] = None
 
     class BookingOut(BaseModel):
         id: str
         status: str
+        slots: Optional[List[str]] = None
+
+    class Slot(BaseModel):
+        start: str
+        capacity: int
+        remaining: int
+        bookable: Optional[bool] = None
+
+    class AvailabilityResponse(BaseModel):
+        slots: List[Slot]
+
+    class SlotCapacity(BaseModel):
+        capacity: int = Field(ge=0)
+
+    class InboxCount(BaseModel):
+        value: int
+        approximate: bool
+
+    class BookingRecord(BaseModel):
+        id: str
+        status: str
+        name: str
+        email: Optional[str] = None
+        phone: Optional[str] = None
+        party_size: Optional[int] = None
+        when: Optional[str] = None
+        note: Optional[str] = None
+        slots: Optional[List[str]] = None
+        ts: datetime
+        status_ts: Optional[datetime] = None
+
+    class BookingsInbox(BaseModel):
+        items: List[BookingRecord]
+        next_cursor: Optional[str] = None
+        count: InboxCount
+
+    class ContactMessagesInbox(BaseModel):
+        items: List[ContactMessageOut]
+        next_cursor: Optional[str] = None
+        count: InboxCount
+
+    class OrderLine(BaseModel):
+        item_id: str
+        quantity: int = Field(1, ge=1, le=MAX_QUANTITY)
+        addons: List[str] = Field(default_factory=list, max_length=10)
+
+    class QuoteRequest(BaseModel):
+        lines: List[OrderLine] = Field(min_length=1, max_length=100)
+        code: Optional[str] = Field(None, max_length=40)
+
+    class QuotedAddon(BaseModel):
+        id: str
+        name: str
+        price: float
+
+    class QuotedLine(BaseModel):
+        item_id: str
+        name: str
+        quantity: int
+        unit_price: float
+        addons: List[QuotedAddon]
+        line_total: float
+
+    class PriceAdjustment(BaseModel):
+        rule_id: str
+        name: str
+        times: int
+        amount: float
+
+    class Quote(BaseModel):
+        lines: List[QuotedLine]
+        adjustments: List[PriceAdjustment]
+        subtotal: float
+        discount: float
+        total: float
+
+    class OrderCreate(QuoteRequest):
+        name: str
+        phone: Optional[str] = None
+        email: Optional[str] = None
+        note: Optional[str] = None
+        # Total the customer was shown; the order is refused if prices changed since
+        expected_total: Optional[float] = None
+
+    class OrderOut(Quote):
+        id: str
+        status: str
+        ts: datetime
+
+    class OrderRecord(OrderOut):
+        name: str
+        phone: Optional[str] = None
+        email: Optional[str] = None
+        note: Optional[str] = None
+        code: Optional[str] = None
+
+    class OrdersInbox(BaseModel):
+        items: List[OrderRecord]
+        next_cursor: Optional[str] = None
+        count: InboxCount
+
+    class PricingRule(BaseModel):
+        id: str
+        kind: Literal["addon", "combo", "discount"]
+        name: str
+        active: bool = True
+        price: Optional[float] = Field(None, ge=0)
+        categories: List[str] = Field(default_factory=list)
+        components: List[Dict[str, str]] = Field(default_factory=list)
+        percent: Optional[float] = Field(None, gt=0, le=100)
+        amount_off: Optional[float] = Field(None, gt=0)
+        min_subtotal: Optional[float] = Field(None, ge=0)
+        code: Optional[str] = None
+
+    class PricingRules(BaseModel):
+        items: List[PricingRule]
+
+    class BookingStatusChange(BaseModel):
+        status: Literal["confirmed", "seated", "completed", "cancelled", "no_show"]
+        # Optional optimistic check: only apply if the booking is still in this status
+        expected: Optional[str] = None
+
+    # ---------- Cached snapshots ----------
+    # Each collection is validated and encoded once per cache version; requests
+    # are answered from the stored bytes (or 304 on a matching If-None-Match).
+    # With a shared store, the default location's full-collection snapshots
+    # come from the file one worker publishes for all of them, and Mongo is
+    # only read as a fallback. Location-scoped collections are cached in one
+    # partition per location, so writes to one branch leave the others warm.
+    def scope(collection: str, location: str) -> Dict[str, Any]:
+        return {"location_id": location} if collection in SCOPED_COLLECTIONS else {}
+
+    def partition(collection: str, location: str) -> Optional[str]:
+        return location if collection in SCOPED_COLLECTIONS else None
+
+    def list_body(collection: str, limit: int, model):
+        async def load(location: str = DEFAULT_LOCATION) -> bytes:
+            items = await db[collection].find(scope(collection, location), {"_id": 0}).to_list(limit)
+            return model(items=items).model_dump_json().encode()
+        return load
+
+    def one_body(collection: str, model):
+        async def load(location: str = DEFAULT_LOCATION) -> Optional[bytes]:
+            doc = await db[collection].find_one(scope(collection, location))
+            return model(**doc).model_dump_json().encode() if doc else None
+        return load
+
+    SNAPSHOT_BODIES = {
+        "menu_items": list_body("menu_items", 1000, MenuResponse),
+        "chefs_choice": list_body("chefs_choice", 100, MenuResponse),
+        "specials": one_body("specials", Special),
+        "reviews": list_body("reviews", 1000, ReviewsResponse),
+        "timeline": list_body("timeline", 1000, TimelineResponse),
+        "video": one_body("video", Video),
+        "assets": one_body("assets", Assets),
+    }
+    if shared is not None:
+        shared.attach(cache, SNAPSHOT_BODIES)
+
+    async def load_snapshot(collection: str, location: str) -> Optional[Snapshot]:
+        body = await SNAPSHOT_BODIES[collection](location)
+        return Snapshot(body) if body is not None else None
+
+    async def snapshot(collection: str, location: str = DEFAULT_LOCATION):
+        part = partition(collection, location)
+        if shared is not None and part in (None, DEFAULT_LOCATION):
+            try:
+                return shared.get(collection)
+            except KeyError:
+                pass
+        return await cache.get(collection, "snapshot", partial(load_snapshot, collection, location), partition=part)
+
+    # Unknown location ids are rejected before any content lookup; the default
+    # location is always valid, so unscoped routes never pay for the check.
+    async def known_locations():
+        async def load():
+            return frozenset([doc["id"] async for doc in db.locations.find({}, {"_id": 0, "id": 1})])
+        return await cache.get("locations", "ids", load)
+
+    async def current_location(request: Request) -> str:
+        location = request.path_params.get("location_id", DEFAULT_LOCATION)
+        if location != DEFAULT_LOCATION and location not in await known_locations():
+            raise HTTPException(status_code=404, detail="Unknown location")
+        return location
+
+    # Staff routes need `Authorization: Bearer <admin_token>`; with no token
+    # configured they are closed, not open.
+    async def require_admin(authorization: Optional[str] = Header(None)) -> None:
+        if not admin_token:
+            raise HTTPException(status_code=503, detail="Admin API not configured")
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), admin_token.encode()):
+            raise HTTPException(status_code=401, detail="Admin token required", headers={"WWW-Authenticate": "Bearer"})
+
+    ADMIN = [Depends(require_admin)]
+
+    async def invalidate(*collections: str, location: Optional[str] = None) -> None:
+        """Drop this worker's cached copies and tell the other workers (and SSE clients) through the feed."""
+        cache.bump(*collections, partition=location)
+        if feed is not None:
+            await feed.record(collections, location)
+
+    # ---------- Sparse fieldsets ----------
+    # ?fields=name,price,img becomes a Mongo projection, and the page is
+    # validated against a model holding only those fields, so neither Mongo,
+    # Pydantic nor the wire carry the long desc/text of card-grid views.
+    # Sparse models are built once per (schema, field set).
+    sparse_models: Dict[Tuple[str, Tuple[str, ...], bool], Any] = {}
+
+    def parse_fields(fields: Optional[str], model) -> Optional[Tuple[str, ...]]:
+        if not fields:
+            return None
+        names = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = sorted(names - set(model.model_fields))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        # id is always returned: clients key on it and cursors need it
+        return tuple(sorted(names | {"id"}))
+
+    def sparse_model(model, fields: Tuple[str, ...], paged: bool):
+        key = (model.__name__, fields, paged)
+        if key not in sparse_models:
+            item = create_model(
+                f"{model.__name__}Fields",
+                **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields},
+            )
+            extra = {"next_cursor": (Optional[str], None)} if paged else {}
+            sparse_models[key] = create_model(f"{model.__name__}FieldsPage", items=(List[item], ...), **extra)
+        return sparse_models[key]
+
+    def projection(fields: Optional[Tuple[str, ...]], *also: str) -> Dict[str, int]:
+        if fields is None:
+            return {"_id": 0}
+        return {"_id": 0, **{name: 1 for name in (*fields, *also)}}
+
+    async def fields_snapshot(collection: str, limit: int, model, fields: Tuple[str, ...], location: str):
+        async def load():
+            items = await db[collection].find(scope(collection, location), projection(fields)).to_list(limit)
+            return Snapshot.encode(sparse_model(model, fields, paged=False)(items=items))
+        return await cache.get(collection, ("fields", fields), load, partition=partition(collection, location))
+
+    # Inbound form submissions go through the write-behind queue when one is
+    # configured, otherwise straight to Mongo.
+    async def insert(collection: str, doc: dict, durability: Optional[str] = None):
+        if writer is None:
+            await db[collection].insert_one(doc)
+            return
+        try:
+            await writer.submit(collection, doc, durability)
+        except WriteBehindFull:
+            raise HTTPException(status_code=503, detail="Too many pending writes", headers={"Retry-After": "1"})
+        except WriteBehindClosed:
+            # Shutting down; another worker (or this one after a restart) can take it
+            raise HTTPException(status_code=503, detail="Server is shutting down", headers={"Retry-After": "1"})
+
+    # Retried submissions carrying an Idempotency-Key get the first response back
+    async def idempotent(scope: str, key: Optional[str], payload: BaseModel, response: Response, handler):
+        if not key:
+            return await handler()
+        try:
+            result, replayed = await idempotency.run(scope, key, fingerprint(payload.model_dump_json().encode()), handler)
+        except IdempotencyConflict as exc:
+            raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return result
+
+    MENU_SORTS = {"price": ("price", 1), "-price": ("price", -1), "name": ("name", 1), "-name": ("name", -1)}
+
+    async def menu_page_snapshot(location, category, max_price, sort, after, limit, fields=None):
+        field, direction = MENU_SORTS[sort]
+        page_model = sparse_model(MenuItem, fields, paged=True) if fields else MenuPage
+
+        async def load():
+            query = {"location_id": location}
+            if category is not None:
+                query["category"] = category
+            if max_price is not None:
+                query["price"] = {"$lte": max_price}
+            query.update(keyset_filter(field, direction, after))
+            # The sort field is projected even if not requested: the cursor needs it
+            cursor = db.menu_items.find(query, projection(fields, field))
+            items = await cursor.sort(keyset_sort(field, direction)).limit(limit + 1).to_list(limit + 1)
+            return Snapshot.encode(page_model(items=items, next_cursor=next_cursor(items, field, limit)))
+
+        key = ("page", category, max_price, sort, after, limit, fields)
+        return await cache.get("menu_items", key, load, partition=location)
+
+    async def reviews_page_snapshot(location, review_type, after, limit, fields=None):
+        page_model = sparse_model(Review, fields, paged=True) if fields else ReviewsPage
+
+        async def load():
+            query = {"location_id": location}
+            if review_type is not None:
+                query["type"] = review_type
+            query.update(keyset_filter("rating", -1, after))
+            cursor = db.reviews.find(query, projection(fields, "rating"))
+            items = await cursor.sort(keyset_sort("rating", -1)).limit(limit + 1).to_list(limit + 1)
+            return Snapshot.encode(page_model(items=items, next_cursor=next_cursor(items, "rating", limit)))
+
+        return await cache.get("reviews", ("page", review_type, after, limit, fields), load, partition=location)
+
+    # ---------- Search index ----------
+    # The index tracks the content-cache version of each source collection and
+    # reloads a kind when it moves (or after the collection TTL, to pick up
+    # out-of-band edits). Writes through this router update it in place instead.
+    # A reload reads the collection and builds a new index in a thread while
+    # queries keep using the old one; only a location's first build is waited
+    # for. Everything is per (kind, location).
+    SEARCH_SOURCES = {"menu_item": "menu_items", "review": "reviews"}
+    search_built: Dict[Tuple[str, str], tuple] = {}
+    search_builds: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    def search_fresh(kind: str, location: str) -> bool:
+        collection = SEARCH_SOURCES[kind]
+        built = search_built.get((kind, location))
+        return (
+            built is not None
+            and built[0] == cache.version(collection, location)
+            and time.monotonic() - built[1] < cache.ttls.get(collection, cache.default_ttl)
+        )
+
+    async def build_search(kind: str, location: str):
+        collection = SEARCH_SOURCES[kind]
+        version = cache.version(collection, location)
+        docs = await db[collection].find({"location_id": location}, {"_id": 0, "location_id": 0}).to_list(None)
+        index = await asyncio.to_thread(SearchIndex.build_kind, kind, docs)
+        search_indexes.setdefault(location, SearchIndex()).swap_kind(kind, index)
+        search_built[kind, location] = (version, time.monotonic())
+
+    def search_build_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("search: rebuilding the index failed", exc_info=task.exception())
+
+    async def ensure_search(kind: str, location: str):
+        if search_fresh(kind, location):
+            return
+        task = search_builds.get((kind, location))
+        if task is None or task.done():
+            task = search_builds[kind, location] = asyncio.ensure_future(build_search(kind, location))
+            task.add_done_callback(search_build_done)
+        if (kind, location) not in search_built:
+            await asyncio.shield(task)
 
     # ---------- Endpoints ----------
-    @router.get("/menu", response_model=MenuResponse)
-    async def get_menu():
-        items = await db.menu_items.find().to_list(1000)
-        return {"items": items}
-
-    @router.get("/chefs-choice", response_model=MenuResponse)
-    async def get_chefs_choice():
-        items = await db.chefs_choice.find().to_list(100)
-        return {"items": items}
-
-    @router.get("/special", response_model=Special)
-    async def get_special():
-        item = await db.specials.find_one({})
-        if not item:
+    @scoped.get("/menu", response_model=MenuPage)
+    async def get_menu(
+        request: Request,
+        category: Optional[str] = None,
+        max_price: Optional[float] = Query(None, ge=0),
+        sort: Optional[Literal["price", "-price", "name", "-name"]] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=100),
+        fields: Optional[str] = Query(None, max_length=200),
+        location: str = Depends(current_location),
+    ):
+        fields = parse_fields(fields, MenuItem)
+        if category is None and max_price is None and sort is None and after is None and limit is None:
+            snap = await (
+                fields_snapshot("menu_items", 1000, MenuItem, fields, location) if fields else snapshot("menu_items", location)
+            )
+        else:
+            snap = await menu_page_snapshot(location, category, max_price, sort or "name", after, limit or 24, fields)
+        return snap.response(request)
+
+    @scoped.get("/menu.pdf")
+    async def get_menu_pdf(request: Request, location: str = Depends(current_location)):
+        menu, chefs = await asyncio.gather(snapshot("menu_items", location), snapshot("chefs_choice", location))
+        # The snapshot ETags are content hashes, so the PDF re-renders only when the menu changes
+        body, etag = await menu_pdf.get(
+            (menu.etag, chefs.etag),
+            lambda: (json.loads(bytes(menu.body))["items"], json.loads(bytes(chefs.body))["items"]),
+            partition=location,
+        )
+        return pdf_response(request, body, etag)
+
+    @scoped.get("/chefs-choice", response_model=MenuResponse)
+    async def get_chefs_choice(
+        request: Request,
+        fields: Optional[str] = Query(None, max_length=200),
+        location: str = Depends(current_location),
+    ):
+        fields = parse_fields(fields, MenuItem)
+        snap = await (
+            fields_snapshot("chefs_choice", 100, MenuItem, fields, location) if fields else snapshot("chefs_choice", location)
+        )
+        return snap.response(request)
+
+    @scoped.get("/special", response_model=Special)
+    async def get_special(request: Request, location: str = Depends(current_location)):
+        snap = await snapshot("specials", location)
+        if not snap:
             raise HTTPException(status_code=404, detail="Special not set")
-        return item
+        return snap.response(request)
+
+    @scoped.get("/reviews", response_model=ReviewsPage)
+    async def get_reviews(
+        request: Request,
+        type: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=100),
+        fields: Optional[str] = Query(None, max_length=200),
+        location: str = Depends(current_location),
+    ):
+        fields = parse_fields(fields, Review)
+        if type is None and after is None and limit is None:
+            snap = await (fields_snapshot("reviews", 1000, Review, fields, location) if fields else snapshot("reviews", location))
+        else:
+            snap = await reviews_page_snapshot(location, type, after, limit or 20, fields)
+        return snap.response(request)
+
+    @scoped.post("/reviews", response_model=Review, dependencies=ADMIN)
+    async def create_review(payload: ReviewCreate, location: str = Depends(current_location)):
+        review = Review(**payload.model_dump())
+        await db.reviews.insert_one({**review.model_dump(), "location_id": location})
+        await apply_review(db, {**review.model_dump(), "location_id": location})
+        fresh = search_fresh("review", location)
+        await invalidate("reviews", location=location)
+        if fresh:
+            search_indexes[location].upsert("review", review.model_dump())
+            search_built["review", location] = (cache.version("reviews", location), search_built["review", location][1])
+        return review
+
+    @scoped.get("/reviews/summary", response_model=ReviewSummary)
+    async def get_review_summary(request: Request, location: str = Depends(current_location)):
+        async def load():
+            stats = await db.review_stats.find_one({"_id": location}) or {}
+            return Snapshot.encode(ReviewSummary(**summarize(stats)))
+
+        snap = await cache.get("reviews", "summary", load, partition=location)
+        return snap.response(request)
 
-    @router.get("/reviews", response_model=ReviewsResponse)
-    async def get_reviews():
-        items = await db.reviews.find().to_list(1000)
-        return {"items": items}
+    @scoped.post("/reviews/summary/rebuild", response_model=ReviewSummary, dependencies=ADMIN)
+    async def rebuild_review_summary(location: str = Depends(current_location)):
+        stats = await rebuild_review_stats(db, location)
+        await invalidate("reviews", location=location)
+        return summarize(stats)
 
-    @router.get("/timeline", response_model=TimelineResponse)
-    async def get_timeline():
-        items = await db.timeline.find().to_list(1000)
-        return {"items": items}
+    @scoped.get("/timeline", response_model=TimelineResponse)
+    async def get_timeline(
+        request: Request,
+        fields: Optional[str] = Query(None, max_length=200),
+        location: str = Depends(current_location),
+    ):
+        fields = parse_fields(fields, TimelineEvent)
+        snap = await (
+            fields_snapshot("timeline", 1000, TimelineEvent, fields, location) if fields else snapshot("timeline", location)
+        )
+        return snap.response(request)
 
     @router.get("/video", response_model=Video)
-    async def get_video():
-        v = await db.video.find_one({})
-        if not v:
+    async def get_video(request: Request):
+        snap = await snapshot("video")
+        if not snap:
             raise HTTPException(status_code=404, detail="Video not set")
-        return v
+        return snap.response(request)
 
     @router.get("/assets", response_model=Assets)
-    async def get_assets():
-        a = await db.assets.find_one({})
-        if not a:
+    async def get_assets(request: Request):
+        snap = await snapshot("assets")
+        if not snap:
             raise HTTPException(status_code=404, detail="Assets not set")
-        return a
+        return snap.response(request)
+
+    @scoped.get("/search", response_model=SearchResponse)
+    async def search_content(
+        q: str = Query(..., min_length=1, max_length=200),
+        kind: Optional[Literal["menu_item", "review"]] = None,
+        limit: int = Query(10, ge=1, le=50),
+        location: str = Depends(current_location),
+    ):
+        await asyncio.gather(*(ensure_search(k, location) for k in SEARCH_SOURCES if kind in (None, k)))
+        return {"items": search_indexes[location].search(q, kind=kind, limit=limit)}
+
+    # Homepage bundle: section name -> collection
+    HOME_SECTIONS = {
+        "menu": "menu_items",
+        "chefs_choice": "chefs_choice",
+        "special": "specials",
+        "reviews": "reviews",
+        "timeline": "timeline",
+        "video": "video",
+        "assets": "assets",
+    }
+
+    @scoped.get("/home", response_model=HomeBundle)
+    async def get_home(request: Request, sections: Optional[str] = None, location: str = Depends(current_location)):
+        if sections:
+            names = sorted({n.strip().replace("-", "_") for n in sections.split(",") if n.strip()})
+            unknown = [n for n in names if n not in HOME_SECTIONS]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+        else:
+            names = sorted(HOME_SECTIONS)
+
+        async def load():
+            snaps = await asyncio.gather(*(snapshot(HOME_SECTIONS[n], location) for n in names))
+            # Splice the already-encoded section bodies; nothing is re-validated.
+            parts = [b'"%s":%s' % (n.encode(), snap.body if snap else b"null") for n, snap in zip(names, snaps)]
+            return Snapshot(b"{" + b",".join(parts) + b"}")
+
+        # The bundle is current as long as every section's collection version is
+        versions = tuple(cache.version(HOME_SECTIONS[n], partition(HOME_SECTIONS[n], location)) for n in names)
+        snap = await cache.get("home", (tuple(names), versions), load, partition=location)
+        return snap.response(request)
+
+    @scoped.get("/events")
+    async def content_events(topics: Optional[str] = None, location: str = Depends(current_location)):
+        """Server-sent events telling clients when the location's menu, chef's choice or special change."""
+        if feed is None:
+            raise HTTPException(status_code=503, detail="Change feed not enabled")
+        wanted = {t.strip().replace("-", "_") for t in topics.split(",") if t.strip()} if topics else set(FEED_TOPICS)
+        unknown = sorted(wanted - set(FEED_TOPICS))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(unknown)}")
+        sub = feed.subscribe(wanted, location)
+        if sub is None:
+            raise HTTPException(status_code=503, detail="Too many subscribers", headers={"Retry-After": "5"})
+        return StreamingResponse(
+            feed.stream(sub),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @router.get("/cache/stats")
+    async def get_cache_stats():
+        return cache.stats()
+
+    @router.get("/images")
+    async def get_image(
+        request: Request,
+        src: str,
+        w: int = Query(640, ge=16, le=4096),
+        format: Literal["auto", "avif", "webp", "jpeg"] = "auto",
+    ):
+        if images is None or not images.available:
+            raise HTTPException(status_code=503, detail="Image variants not available")
+        fmt = negotiate(request.headers.get("accept"), images.formats) if format == "auto" else format
+        if fmt not in images.formats:
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+        try:
+            fh, etag = await images.open_variant(src, w, fmt)
+        except ImageNotFound:
+            raise HTTPException(status_code=404, detail="Image not found")
+        # Variant names carry the original's content hash, so the ETag only changes with the image
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+        if format == "auto":
+            headers["Vary"] = "Accept"
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            fh.close()
+            return Response(status_code=304, headers=headers)
+        headers["Content-Length"] = str(os.fstat(fh.fileno()).st_size)
+        return StreamingResponse(iter_file(fh), media_type=FORMATS[fmt], headers=headers)
 
     @router.post("/contact-messages", response_model=ContactMessageOut)
-    async def create_contact_message(payload: ContactMessageCreate):
-        out = {
-            "id": str(uuid.uuid4()),
-            "name": payload.name,
-            "email": payload.email,
-            "message": payload.message,
-            "ts": datetime.utcnow(),
-        }
-        await db.contact_messages.insert_one(out)
-        return out
-
-    @router.post("/bookings", response_model=BookingOut)
-    async def create_booking(payload: BookingCreate):
-        out = {"id": str(uuid.uuid4()), "status": "received", **payload.model_dump()}
-        await db.bookings.insert_one(out)
-        return {"id": out["id"], "status": "received"}
+    async def create_contact_message(
+        payload: ContactMessageCreate,
+        response: Response,
+        idempotency_key: Optional[str] = Header(None, max_length=255),
+    ):
+        async def handler():
+            # Millisecond precision, as Mongo stores it, so replays match the first response exactly
+            now = datetime.utcnow()
+            out = {
+                "id": str(uuid.uuid4()),
+                "name": payload.name,
+                "email": payload.email,
+                "message": payload.message,
+                "ts": now.replace(microsecond=now.microsecond // 1000 * 1000),
+            }
+            await insert("contact_messages", dict(out))
+            return out
+
+        return await idempotent("contact-messages", idempotency_key, payload, response, handler)
+
+    @scoped.post("/bookings", response_model=BookingOut)
+    async def create_booking(
+        payload: BookingCreate,
+        response: Response,
+        idempotency_key: Optional[str] = Header(None, max_length=255),
+        location: str = Depends(current_location),
+    ):
+        async def handler():
+            now = datetime.utcnow()
+            out = {
+                "id": str(uuid.uuid4()),
+                "status": "received",
+                **payload.model_dump(),
+                "ts": now.replace(microsecond=now.microsecond // 1000 * 1000),
+                "location_id": location,
+            }
+            # Bookings for a time on a slot boundary are seated against capacity;
+            # dates and free-form `when` values are still accepted as "received" for staff.
+            when = parse_slot_time(payload.when) if payload.when else None
+            if when is not None and availability.schedule.on_boundary(when):
+                if when < datetime.now():
+                    raise HTTPException(status_code=400, detail="Requested time is in the past")
+                party_size = payload.party_size if payload.party_size is not None else 2
+                try:
+                    out["slots"] = await availability.reserve(when, party_size, location)
+                except ValueError as exc:
+                    raise HTTPException(status_code=400, detail=str(exc))
+                except SlotUnavailable:
+                    raise HTTPException(status_code=409, detail="No seats available at that time")
+                out["status"] = "confirmed"
+                out["party_size"] = party_size
+            try:
+                # Seats are only handed back if the write fails, so a confirmed booking waits for its batch
+                await insert("bookings", out, DURABILITY_FLUSH if out.get("slots") else None)
+            except BaseException:
+                await availability.release(out.get("slots") or [], out["party_size"] or 0, location)
+                raise
+            return {"id": out["id"], "status": out["status"], "slots": out.get("slots")}
+
+        return await idempotent(f"bookings:{location}", idempotency_key, payload, response, handler)
+
+    @scoped.get("/availability", response_model=AvailabilityResponse)
+    async def get_availability(
+        start: date,
+        end: Optional[date] = None,
+        party_size: Optional[int] = Query(None, ge=1),
+        location: str = Depends(current_location),
+    ):
+        end = end or start
+        if end < start or end - start > timedelta(days=31):
+            raise HTTPException(status_code=400, detail="Date range must be 0-31 days")
+        return {"slots": await availability.availability(start, end, party_size, location)}
+
+    # ---------- Staff inbox ----------
+    # Newest first, keyset-paged on (ts, id) over the (status?, ts, id) indexes,
+    # so every page is an index seek however much history has accumulated.
+    BOOKING_TRANSITIONS = {
+        "received": {"confirmed", "cancelled"},
+        "confirmed": {"seated", "cancelled", "no_show"},
+        "seated": {"completed"},
+    }
+    INBOX_COUNT_CAP = 10000
+
+    def ts_range(since: Optional[datetime], until: Optional[datetime]) -> Dict[str, Any]:
+        bounds = {}
+        for op, value in (("$gte", since), ("$lt", until)):
+            if value is not None:
+                if value.tzinfo is not None:
+                    value = value.astimezone(timezone.utc).replace(tzinfo=None)
+                bounds[op] = value
+        return {"ts": bounds} if bounds else {}
+
+    async def inbox_count(collection: str, query: Dict[str, Any], location: Optional[str]):
+        async def load():
+            if not query:
+                # Collection metadata, no scan
+                return {"value": await db[collection].estimated_document_count(), "approximate": True}
+            value = await db[collection].count_documents(query, limit=INBOX_COUNT_CAP)
+            return {"value": value, "approximate": value >= INBOX_COUNT_CAP}
+        key = ("count", json.dumps(query, default=str, sort_keys=True))
+        return await cache.get(collection, key, load, partition=location)
+
+    async def inbox_page(
+        collection: str,
+        query: Dict[str, Any],
+        after: Optional[str],
+        limit: int,
+        location: Optional[str] = None,
+    ):
+        find = {**query, **keyset_filter("ts", -1, after)} if after else query
+        cursor = db[collection].find(find, {"_id": 0, "location_id": 0}).sort(keyset_sort("ts", -1)).limit(limit + 1)
+        items, count = await asyncio.gather(cursor.to_list(limit + 1), inbox_count(collection, query, location))
+        return {"items": items, "next_cursor": next_cursor(items, "ts", limit), "count": count}
+
+    @scoped.get("/admin/bookings", response_model=BookingsInbox, dependencies=ADMIN)
+    async def list_bookings(
+        status: Optional[str] = Query(None, description="Comma-separated statuses"),
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        after: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=200),
+        location: str = Depends(current_location),
+    ):
+        query = {"location_id": location, **ts_range(since, until)}
+        if status:
+            statuses = sorted({s.strip() for s in status.split(",") if s.strip()})
+            query["status"] = statuses[0] if len(statuses) == 1 else {"$in": statuses}
+        return await inbox_page("bookings", query, after, limit, location)
+
+    @router.get("/admin/contact-messages", response_model=ContactMessagesInbox, dependencies=ADMIN)
+    async def list_contact_messages(
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        after: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=200),
+    ):
+        return await inbox_page("contact_messages", ts_range(since, until), after, limit)
+
+    @scoped.post("/admin/bookings/{booking_id}/status", response_model=BookingRecord, dependencies=ADMIN)
+    async def change_booking_status(
+        booking_id: str,
+        payload: BookingStatusChange,
+        location: str = Depends(current_location),
+    ):
+        sources = [s for s, targets in BOOKING_TRANSITIONS.items() if payload.status in targets]
+        if payload.expected is not None:
+            sources = [s for s in sources if s == payload.expected]
+        now = datetime.utcnow()
+        # The status guard in the filter makes concurrent transitions race safely: only one matches
+        before = await db.bookings.find_one_and_update(
+            {"id": booking_id, "location_id": location, "status": {"$in": sources}},
+            {"$set": {"status": payload.status, "status_ts": now}},
+            projection={"_id": 0, "location_id": 0},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if before is None:
+            doc = await db.bookings.find_one({"id": booking_id, "location_id": location}, {"_id": 0, "status": 1})
+            if doc is None:
+                raise HTTPException(status_code=404, detail="Booking not found")
+            raise HTTPException(status_code=409, detail=f"Cannot move booking from {doc.get('status')} to {payload.status}")
+        if payload.status == "cancelled" and before.get("slots"):
+            await availability.release(before["slots"], before.get("party_size") or 0, location)
+        await invalidate("bookings", location=location)
+        return {**before, "status": payload.status, "status_ts": now}
+
+    # ---------- Bulk import/export ----------
+    # dataset -> (collection, row schema)
+    BULK = {
+        "menu": ("menu_items", MenuItem),
+        "reviews": ("reviews", Review),
+        "timeline": ("timeline", TimelineEvent),
+    }
+
+    @scoped.post("/admin/import/{dataset}", dependencies=ADMIN)
+    async def bulk_import(
+        request: Request,
+        dataset: Literal["menu", "reviews", "timeline"],
+        format: Optional[Literal["ndjson", "csv"]] = None,
+        location: str = Depends(current_location),
+    ):
+        collection, model = BULK[dataset]
+        if format is None:
+            format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+        rows = csv_rows(request.stream()) if format == "csv" else ndjson_rows(request.stream())
+        try:
+            summary = await import_rows(db[collection], model, rows, extra={"location_id": location})
+            if collection == "reviews" and summary["valid"]:
+                await rebuild_review_stats(db, location)
+        finally:
+            # Earlier chunks may already be written even if a later one failed
+            await invalidate(collection, location=location)
+        return summary
+
+    @scoped.get("/admin/export/{dataset}", dependencies=ADMIN)
+    async def bulk_export(
+        dataset: Literal["menu", "reviews", "timeline"],
+        format: Literal["ndjson", "csv"] = "ndjson",
+        location: str = Depends(current_location),
+    ):
+        collection, model = BULK[dataset]
+        cursor = db[collection].find({"location_id": location}, {"_id": 0}).sort("id", 1).batch_size(1000)
+        return StreamingResponse(
+            export_lines(cursor, model.model_fields, format),
+            media_type=BULK_FORMATS[format],
+            headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'},
+        )
+
+    @scoped.put("/availability/slots/{slot}", response_model=Slot, dependencies=ADMIN)
+    async def set_slot_capacity(slot: str, payload: SlotCapacity, location: str = Depends(current_location)):
+        try:
+            when = datetime.strptime(slot, "%Y-%m-%dT%H:%M")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Slot must be YYYY-MM-DDTHH:MM")
+        if when not in availability.schedule.slot_starts(when.date()):
+            raise HTTPException(status_code=404, detail="No such slot")
+        try:
+            return await availability.set_capacity(slot, payload.capacity, location)
+        except SeatsBooked as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+
+    # ---------- Orders ----------
+    # Carts are priced against a per-location PriceIndex held in the content
+    # cache under the current menu_items and pricing_rules versions, so a quote
+    # costs no Mongo reads once the index is warm, and any write to the menu or
+    # the rules is picked up by the next quote. Placing an order first checks
+    # the feed's version counters, so an order is never priced by an index
+    # another worker's rule edit has already made stale.
+    async def price_index(location: str) -> PriceIndex:
+        async def load():
+            items, rules = await asyncio.gather(
+                db.menu_items.find({"location_id": location}, {"_id": 0, "id": 1, "name": 1, "price": 1, "category": 1}).to_list(None),
+                db.pricing_rules.find({"location_id": location, "active": {"$ne": False}}, {"_id": 0}).to_list(None),
+            )
+            return PriceIndex(items, rules)
+
+        versions = (cache.version("menu_items", location), cache.version("pricing_rules", location))
+        return await cache.get("pricing", versions, load, partition=location)
+
+    async def quote_cart(payload: QuoteRequest, location: str) -> Dict[str, Any]:
+        index = await price_index(location)
+        try:
+            return index.quote([line.model_dump() for line in payload.lines], payload.code)
+        except PricingError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+    @scoped.get("/pricing/rules", response_model=PricingRules)
+    async def get_pricing_rules(request: Request, location: str = Depends(current_location)):
+        async def load():
+            items = await db.pricing_rules.find({"location_id": location}, {"_id": 0}).sort("id", 1).to_list(None)
+            return Snapshot.encode(PricingRules(items=items))
+
+        snap = await cache.get("pricing_rules", "list", load, partition=location)
+        return snap.response(request)
+
+    @scoped.put("/admin/pricing/rules/{rule_id}", response_model=PricingRule, dependencies=ADMIN)
+    async def put_pricing_rule(rule_id: str, payload: PricingRule, location: str = Depends(current_location)):
+        if payload.id != rule_id:
+            raise HTTPException(status_code=400, detail="Rule id does not match the path")
+        if payload.kind in ("addon", "combo") and payload.price is None:
+            raise HTTPException(status_code=400, detail=f"A {payload.kind} rule needs a price")
+        if payload.kind == "combo" and not all(len(c) == 1 and ("category" in c or "item_id" in c) for c in payload.components or [{}]):
+            raise HTTPException(status_code=400, detail="Combo components must each be {category} or {item_id}")
+        if payload.kind == "discount" and (payload.percent is None) == (payload.amount_off is None):
+            raise HTTPException(status_code=400, detail="A discount needs exactly one of percent or amount_off")
+        doc = payload.model_dump()
+        await db.pricing_rules.replace_one({"location_id": location, "id": rule_id}, {**doc, "location_id": location}, upsert=True)
+        await invalidate("pricing_rules", location=location)
+        return doc
+
+    @scoped.post("/orders/quote", response_model=Quote)
+    async def quote_order(payload: QuoteRequest, location: str = Depends(current_location)):
+        return await quote_cart(payload, location)
+
+    @scoped.post("/orders", response_model=OrderOut)
+    async def create_order(
+        payload: OrderCreate,
+        response: Response,
+        idempotency_key: Optional[str] = Header(None, max_length=255),
+        location: str = Depends(current_location),
+    ):
+        async def handler():
+            if feed is not None:
+                await feed.refresh(("menu_items", "pricing_rules"), location)
+            quote = await quote_cart(payload, location)
+            if payload.expected_total is not None and abs(payload.expected_total - quote["total"]) >= 0.005:
+                raise HTTPException(status_code=409, detail=f"Prices changed: the total is now {quote['total']:.2f}")
+            now = datetime.utcnow()
+            out = {
+                "id": str(uuid.uuid4()),
+                "status": "received",
+                **quote,
+                "ts": now.replace(microsecond=now.microsecond // 1000 * 1000),
+            }
+            customer = payload.model_dump(include={"name", "phone", "email", "note", "code"})
+            # Batched with other inbound writes, but acknowledged only once it is in Mongo
+            await insert("orders", {**out, **customer, "location_id": location}, DURABILITY_FLUSH)
+            return out
+
+        return await idempotent(f"orders:{location}", idempotency_key, payload, response, handler)
+
+    @scoped.get("/admin/orders", response_model=OrdersInbox, dependencies=ADMIN)
+    async def list_orders(
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        after: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=200),
+        location: str = Depends(current_location),
+    ):
+        return await inbox_page("orders", {"location_id": location, **ts_range(since, until)}, after, limit, location)
+
+    # ---------- Locations ----------
+    @router.get("/locations", response_model=LocationsResponse)
+    async def list_locations(request: Request):
+        async def load():
+            items = await db.locations.find({}, {"_id": 0}).sort("id", 1).to_list(None)
+            return Snapshot.encode(LocationsResponse(items=items))
+
+        snap = await cache.get("locations", "list", load)
+        return snap.response(request)
+
+    @router.put("/admin/locations/{location_id}", response_model=Location, dependencies=ADMIN)
+    async def put_location(location_id: str, payload: LocationUpdate):
+        if not LOCATION_ID.match(location_id):
+            raise HTTPException(status_code=400, detail="Location id must be a lowercase slug (a-z, 0-9, -)")
+        doc = {"id": location_id, **payload.model_dump()}
+        await db.locations.replace_one({"id": location_id}, doc, upsert=True)
+        await invalidate("locations")
+        return doc
 
+    router.include_router(scoped)
+    router.include_router(scoped, prefix="/locations/{location_id}")
     return router
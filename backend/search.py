@@ -0,0 +1,162 @@
+import bisect
+import heapq
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# In-memory inverted index over menu items and reviews. Query tokens match
+# index terms exactly, by prefix ("truf" -> "truffle") or, failing those, by
+# trigram similarity for typos ("trufle" -> "truffle"). Everything is plain
+# dict/set lookups so queries stay well under a millisecond for catalog-sized data.
+
+# Field weights per document kind
+FIELDS = {
+    "menu_item": {"name": 3.0, "category": 1.5, "desc": 1.0},
+    "review": {"text": 1.0, "name": 0.5},
+}
+PREFIX_FACTOR = 0.7
+TYPO_FACTOR = 0.5
+TYPO_MIN_SIMILARITY = 0.4
+MAX_EXPANSIONS = 50
+
+
+def tokenize(text: str) -> List[str]:
+    # Fold accents so "jalapeño" matches "jalapeno"
+    folded = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower()
+    return re.findall(r"[a-z0-9]+", folded)
+
+
+def trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _KindIndex:
+    """Postings, vocabulary and trigram index for one document kind."""
+
+    def __init__(self, fields: Dict[str, float]):
+        self.fields = fields
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.terms: List[str] = []  # sorted vocabulary, for prefix ranges
+        self.trigrams: Dict[str, Set[str]] = defaultdict(set)
+
+    def upsert(self, doc: Dict[str, Any]) -> None:
+        id_ = doc["id"]
+        self.remove(id_)
+        weights: Dict[str, float] = defaultdict(float)
+        for field, weight in self.fields.items():
+            for term in tokenize(str(doc.get(field) or "")):
+                weights[term] += weight
+        for term, weight in weights.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                bisect.insort(self.terms, term)
+                for gram in trigrams(term):
+                    self.trigrams[gram].add(term)
+            postings[id_] = weight
+        self.doc_terms[id_] = tuple(weights)
+        self.docs[id_] = {k: v for k, v in doc.items() if k != "_id"}
+
+    def remove(self, id_: str) -> None:
+        for term in self.doc_terms.pop(id_, ()):
+            postings = self.postings[term]
+            postings.pop(id_, None)
+            if not postings:
+                del self.postings[term]
+                del self.terms[bisect.bisect_left(self.terms, term)]
+                for gram in trigrams(term):
+                    self.trigrams[gram].discard(term)
+        self.docs.pop(id_, None)
+
+    def expand(self, token: str) -> List[Tuple[str, float]]:
+        """Index terms a query token matches, with a match-quality factor."""
+        matches: Dict[str, float] = {}
+        if token in self.postings:
+            matches[token] = 1.0
+        if len(token) >= 2:
+            i = bisect.bisect_left(self.terms, token)
+            while i < len(self.terms) and len(matches) < MAX_EXPANSIONS and self.terms[i].startswith(token):
+                matches.setdefault(self.terms[i], PREFIX_FACTOR)
+                i += 1
+        if not matches and len(token) >= 3:
+            grams = trigrams(token)
+            shared: Dict[str, int] = defaultdict(int)
+            for gram in grams:
+                for term in self.trigrams.get(gram, ()):
+                    shared[term] += 1
+            for term, count in shared.items():
+                similarity = count / (len(grams) + len(trigrams(term)) - count)
+                if similarity >= TYPO_MIN_SIMILARITY:
+                    matches[term] = TYPO_FACTOR * similarity
+        return list(matches.items())
+
+    def score(self, tokens: List[str]) -> Dict[str, float]:
+        total = len(self.docs)
+        scores: Dict[str, float] = defaultdict(float)
+        matched: Dict[str, int] = defaultdict(int)
+        for token in tokens:
+            best: Dict[str, float] = {}
+            for term, factor in self.expand(token):
+                postings = self.postings[term]
+                boost = factor * math.log(1 + total / len(postings))
+                if not best:
+                    best = {id_: boost * weight for id_, weight in postings.items()}
+                    continue
+                for id_, weight in postings.items():
+                    score = boost * weight
+                    if score > best.get(id_, 0.0):
+                        best[id_] = score
+            if len(tokens) == 1:
+                return best
+            for id_, score in best.items():
+                scores[id_] += score
+                matched[id_] += 1
+        # Documents matching every query token rank ahead of partial matches
+        return {id_: score * (matched[id_] / len(tokens)) ** 2 for id_, score in scores.items()}
+
+
+class SearchIndex:
+    def __init__(self):
+        self._kinds = {kind: _KindIndex(fields) for kind, fields in FIELDS.items()}
+
+    def __len__(self) -> int:
+        return sum(len(k.docs) for k in self._kinds.values())
+
+    def upsert(self, kind: str, doc: Dict[str, Any]) -> None:
+        self._kinds[kind].upsert(doc)
+
+    def remove(self, kind: str, id_: str) -> None:
+        self._kinds[kind].remove(id_)
+
+    @staticmethod
+    def build_kind(kind: str, docs: Iterable[Dict[str, Any]]) -> _KindIndex:
+        """A new index of one kind. It shares nothing with live indexes, so it can be built in a thread."""
+        index = _KindIndex(FIELDS[kind])
+        for doc in docs:
+            index.upsert(doc)
+        return index
+
+    def swap_kind(self, kind: str, index: _KindIndex) -> None:
+        self._kinds[kind] = index
+
+    def replace_kind(self, kind: str, docs: Iterable[Dict[str, Any]]) -> None:
+        self.swap_kind(kind, self.build_kind(kind, docs))
+
+    def search(self, query: str, kind: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        candidates = []
+        for name, index in self._kinds.items():
+            if kind is None or kind == name:
+                candidates.extend(((name, id_), score) for id_, score in index.score(tokens).items())
+        ranked = heapq.nlargest(limit, candidates, key=lambda kv: kv[1])
+        return [
+            {"kind": name, "id": id_, "score": round(score, 4), "doc": self._kinds[name].docs[id_]}
+            for (name, id_), score in ranked
+        ]
@@ -1,5 +1,20 @@
+import asyncio
+import itertools
+import logging
+import random
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from locations import DEFAULT_LOCATION, LOCATION_ID, SCOPED_COLLECTIONS
+from review_stats import rebuild_review_stats
+
+# Generated from the live menu by GET /api/menu.pdf
+MENU_PDF_URL = "/api/menu.pdf"
+LEGACY_MENU_PDF_URL = "https://www.w3.org/WAI/ER/tests/xhtml/testfiles/resources/pdf/dummy.pdf"
 
 # Seed data matching the current frontend mock
 
@@ -42,18 +57,29 @@ def seed_data_dict():
     ]
 
     timeline = [
-        {"year": 2015, "title": "First Oven", "text": "Started with a tiny backyard oven and neighborhood tastings.", "img": IMAGES["heroChef"]},
-        {"year": 2018, "title": "Pop-up Nights", "text": "Weekend pop-ups grew a loyal base; perfected slow-fermented dough.", "img": IMAGES["pizzaClose2"]},
-        {"year": 2021, "title": "Rony’s Pizza Hub", "text": "Opened our cozy hub in Andheri West with a wood-fired oven.", "img": IMAGES["heroFire"]},
-        {"year": 2024, "title": "30+ Varieties", "text": "Seasonal specials, collabs, and chef’s tasting menus.", "img": IMAGES["pizzaClose1"]},
-        {"year": 2025, "title": "Community Favorite", "text": "1000+ happy customers and counting.", "img": IMAGES["garlicBread"]},
+        {"id": str(uuid.uuid4()), "year": 2015, "title": "First Oven", "text": "Started with a tiny backyard oven and neighborhood tastings.", "img": IMAGES["heroChef"]},
+        {"id": str(uuid.uuid4()), "year": 2018, "title": "Pop-up Nights", "text": "Weekend pop-ups grew a loyal base; perfected slow-fermented dough.", "img": IMAGES["pizzaClose2"]},
+        {"id": str(uuid.uuid4()), "year": 2021, "title": "Rony’s Pizza Hub", "text": "Opened our cozy hub in Andheri West with a wood-fired oven.", "img": IMAGES["heroFire"]},
+        {"id": str(uuid.uuid4()), "year": 2024, "title": "30+ Varieties", "text": "Seasonal specials, collabs, and chef’s tasting menus.", "img": IMAGES["pizzaClose1"]},
+        {"id": str(uuid.uuid4()), "year": 2025, "title": "Community Favorite", "text": "1000+ happy customers and counting.", "img": IMAGES["garlicBread"]},
     ]
 
     special = {"name": "Wood-Fired Burrata Margherita", "price": 529, "desc": "Silky burrata on blistered San Marzano base, basil oil drizzle.", "img": IMAGES["pizzaClose1"]}
 
     video = {"url": "https://www.youtube.com/embed/3AAdKl1UYZs", "caption": "From dough to fire — a peek into our wood-fired ritual."}
 
-    assets = {"menu_pdf_url": "https://www.w3.org/WAI/ER/tests/xhtml/testfiles/resources/pdf/dummy.pdf"}
+    assets = {"menu_pdf_url": MENU_PDF_URL}
+
+    # Add-ons, combos and discounts applied when pricing orders (see pricing)
+    pricing_rules = [
+        {"id": "extra-cheese", "kind": "addon", "name": "Extra cheese", "price": 49, "categories": ["classic", "specials"], "active": True},
+        {"id": "jalapenos", "kind": "addon", "name": "Jalapeños", "price": 39, "categories": ["classic", "specials"], "active": True},
+        {"id": "pizza-side-drink", "kind": "combo", "name": "Pizza + side + drink", "price": 449, "active": True,
+         "components": [{"category": "classic"}, {"category": "sides"}, {"category": "drinks"}]},
+        {"id": "party-10", "kind": "discount", "name": "10% off orders over Rs 1500", "percent": 10, "min_subtotal": 1500, "active": True},
+    ]
+
+    location = {"id": DEFAULT_LOCATION, "name": "Rony’s Pizza Hub", "address": "Andheri West, Mumbai"}
 
     return {
         "menu_items": menu_items,
@@ -63,27 +89,464 @@ def seed_data_dict():
         "special": special,
         "video": video,
         "assets": assets,
+        "pricing_rules": pricing_rules,
+        "location": location,
     }
 
 
+# Bump SEED_VERSION whenever seed data or INDEXES change so existing databases
+# pick the change up on the next start. Databases already at this version skip
+# seeding with a single read of the marker document.
+SEED_VERSION = 8
+SEED_LOCK_TTL = 60.0
+# The seeding worker renews its lease this often, so a long backfill on a large
+# database never lets another worker steal the lock and seed concurrently
+SEED_LOCK_RENEW = SEED_LOCK_TTL / 4
+BACKFILL_BATCH = 1000
+
+# Location-scoped collections lead every index with location_id (see locations).
+# Content ids are unique per location, not globally: a branch's import may reuse
+# another branch's ids. Those indexes are named explicitly so they never collide
+# with the non-unique (location_id, id) indexes of v6/v7, which are dropped.
+LOCATION_ID_UNIQUE = IndexModel([("location_id", 1), ("id", 1)], unique=True, name="location_id_1_id_1_unique")
+
+INDEXES = {
+    "locations": [
+        IndexModel("id", unique=True),
+    ],
+    "menu_items": [
+        # Bulk imports upsert on (location_id, id); admin exports stream a location in id order
+        LOCATION_ID_UNIQUE,
+        # Keyset pagination on /api/menu sorts on (field, id), optionally within a category
+        IndexModel([("location_id", 1), ("category", 1), ("price", 1), ("id", 1)]),
+        IndexModel([("location_id", 1), ("category", 1), ("name", 1), ("id", 1)]),
+        IndexModel([("location_id", 1), ("price", 1), ("id", 1)]),
+        IndexModel([("location_id", 1), ("name", 1), ("id", 1)]),
+    ],
+    "chefs_choice": [
+        IndexModel("location_id"),
+    ],
+    "specials": [
+        IndexModel("location_id"),
+    ],
+    "reviews": [
+        LOCATION_ID_UNIQUE,
+        # Type-filtered review pages sort on (rating desc, id desc)
+        IndexModel([("location_id", 1), ("type", 1), ("rating", -1), ("id", -1)]),
+        IndexModel([("location_id", 1), ("rating", -1), ("id", -1)]),
+    ],
+    "timeline": [
+        LOCATION_ID_UNIQUE,
+    ],
+    # Staff inbox pages newest first on (ts, id), optionally by status
+    "bookings": [
+        IndexModel([("location_id", 1), ("ts", -1), ("id", -1)]),
+        IndexModel([("location_id", 1), ("status", 1), ("ts", -1), ("id", -1)]),
+        IndexModel("id"),
+    ],
+    "contact_messages": [
+        IndexModel([("ts", -1), ("id", -1)]),
+    ],
+    # Staff order list, newest first like the inbox
+    "orders": [
+        IndexModel([("location_id", 1), ("ts", -1), ("id", -1)]),
+        IndexModel("id", unique=True),
+    ],
+    "pricing_rules": [
+        IndexModel([("location_id", 1), ("id", 1)], unique=True),
+    ],
+    # The single-field timestamp index is the TTL index (see ensure_ttl_index)
+    "status_checks": [
+        IndexModel([("client_name", 1), ("timestamp", -1)]),
+    ],
+}
+
+# Pre-location (v5) indexes, and the global unique ids of v7, superseded by the ones above
+LEGACY_INDEXES = {
+    "menu_items": [
+        "category_1", "category_1_price_1_id_1", "category_1_name_1_id_1", "price_1_id_1", "name_1_id_1",
+        "id_1", "location_id_1_id_1",
+    ],
+    "reviews": ["type_1", "type_1_rating_-1_id_-1", "rating_-1_id_-1", "id_1", "location_id_1_id_1"],
+    "timeline": ["id_1", "location_id_1_id_1"],
+    "bookings": ["ts_-1_id_-1", "status_1_ts_-1_id_-1"],
+}
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_ttl_index(collection, field, seconds):
+    """Create or retune a TTL index on ``field`` so documents expire ``seconds`` after it."""
+    try:
+        await collection.create_index(field, expireAfterSeconds=seconds)
+    except OperationFailure as exc:
+        # IndexOptionsConflict: the index exists with another retention
+        if exc.code != 85:
+            raise
+        await collection.database.command(
+            "collMod", collection.name, index={"keyPattern": {field: 1}, "expireAfterSeconds": seconds}
+        )
+
+
+def _located(name, doc, location=DEFAULT_LOCATION):
+    return {**doc, "location_id": location} if name in SCOPED_COLLECTIONS else doc
+
+
+async def _seed_many(db, name, docs):
+    if await db[name].count_documents({}, limit=1) == 0:
+        await db[name].insert_many([_located(name, doc) for doc in docs])
+
+
+async def _seed_one(db, name, doc):
+    if not await db[name].find_one({}, {"_id": 1}):
+        await db[name].insert_one(_located(name, doc))
+
+
+async def _seed_location(db, doc):
+    await db.locations.update_one({"id": doc["id"]}, {"$setOnInsert": doc}, upsert=True)
+
+
+async def _backfill_locations(db):
+    # Documents written before v6 belong to the original restaurant
+    await asyncio.gather(*(
+        db[name].update_many({"location_id": {"$exists": False}}, {"$set": {"location_id": DEFAULT_LOCATION}})
+        for name in SCOPED_COLLECTIONS
+    ))
+
+
+async def _drop_legacy_indexes(db):
+    for name, indexes in LEGACY_INDEXES.items():
+        existing = await db[name].index_information()
+        for index in indexes:
+            if index in existing:
+                await db[name].drop_index(index)
+
+
+async def _seed_assets(db, doc):
+    await _seed_one(db, "assets", doc)
+    # Databases seeded before v3 still point at the placeholder PDF
+    await db.assets.update_one({"menu_pdf_url": LEGACY_MENU_PDF_URL}, {"$set": {"menu_pdf_url": MENU_PDF_URL}})
+
+
+async def _backfill(collection, query, values):
+    """$set ``values(doc)`` on every document matching ``query``, BACKFILL_BATCH updates per round trip."""
+    ops = []
+    async for doc in collection.find(query, {"_id": 1}):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": values(doc)}))
+        if len(ops) >= BACKFILL_BATCH:
+            await collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        await collection.bulk_write(ops, ordered=False)
+
+
+async def _seed_timeline(db, docs):
+    await _seed_many(db, "timeline", docs)
+    # Timeline events seeded before v4 have no id to upsert on
+    await _backfill(db.timeline, {"id": {"$exists": False}}, lambda doc: {"id": str(uuid.uuid4())})
+
+
+async def _backfill_booking_ts(db):
+    # Bookings written before v5 have no ts; their ObjectId holds the insert time
+    await _backfill(
+        db.bookings, {"ts": {"$exists": False}}, lambda doc: {"ts": doc["_id"].generation_time.replace(tzinfo=None)}
+    )
+
+
+async def _seed_reviews(db, docs):
+    await _seed_many(db, "reviews", docs)
+    if not await db.review_stats.find_one({"_id": DEFAULT_LOCATION}, {"_id": 1}):
+        await rebuild_review_stats(db)
+    # Before v6 the stats lived in a single "global" document
+    await db.review_stats.delete_one({"_id": "global"})
+
+
+async def _acquire_seed_lock(db, owner):
+    """Take the cross-worker seed lock, stealing it if its holder's lease expired."""
+    now = time.time()
+    lease = {"owner": owner, "expires_at": now + SEED_LOCK_TTL}
+    try:
+        await db.seed_meta.insert_one({"_id": "lock", **lease})
+        return True
+    except DuplicateKeyError:
+        stolen = await db.seed_meta.find_one_and_update(
+            {"_id": "lock", "expires_at": {"$lt": now}}, {"$set": lease}
+        )
+        return stolen is not None
+
+
+async def _renew_seed_lock(db, owner):
+    while True:
+        await asyncio.sleep(SEED_LOCK_RENEW)
+        renewed = await db.seed_meta.update_one(
+            {"_id": "lock", "owner": owner}, {"$set": {"expires_at": time.time() + SEED_LOCK_TTL}}
+        )
+        if not renewed.matched_count:
+            logger.warning("seed: lost the seed lock to another worker")
+            return
+
+
+async def _seeded(db):
+    marker = await db.seed_meta.find_one({"_id": "version"})
+    return bool(marker) and marker.get("version", 0) >= SEED_VERSION
+
+
 async def seed_if_empty(db):
-    data = seed_data_dict()
-
-    if await db.menu_items.count_documents({}) == 0:
-        await db.menu_items.insert_many(data["menu_items"])  # type: ignore
-    if await db.chefs_choice.count_documents({}) == 0:
-        await db.chefs_choice.insert_many(data["chefs_choice"])  # type: ignore
-    if await db.reviews.count_documents({}) == 0:
-        await db.reviews.insert_many(data["reviews"])  # type: ignore
-    if not await db.specials.find_one({}):
-        await db.specials.insert_one(data["special"])  # type: ignore
-    if not await db.video.find_one({}):
-        await db.video.insert_one(data["video"])  # type: ignore
-    if not await db.assets.find_one({}):
-        await db.assets.insert_one(data["assets"])  # type: ignore
-    if await db.timeline.count_documents({}) == 0:
-        await db.timeline.insert_many(data["timeline"])  # type: ignore
-
-    # Ensure indexes (simple ones)
-    await db.menu_items.create_index("category")
-    await db.reviews.create_index("type")
+    started = time.perf_counter()
+    if await _seeded(db):
+        logger.info("seed: up to date (v%d), skipped in %.1fms", SEED_VERSION, (time.perf_counter() - started) * 1000)
+        return
+
+    # Workers starting together race for the lock; losers wait for the winner's
+    # marker instead of seeding the same collections concurrently.
+    owner = str(uuid.uuid4())
+    while not await _acquire_seed_lock(db, owner):
+        await asyncio.sleep(0.25)
+        if await _seeded(db):
+            logger.info("seed: completed by another worker, waited %.1fms", (time.perf_counter() - started) * 1000)
+            return
+
+    renewal = asyncio.ensure_future(_renew_seed_lock(db, owner))
+    try:
+        if await _seeded(db):
+            return
+        data = seed_data_dict()
+
+        phase = time.perf_counter()
+        await _backfill_locations(db)
+        await asyncio.gather(
+            _seed_location(db, data["location"]),
+            _seed_many(db, "pricing_rules", data["pricing_rules"]),
+            _seed_many(db, "menu_items", data["menu_items"]),
+            _seed_many(db, "chefs_choice", data["chefs_choice"]),
+            _seed_reviews(db, data["reviews"]),
+            _seed_timeline(db, data["timeline"]),
+            _seed_one(db, "specials", data["special"]),
+            _seed_one(db, "video", data["video"]),
+            _seed_assets(db, data["assets"]),
+            _backfill_booking_ts(db),
+        )
+        logger.info("seed: data phase %.1fms", (time.perf_counter() - phase) * 1000)
+
+        phase = time.perf_counter()
+        await _drop_legacy_indexes(db)
+        await asyncio.gather(*(db[name].create_indexes(models) for name, models in INDEXES.items()))
+        logger.info("seed: index phase %.1fms", (time.perf_counter() - phase) * 1000)
+
+        await db.seed_meta.replace_one(
+            {"_id": "version"},
+            {"version": SEED_VERSION, "seeded_at": datetime.utcnow()},
+            upsert=True,
+        )
+        logger.info("seed: v%d done in %.1fms", SEED_VERSION, (time.perf_counter() - started) * 1000)
+    finally:
+        renewal.cancel()
+        await db.seed_meta.delete_one({"_id": "lock", "owner": owner})
+
+
+# ---------- Synthetic datasets ----------
+# Deterministic, production-sized data for capacity tests and query-plan checks.
+# Documents are generated lazily from seed_data_dict() templates and streamed to
+# Mongo in insert_many batches, so memory stays flat regardless of volume.
+
+SYNTHETIC_KINDS = ("menu_items", "reviews", "bookings", "contact_messages", "status_checks")
+
+_ADJECTIVES = ["Smoky", "Double", "Loaded", "Rustic", "Fiery", "Garden", "Royal", "Classic", "Midnight", "Golden"]
+_SURNAMES = ["A.", "B.", "D.", "G.", "J.", "K.", "M.", "N.", "P.", "R.", "S.", "T.", "V."]
+_FIRST_NAMES = ["Aarav", "Ananya", "Diya", "Ishaan", "Kabir", "Meera", "Neha", "Rahul", "Riya", "Rohan", "Sana", "Vikram"]
+_REVIEW_TAILS = ["Will be back!", "Service was quick.", "A bit pricey.", "Perfect for groups.", "Crust was on point."]
+_CLIENTS = ["uptime-pinger", "frontend", "healthcheck", "ops-dashboard"]
+
+
+def _rng_uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _synthetic_menu_items(rng, count, templates):
+    for i in range(count):
+        base = templates["menu_items"][i % len(templates["menu_items"])]
+        adjective = _ADJECTIVES[(i // len(templates["menu_items"])) % len(_ADJECTIVES)]
+        round_no = i // (len(templates["menu_items"]) * len(_ADJECTIVES))
+        yield {
+            "id": _rng_uuid(rng),
+            "name": f"{adjective} {base['name']}" + (f" {round_no + 1}" if round_no else ""),
+            "price": max(49, round(base["price"] * rng.uniform(0.8, 1.3) / 10) * 10 - 1),
+            "category": base["category"],
+            "img": base["img"],
+            "desc": base["desc"],
+        }
+
+
+def _synthetic_reviews(rng, count, templates):
+    for _ in range(count):
+        base = rng.choice(templates["reviews"])
+        blogger = rng.random() < 0.15
+        yield {
+            "id": _rng_uuid(rng),
+            "name": f"{rng.choice(_FIRST_NAMES)} {rng.choice(_SURNAMES)}",
+            "rating": rng.choices([5, 4, 3, 2, 1], weights=[55, 25, 10, 6, 4])[0],
+            "text": f"{base['text']} {rng.choice(_REVIEW_TAILS)}",
+            "avatar": f"https://i.pravatar.cc/100?img={rng.randint(1, 70)}",
+            "type": "blogger" if blogger else "customer",
+        }
+
+
+def _synthetic_bookings(rng, count, start):
+    for _ in range(count):
+        name = rng.choice(_FIRST_NAMES)
+        day = start + timedelta(days=rng.randint(0, 365))
+        yield {
+            "id": _rng_uuid(rng),
+            "status": "received",
+            "name": f"{name} {rng.choice(_SURNAMES)}",
+            "email": f"{name.lower()}{rng.randint(1, 9999)}@example.com",
+            "phone": f"+91 9{rng.randint(100000000, 999999999)}",
+            "party_size": rng.choices([2, 3, 4, 5, 6, 8], weights=[40, 15, 25, 8, 8, 4])[0],
+            "when": f"{day:%Y-%m-%d}T{rng.randint(12, 21):02d}:{rng.choice(['00', '30'])}",
+            "note": None,
+            # Booked between an hour and two weeks ahead
+            "ts": day - timedelta(minutes=rng.randint(60, 14 * 24 * 60)),
+        }
+
+
+def _synthetic_contact_messages(rng, count, start):
+    for _ in range(count):
+        name = rng.choice(_FIRST_NAMES)
+        yield {
+            "id": _rng_uuid(rng),
+            "name": name,
+            "email": f"{name.lower()}{rng.randint(1, 9999)}@example.com",
+            "message": rng.choice(_REVIEW_TAILS),
+            "ts": start + timedelta(seconds=rng.randint(0, 365 * 86400)),
+        }
+
+
+def _synthetic_status_checks(rng, count, start):
+    # Evenly spaced like the uptime pinger, with a little jitter
+    for i in range(count):
+        yield {
+            "id": _rng_uuid(rng),
+            "client_name": rng.choice(_CLIENTS),
+            "timestamp": start + timedelta(seconds=i * 30 + rng.randint(0, 5)),
+        }
+
+
+def synthetic_documents(kind, count, seed=0, start=None, location=DEFAULT_LOCATION):
+    """Yield ``count`` deterministic documents of ``kind``; the same seed yields the same documents.
+
+    Timestamps are laid out from ``start``, which defaults to a point relative to
+    now (see _synthetic_start) so TTL indexes don't expire the data on load.
+    """
+    if start is None:
+        start = _synthetic_start(kind, count)
+    if kind in SCOPED_COLLECTIONS:
+        return (_located(kind, doc, location) for doc in _synthetic(kind, count, seed, start, location))
+    return _synthetic(kind, count, seed, start, location)
+
+
+def _synthetic_start(kind, count):
+    now = datetime.utcnow().replace(microsecond=0)
+    if kind == "status_checks":
+        # The newest check lands about now; only checks older than the
+        # retention window (STATUS_RETENTION_DAYS) are left for the TTL monitor
+        return now - timedelta(seconds=count * 30 + 5)
+    if kind == "bookings":
+        # Half the year's bookings are still upcoming
+        return now - timedelta(days=182)
+    return now - timedelta(days=365)
+
+
+def _synthetic(kind, count, seed, start, location):
+    # Other branches get their own ids (the default keeps its pre-location stream)
+    rng = random.Random(f"{seed}:{kind}" if location == DEFAULT_LOCATION else f"{seed}:{kind}:{location}")
+    if kind == "menu_items":
+        return _synthetic_menu_items(rng, count, seed_data_dict())
+    if kind == "reviews":
+        return _synthetic_reviews(rng, count, seed_data_dict())
+    if kind == "bookings":
+        return _synthetic_bookings(rng, count, start)
+    if kind == "contact_messages":
+        return _synthetic_contact_messages(rng, count, start)
+    if kind == "status_checks":
+        return _synthetic_status_checks(rng, count, start)
+    raise ValueError(f"unknown synthetic kind {kind!r}")
+
+
+def batched(docs, size):
+    docs = iter(docs)
+    while True:
+        batch = list(itertools.islice(docs, size))
+        if not batch:
+            return
+        yield batch
+
+
+async def bulk_load(collection, docs, batch_size=5000, concurrency=4):
+    """Stream ``docs`` into ``collection`` with at most ``concurrency`` insert_many calls in flight."""
+    inflight = set()
+    loaded = 0
+    for batch in batched(docs, batch_size):
+        if len(inflight) >= concurrency:
+            done, inflight = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                loaded += task.result()
+        inflight.add(asyncio.ensure_future(_insert_batch(collection, batch)))
+    for task in asyncio.as_completed(inflight):
+        loaded += await task
+    return loaded
+
+
+async def _insert_batch(collection, batch):
+    await collection.insert_many(batch, ordered=False)
+    return len(batch)
+
+
+async def load_synthetic(db, volumes, seed=0, batch_size=5000, concurrency=4, location=DEFAULT_LOCATION):
+    """Load ``{kind: count}`` synthetic documents into ``db``; returns per-kind timings."""
+    report = {}
+    await _seed_location(db, {"id": location, "name": location.replace("-", " ").title()})
+    for kind, count in volumes.items():
+        started = time.perf_counter()
+        docs = synthetic_documents(kind, count, seed, location=location)
+        loaded = await bulk_load(db[kind], docs, batch_size, concurrency)
+        elapsed = time.perf_counter() - started
+        report[kind] = {"count": loaded, "seconds": round(elapsed, 3)}
+        logger.info("synthetic: %d %s in %.1fs (%.0f docs/s)", loaded, kind, elapsed, loaded / elapsed if elapsed else 0)
+    if "reviews" in volumes:
+        await rebuild_review_stats(db, location)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    from pathlib import Path
+
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / ".env")
+    parser = argparse.ArgumentParser(description="Load a deterministic synthetic dataset into Mongo.")
+    parser.add_argument("volumes", nargs="+", help="kind=count pairs, e.g. menu_items=50000 reviews=1000000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--location", default=DEFAULT_LOCATION, help="location_id for menu items, reviews and bookings")
+    parser.add_argument("--db", default=os.environ.get("DB_NAME"))
+    args = parser.parse_args()
+
+    volumes = {}
+    for pair in args.volumes:
+        kind, _, count = pair.partition("=")
+        if kind not in SYNTHETIC_KINDS or not count.isdigit():
+            parser.error(f"expected kind=count with kind in {', '.join(SYNTHETIC_KINDS)}, got {pair!r}")
+        volumes[kind] = int(count)
+    if not LOCATION_ID.match(args.location):
+        parser.error(f"invalid location id {args.location!r}")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    mongo = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    try:
+        print(asyncio.run(load_synthetic(mongo[args.db], volumes, args.seed, args.batch_size, args.concurrency, args.location)))
+    finally:
+        mongo.close()
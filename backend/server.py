@@ -1,4 +1,5 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -6,12 +7,23 @@ import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 import uuid
-from datetime import datetime
+import json
+from datetime import datetime, timezone
 
-from seed import seed_if_empty
+from seed import ensure_ttl_index, seed_if_empty
 from routes_content import make_router
+from content_cache import ContentCache
+from write_behind import WriteBehindQueue
+from shared_snapshot import SharedSnapshotStore
+from image_variants import ImageVariants
+from menu_pdf import MenuPdf
+from idempotency import IdempotencyStore
+from change_feed import ChangeFeed
+from admission import AdmissionControl, AdmissionMiddleware
+from traffic_capture import CaptureMiddleware, TrafficRecorder
+from metrics import MetricsMiddleware, MongoCommandMetrics, MongoPoolMetrics, registry as metrics_registry
 
 
 ROOT_DIR = Path(__file__).parent
@@ -19,7 +31,7 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandMetrics(), MongoPoolMetrics()])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
@@ -50,18 +62,165 @@ async def create_status_check(input: StatusCheckCreate):
     _ = await db.status_checks.insert_one(status_obj.dict())
     return status_obj
 
+def status_query(since: Optional[datetime], until: Optional[datetime], client_name: Optional[str]):
+    # Timestamps are stored as naive UTC; normalise aware bounds to match
+    def naive_utc(dt):
+        return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
+
+    query = {}
+    if client_name is not None:
+        query["client_name"] = client_name
+    if since is not None or until is not None:
+        query["timestamp"] = {}
+        if since is not None:
+            query["timestamp"]["$gte"] = naive_utc(since)
+        if until is not None:
+            query["timestamp"]["$lt"] = naive_utc(until)
+    return query
+
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+async def get_status_checks(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    client_name: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=1000),
+):
+    # Newest first, served from the (client_name, timestamp) / timestamp indexes
+    cursor = db.status_checks.find(status_query(since, until, client_name), {"_id": 0})
+    return await cursor.sort("timestamp", -1).limit(limit).to_list(limit)
+
+@api_router.get("/status/export")
+async def export_status_checks(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    client_name: Optional[str] = None,
+):
+    cursor = db.status_checks.find(status_query(since, until, client_name), {"_id": 0}).sort("timestamp", 1).batch_size(1000)
+
+    async def lines():
+        # One document per line, straight off the cursor; nothing is buffered
+        async for doc in cursor:
+            doc["timestamp"] = doc["timestamp"].isoformat()
+            yield json.dumps(doc, separators=(",", ":")) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 # Mount business content routes
-content_router = make_router(db)
+# Entries are partitioned per location, so size the cache with the number of branches
+content_cache = ContentCache(max_entries=int(os.environ.get('CONTENT_CACHE_ENTRIES', '4096')))
+# Optional write-behind batching for contact messages and bookings
+write_behind = None
+if os.environ.get('WRITE_BEHIND', '').lower() in ('1', 'true', 'yes'):
+    write_behind = WriteBehindQueue(
+        db,
+        max_batch=int(os.environ.get('WRITE_BEHIND_BATCH', '500')),
+        max_delay=float(os.environ.get('WRITE_BEHIND_DELAY_MS', '50')) / 1000,
+        max_queue=int(os.environ.get('WRITE_BEHIND_QUEUE', '10000')),
+        durability=os.environ.get('WRITE_BEHIND_DURABILITY', 'flush'),
+    )
+# Workers started with the same SHARED_SNAPSHOT_PATH share one published copy of the content snapshots
+shared_snapshot = None
+if os.environ.get('SHARED_SNAPSHOT_PATH'):
+    shared_snapshot = SharedSnapshotStore(
+        os.environ['SHARED_SNAPSHOT_PATH'],
+        interval=float(os.environ.get('SHARED_SNAPSHOT_INTERVAL', '5')),
+    )
+image_variants = ImageVariants(
+    os.environ.get('IMAGE_ORIGINALS_DIR', str(ROOT_DIR / 'images')),
+    os.environ.get('IMAGE_CACHE_DIR', str(ROOT_DIR / '.image_cache')),
+    max_bytes=int(os.environ.get('IMAGE_CACHE_MB', '256')) * 1024 * 1024,
+    workers=int(os.environ['IMAGE_WORKERS']) if os.environ.get('IMAGE_WORKERS') else None,
+)
+menu_pdf = MenuPdf()
+change_feed = ChangeFeed(
+    db,
+    content_cache,
+    poll_interval=float(os.environ.get('CHANGE_FEED_POLL_SECONDS', '2')),
+    heartbeat=float(os.environ.get('CHANGE_FEED_HEARTBEAT_SECONDS', '15')),
+    max_subscribers=int(os.environ.get('MAX_EVENT_STREAMS', '10000')),
+)
+idempotency = IdempotencyStore(
+    db,
+    max_entries=int(os.environ.get('IDEMPOTENCY_LRU_SIZE', '10000')),
+    pending_lease=float(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', '30')),
+)
+content_router = make_router(
+    db,
+    content_cache,
+    write_behind,
+    shared=shared_snapshot,
+    images=image_variants,
+    menu_pdf=menu_pdf,
+    idempotency=idempotency,
+    feed=change_feed,
+    admin_token=os.environ.get('ADMIN_TOKEN'),
+)
 api_router.include_router(content_router)
 
+metrics_registry.add_collector("content_cache", content_cache.stats)
+if write_behind is not None:
+    metrics_registry.add_collector("write_behind", write_behind.stats)
+metrics_registry.add_collector("image_variants", image_variants.stats)
+metrics_registry.add_collector("idempotency", idempotency.stats)
+metrics_registry.add_collector("change_feed", change_feed.stats)
+if shared_snapshot is not None:
+    metrics_registry.add_collector("shared_snapshot", shared_snapshot.stats)
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Admission control: per-method concurrency pools (reads and writes are separate
+# so throttled writes can't starve cached GETs), shared pools for slow reads, and
+# per-client token buckets on public POSTs.
+write_rate = float(os.environ.get('WRITE_RATE_PER_SEC', '5'))
+write_burst = float(os.environ.get('WRITE_BURST', '20'))
+admission = AdmissionControl(
+    concurrency={
+        "GET": int(os.environ.get('MAX_CONCURRENT_READS', '512')),
+        "POST": int(os.environ.get('MAX_CONCURRENT_WRITES', '64')),
+        "PUT": int(os.environ.get('MAX_CONCURRENT_WRITES', '64')),
+        # Event streams stay open indefinitely; keep them out of the read pool (the feed caps them itself)
+        "GET /api/events": int(os.environ.get('MAX_EVENT_STREAMS', '10000')),
+        "exports": int(os.environ.get('MAX_CONCURRENT_EXPORTS', '4')),
+        "heavy": int(os.environ.get('MAX_CONCURRENT_HEAVY_READS', '16')),
+    },
+    pools={
+        "GET /api/status/export": "exports",
+        "GET /api/admin/export/menu": "exports",
+        "GET /api/admin/export/reviews": "exports",
+        "GET /api/admin/export/timeline": "exports",
+        "GET /api/search": "heavy",
+        "GET /api/menu.pdf": "heavy",
+    },
+    rates={
+        "POST /api/contact-messages": (write_rate, write_burst),
+        "POST /api/bookings": (write_rate, write_burst),
+        "POST /api/orders": (write_rate, write_burst),
+        "POST /api/reviews": (write_rate, write_burst),
+        "POST /api/status": (write_rate, write_burst),
+    },
+    client_header=os.environ.get('ADMISSION_CLIENT_HEADER'),
+)
+metrics_registry.add_collector("admission", admission.stats)
+# Innermost, so CORS headers still wrap 429/503 responses
+app.add_middleware(AdmissionMiddleware, control=admission)
+
+# Sampled request traces for backend_replay.py; off unless TRAFFIC_CAPTURE_PATH is set.
+# Outside admission control so shed requests are part of the recorded mix.
+traffic_recorder = None
+if os.environ.get('TRAFFIC_CAPTURE_PATH'):
+    traffic_recorder = TrafficRecorder(
+        os.environ['TRAFFIC_CAPTURE_PATH'],
+        sample=float(os.environ.get('TRAFFIC_CAPTURE_SAMPLE', '0.01')),
+        max_bytes=int(os.environ.get('TRAFFIC_CAPTURE_MAX_MB', '256')) * 1024 * 1024,
+    )
+    metrics_registry.add_collector("traffic_capture", traffic_recorder.stats)
+    app.add_middleware(CaptureMiddleware, recorder=traffic_recorder)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -69,6 +228,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added last so it wraps everything, including CORS
+app.add_middleware(MetricsMiddleware)
 
 # Configure logging
 logging.basicConfig(
@@ -80,7 +241,29 @@ logger = logging.getLogger(__name__)
 @app.on_event("startup")
 async def startup_seed():
     await seed_if_empty(db)
+    # Status checks come from the uptime pinger; keep only the retention window
+    retention_days = float(os.environ.get('STATUS_RETENTION_DAYS', '30'))
+    await ensure_ttl_index(db.status_checks, "timestamp", int(retention_days * 86400))
+    # Idempotency keys only need to outlive client retries
+    idempotency_hours = float(os.environ.get('IDEMPOTENCY_TTL_HOURS', '24'))
+    await ensure_ttl_index(db.idempotency_keys, "created_at", int(idempotency_hours * 3600))
+    if write_behind is not None:
+        write_behind.start()
+    if shared_snapshot is not None:
+        shared_snapshot.start()
+    await change_feed.start()
+    if traffic_recorder is not None:
+        traffic_recorder.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if traffic_recorder is not None:
+        await traffic_recorder.stop()
+    await change_feed.stop()
+    if shared_snapshot is not None:
+        await shared_snapshot.stop()
+    image_variants.close()
+    menu_pdf.close()
+    if write_behind is not None:
+        await write_behind.close()
     client.close()
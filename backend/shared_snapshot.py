@@ -0,0 +1,234 @@
+import asyncio
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from content_cache import ContentCache
+from locations import DEFAULT_LOCATION, SCOPED_COLLECTIONS
+from snapshot import Snapshot, make_etag
+
+logger = logging.getLogger(__name__)
+
+# Cross-worker content snapshot. One worker (whoever holds an flock on
+# ``<path>.lock``) loads the content collections from Mongo, encodes them and
+# publishes a single versioned file; every worker mmaps that file and serves the
+# encoded bodies straight from the shared page cache. Mongo read load for
+# content is then one refresh per interval, regardless of the worker count.
+#
+# A refresh only reads and JSON-encodes the bodies; sections whose ETag is
+# unchanged are carried over from the current file as they are, and only the
+# changed ones are compressed (at the best levels) and written out, on a
+# worker thread. Writes through the API mark their collection dirty with a
+# per-collection file, which the publisher checks every poll to refresh just
+# that collection right away.
+#
+# File layout: MAGIC | u64 version | u32 header length | JSON header | blobs.
+# The header maps collection -> {etag, body/gzip/br: [offset, length] | null},
+# or null for single-document collections that are unset. Offsets are relative
+# to the end of the header.
+
+MAGIC = b"PZSNAP1\0"
+_PREFIX = struct.Struct("<8sQI")
+
+# Loads one collection's encoded response body (None for an unset single document)
+Source = Callable[[], Awaitable[Optional[bytes]]]
+
+
+class SharedSnapshotStore:
+    def __init__(self, path: str, interval: float = 5.0, poll: float = 0.5):
+        self.path = path
+        self.interval = interval
+        self.poll = poll
+        self.cache: Optional[ContentCache] = None
+        self.sources: Dict[str, Source] = {}
+        self.version = 0
+        self.published = 0
+        self._map: Optional[mmap.mmap] = None
+        self._stat = None
+        self._sections: Dict[str, Optional[Snapshot]] = {}
+        self._lock_fd: Optional[int] = None
+        self._last_refresh = 0.0
+        self._checked = 0.0
+        self._dirty_seen: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def attach(self, cache: ContentCache, sources: Dict[str, Source]) -> None:
+        """Wire in the router's cache and its direct-from-Mongo body loaders."""
+        self.cache = cache
+        self.sources = sources
+        # A write in any worker asks the publisher to refresh now rather than at the next interval
+        cache.add_listener(self._mark_dirty)
+
+    @property
+    def is_publisher(self) -> bool:
+        return self._lock_fd is not None
+
+    # ---------- Reading ----------
+    def get(self, collection: str):
+        """The shared snapshot for ``collection``: a Snapshot, None (unset) or KeyError if not published."""
+        # The background task remaps every poll; requests only check when it's overdue
+        if self._map is None or time.monotonic() - self._checked >= self.poll:
+            self._remap()
+        return self._sections[collection]
+
+    def _remap(self) -> None:
+        self._checked = time.monotonic()
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if self._stat is not None and (st.st_ino, st.st_mtime_ns) == self._stat:
+            return
+        with open(self.path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_len = _PREFIX.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            logger.warning("shared snapshot %s has a bad magic number, ignoring", self.path)
+            return
+        base = _PREFIX.size + header_len
+        header = json.loads(mapped[_PREFIX.size:base])
+        view = memoryview(mapped)
+
+        def part(span):
+            return view[base + span[0]:base + span[0] + span[1]] if span else None
+
+        sections = {
+            name: Snapshot.from_parts(part(s["body"]), part(s["gzip"]), part(s["br"]), s["etag"]) if s else None
+            for name, s in header["sections"].items()
+        }
+        changed = [
+            name for name, snap in sections.items()
+            if name not in self._sections or _etag(self._sections[name]) != _etag(snap)
+        ]
+        # The previous mapping stays alive for as long as responses still reference its views
+        self._map, self._sections, self.version = mapped, sections, version
+        self._stat = (st.st_ino, st.st_mtime_ns)
+        # Only the default location is published, so only its partition goes stale
+        if self.cache is not None:
+            for name in changed:
+                partition = DEFAULT_LOCATION if name in SCOPED_COLLECTIONS else None
+                self.cache.bump(name, partition=partition, notify=False)
+
+    # ---------- Publishing ----------
+    def _try_lead(self) -> None:
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return
+        self._lock_fd = fd
+        logger.info("shared snapshot: pid %d is the publisher for %s", os.getpid(), self.path)
+
+    def _mark_dirty(self, collections) -> None:
+        for name in collections:
+            if name in self.sources:
+                with open(f"{self.path}.dirty.{name}", "a"):
+                    os.utime(f"{self.path}.dirty.{name}")
+
+    def _dirty(self) -> Set[str]:
+        dirty = set()
+        for name in self.sources:
+            try:
+                mtime = os.stat(f"{self.path}.dirty.{name}").st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if self._dirty_seen.get(name) != mtime:
+                self._dirty_seen[name] = mtime
+                dirty.add(name)
+        return dirty
+
+    async def publish(self, names: Optional[Iterable[str]] = None) -> None:
+        """Reload ``names`` (default: every source) and publish a new file if any of them changed."""
+        names = list(self.sources if names is None else names)
+        bodies = await asyncio.gather(*(self.sources[n]() for n in names))
+        self._last_refresh = time.monotonic()
+        current = dict(self._sections)
+        changed = {
+            n: body for n, body in zip(names, bodies)
+            if n not in current or _etag(current[n]) != (make_etag(body) if body is not None else None)
+        }
+        if not changed and os.path.exists(self.path):
+            return
+        await asyncio.to_thread(self._write, current, changed)
+        self.published += 1
+        self._remap()
+
+    def _write(self, current: Dict[str, Optional[Snapshot]], changed: Dict[str, Optional[bytes]]) -> None:
+        snaps = {name: current.get(name) for name in self.sources}
+        for name, body in changed.items():
+            snaps[name] = Snapshot(body, best=True) if body is not None else None
+
+        blobs: List[bytes] = []
+        offset = 0
+        sections = {}
+        for name, snap in snaps.items():
+            if snap is None:
+                sections[name] = None
+                continue
+            entry = {"etag": snap.etag}
+            for variant in ("body", "gzip", "br"):
+                data = getattr(snap, variant)
+                entry[variant] = [offset, len(data)] if data is not None else None
+                if data is not None:
+                    blobs.append(data)
+                    offset += len(data)
+            sections[name] = entry
+
+        version = self.version + 1
+        header = json.dumps({"version": version, "created": time.time(), "sections": sections}).encode()
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, version, len(header)))
+            f.write(header)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp, self.path)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if not self.is_publisher:
+                    self._try_lead()
+                if self.is_publisher:
+                    if time.monotonic() - self._last_refresh >= self.interval:
+                        self._dirty()  # a full refresh covers the pending marks
+                        await self.publish()
+                    else:
+                        dirty = self._dirty()
+                        if dirty:
+                            await self.publish(dirty)
+                self._remap()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("shared snapshot refresh failed")
+            await asyncio.sleep(self.poll)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def stats(self):
+        return {"version": self.version, "published": self.published, "publisher": int(self.is_publisher)}
+
+
+def _etag(snap: Optional[Snapshot]) -> Optional[str]:
+    return snap.etag if snap is not None else None
@@ -0,0 +1,146 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+try:
+    import brotli
+except ImportError:  # optional: fall back to gzip-only variants
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# (gzip level, brotli quality). Snapshots are built on cache misses, on the
+# event loop, so they are compressed at FAST levels first: a 300 KB menu costs
+# ~12ms instead of ~1.4s at brotli 11. Bodies of UPGRADE_MIN_BYTES or more are
+# then recompressed at BEST levels on a single background thread and the
+# variants swapped in place; the body and ETag never change.
+FAST = (6, 5)
+BEST = (9, 11)
+UPGRADE_MIN_BYTES = 4096
+
+_upgrader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-compress")
+
+
+class Snapshot:
+    """A response body encoded once, with precompressed variants and a strong ETag.
+
+    Content routes cache these instead of raw documents so a hit skips
+    Pydantic validation, JSON encoding and compression entirely.
+    ``best=True`` compresses at BEST levels right away; only do that off the event loop.
+    """
+
+    __slots__ = ("body", "gzip", "br", "etag", "media_type", "__weakref__")
+
+    def __init__(self, body: bytes, media_type: str = "application/json", best: bool = False):
+        self.body = body
+        self.media_type = media_type
+        self.etag = make_etag(body)
+        self.gzip, self.br = _compress(body, BEST if best else FAST)
+        if not best and len(body) >= UPGRADE_MIN_BYTES:
+            _schedule_upgrade(self)
+
+    def upgrade(self) -> None:
+        """Recompress at BEST levels. Blocking; runs on the background thread."""
+        gz, br = _compress(self.body, BEST)
+        # Plain attribute stores: a response in flight keeps whichever variant it already read
+        if gz is not None:
+            self.gzip = gz
+        if br is not None:
+            self.br = br
+
+    @classmethod
+    def encode(cls, model: BaseModel) -> "Snapshot":
+        return cls(model.model_dump_json().encode())
+
+    @classmethod
+    def from_parts(cls, body, gzip, br, etag: str, media_type: str = "application/json") -> "Snapshot":
+        """Rebuild a snapshot from stored variants (bytes or memoryviews) without recompressing."""
+        snap = cls.__new__(cls)
+        snap.body, snap.gzip, snap.br, snap.etag, snap.media_type = body, gzip, br, etag, media_type
+        return snap
+
+    def response(self, request: Request) -> Response:
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=headers)
+
+        # Variants may be memoryviews over a shared mapping (see shared_snapshot);
+        # bytes() copies those per response and is a no-op for plain bytes.
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        if self.br is not None and "br" in accepted:
+            headers["Content-Encoding"] = "br"
+            return Response(bytes(self.br), media_type=self.media_type, headers=headers)
+        if self.gzip is not None and "gzip" in accepted:
+            headers["Content-Encoding"] = "gzip"
+            return Response(bytes(self.gzip), media_type=self.media_type, headers=headers)
+        return Response(bytes(self.body), media_type=self.media_type, headers=headers)
+
+
+def make_etag(body: bytes) -> str:
+    return '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def _smaller(compressed: bytes, body: bytes) -> Optional[bytes]:
+    return compressed if len(compressed) < len(body) else None
+
+
+def _compress(body: bytes, levels: Tuple[int, int]) -> Tuple[Optional[bytes], Optional[bytes]]:
+    gz = _smaller(gzip.compress(body, compresslevel=levels[0], mtime=0), body)
+    br = _smaller(brotli.compress(body, quality=levels[1]), body) if brotli else None
+    return gz, br
+
+
+def _schedule_upgrade(snap: Snapshot) -> None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # No event loop to protect (scripts, the shared snapshot publisher's thread)
+        snap.upgrade()
+        return
+    ref = weakref.ref(snap)
+
+    def run():
+        # Snapshots replaced before their turn (a burst of writes) are skipped
+        target = ref()
+        if target is not None:
+            target.upgrade()
+
+    future = loop.run_in_executor(_upgrader, run)
+    future.add_done_callback(_log_failure)
+
+
+def _log_failure(future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("snapshot recompression failed", exc_info=future.exception())
+
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag == etag or tag == "W/" + etag:
+            return True
+    return False
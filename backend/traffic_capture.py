@@ -0,0 +1,260 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import random
+import re
+import socket
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger(__name__)
+
+# Sampled request traces for replaying realistic traffic (see backend_replay.py).
+# A sampled request is recorded after it completes as one compact JSON line:
+#   {"t": arrival epoch seconds, "m": method, "r": route template, "p": path,
+#    "q": query shape, "b": body shape, "h": {accept, accept-encoding},
+#    "k": 1 if it carried an Idempotency-Key, "s": status, "d": server ms}
+# Lines are buffered in memory and appended as gzip members every few seconds
+# from a worker thread, so the request path only pays for a dict and a list
+# append. Each start writes a header line {"v", "sample", "host", "pid"}; the
+# reader applies it to the records that follow, so a file can span restarts
+# with different sample rates.
+#
+# Bodies are kept as shapes, not content: strings become "~<length>" unless
+# the key is an id or an enum the replay needs verbatim (KEEP_KEYS); numbers,
+# booleans and structure are kept. Non-JSON bodies (imports, uploads) are
+# recorded by size only and are not replayable. Query strings get the same
+# treatment as [[name, shape], ...] pairs: paging, filter and format parameters
+# are kept (QUERY_KEEP_KEYS), free text such as search terms and names is not,
+# and keyset cursors are dropped since they point into the captured data.
+
+FORMAT_VERSION = 2
+KEEP_KEYS = frozenset({
+    "item_id", "addons", "quantity", "party_size", "when", "rating", "type", "status",
+    "kind", "code", "category", "categories", "expected", "expected_total", "components", "active",
+})
+QUERY_KEEP_KEYS = KEEP_KEYS | {
+    "limit", "sort", "fields", "sections", "max_price", "start", "end", "since", "until", "format", "w", "src",
+}
+QUERY_DROP_KEYS = frozenset({"after"})
+MAX_BODY = 64 * 1024
+_PLACEHOLDER = re.compile(r"^~(\d+)$")
+_LOCATION_SCOPE = re.compile(r"^/api/locations/[^/]+(?=/)")
+
+
+def body_shape(value: Any, key: Optional[str] = None) -> Any:
+    if isinstance(value, dict):
+        return {k: body_shape(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [body_shape(v, key) for v in value]
+    if isinstance(value, str) and key not in KEEP_KEYS:
+        return f"~{len(value)}"
+    return value
+
+
+def query_shape(query_string: str) -> List[List[str]]:
+    return [
+        [k, v if k in QUERY_KEEP_KEYS else f"~{len(v)}"]
+        for k, v in parse_qsl(query_string, keep_blank_values=True)
+        if k not in QUERY_DROP_KEYS
+    ]
+
+
+def expand_shape(shape: Any) -> Any:
+    """A request body with the shape's structure, numbers and kept values, and filler strings."""
+    if isinstance(shape, dict):
+        return {k: expand_shape(v) for k, v in shape.items()}
+    if isinstance(shape, list):
+        return [expand_shape(v) for v in shape]
+    if isinstance(shape, str):
+        match = _PLACEHOLDER.match(shape)
+        if match:
+            return "x" * int(match.group(1))
+    return shape
+
+
+class TrafficRecorder:
+    """Sampling decision, buffer and file writer shared by every CaptureMiddleware built from it."""
+
+    def __init__(
+        self,
+        path: str,
+        sample: float = 0.01,
+        flush_interval: float = 5.0,
+        max_buffer: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+        exclude: Iterable[str] = ("/api/events", "/api/metrics"),
+    ):
+        # "{pid}" keeps workers from interleaving gzip members in one file
+        self.path = path.replace("{pid}", str(os.getpid()))
+        self.sample = sample
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_bytes = max_bytes
+        self.exclude = tuple(exclude)
+        self.recorded = 0
+        self.dropped = 0
+        self.written_bytes = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._header = {
+            "v": FORMAT_VERSION, "sample": sample, "host": socket.gethostname(), "pid": os.getpid(),
+            "started": round(time.time(), 3),
+        }
+        self._header_written = False
+
+    def should_sample(self, path: str) -> bool:
+        if self.sample <= 0 or _LOCATION_SCOPE.sub("/api", path, count=1).startswith(self.exclude):
+            return False
+        return self.sample >= 1 or random.random() < self.sample
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        if len(self._buffer) >= self.max_buffer or self.written_bytes >= self.max_bytes:
+            self.dropped += 1
+            return
+        self._buffer.append(entry)
+        self.recorded += 1
+
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        lines = [] if self._header_written else [self._header]
+        lines.extend(entries)
+        data = "".join(json.dumps(line, separators=(",", ":")) + "\n" for line in lines).encode()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "ab") as fh:
+            fh.write(gzip.compress(data))
+            self.written_bytes = fh.tell()
+        self._header_written = True
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        entries, self._buffer = self._buffer, []
+        try:
+            await asyncio.to_thread(self._write, entries)
+        except OSError:
+            logger.exception("traffic capture: writing %s failed, dropped %d records", self.path, len(entries))
+            self.dropped += len(entries)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        logger.info("traffic capture: sampling %.2f%% of requests to %s", self.sample * 100, self.path)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "buffered": len(self._buffer),
+            "written_bytes": self.written_bytes,
+        }
+
+
+class CaptureMiddleware:
+    """Pure ASGI middleware recording a sample of requests into a TrafficRecorder."""
+
+    def __init__(self, app, recorder: TrafficRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.recorder.should_sample(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        arrived = time.time()
+        started = time.perf_counter()
+        status = {"code": 500}
+        body = bytearray()
+        size = 0
+
+        async def receive_wrapper():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size <= MAX_BODY:
+                    body.extend(chunk)
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", ())}
+            route = scope.get("route")
+            entry: Dict[str, Any] = {
+                "t": round(arrived, 3),
+                "m": scope["method"],
+                "r": getattr(route, "path", None) or "<unmatched>",
+                "p": scope["path"],
+                "s": status["code"],
+                "d": round((time.perf_counter() - started) * 1000, 2),
+            }
+            if scope.get("query_string"):
+                query = query_shape(scope["query_string"].decode("latin-1"))
+                if query:
+                    entry["q"] = query
+            kept = {k: headers[k] for k in ("accept", "accept-encoding") if k in headers}
+            if kept:
+                entry["h"] = kept
+            if "idempotency-key" in headers:
+                entry["k"] = 1
+            if size:
+                entry.update(_body_entry(bytes(body), size, headers.get("content-type", "")))
+            self.recorder.record(entry)
+
+
+def _body_entry(body: bytes, size: int, content_type: str) -> Dict[str, Any]:
+    media_type = content_type.split(";")[0].strip().lower()
+    if size <= MAX_BODY and (media_type == "application/json" or media_type.endswith("+json")):
+        try:
+            return {"b": body_shape(json.loads(body))}
+        except ValueError:
+            pass
+    return {"bl": size, "ct": media_type}
+
+
+def read_capture(paths: Iterable[str]) -> Iterator[Tuple[float, Dict[str, Any]]]:
+    """(sample rate, record) for every record in the capture files, in file order."""
+    for path in paths:
+        sample = 1.0
+        with open(path, "rb") as fh:
+            compressed = fh.read(2) == b"\x1f\x8b"
+        with (gzip.open if compressed else open)(path, "rt") as fh:
+            lines = iter(fh)
+            while True:
+                try:
+                    line = next(lines)
+                except StopIteration:
+                    break
+                except (EOFError, gzip.BadGzipFile):
+                    # A worker killed mid-flush leaves a truncated last member
+                    logger.warning("traffic capture: %s ends in a truncated block", path)
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if "v" in entry:
+                    sample = float(entry.get("sample") or 1.0)
+                    continue
+                yield sample, entry
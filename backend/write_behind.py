@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_ENQUEUE = "enqueue"  # ack once the document is queued
+DURABILITY_FLUSH = "flush"  # ack once the batch holding it is written
+_STOP = object()
+
+
+class WriteBehindFull(Exception):
+    """Raised when the queue stays full for longer than the enqueue timeout."""
+
+
+class WriteBehindClosed(Exception):
+    """Raised when a document is submitted before start() or after close()."""
+
+
+class WriteBehindQueue:
+    """Coalesces single-document inserts into per-collection insert_many batches.
+
+    A batch is flushed when it reaches ``max_batch`` documents or ``max_delay``
+    seconds after its first document arrived, whichever comes first. The queue
+    is bounded; producers wait up to ``enqueue_timeout`` for room and then get
+    WriteBehindFull so the caller can shed load instead of piling up.
+    """
+
+    def __init__(
+        self,
+        db,
+        max_batch: int = 500,
+        max_delay: float = 0.05,
+        max_queue: int = 10000,
+        enqueue_timeout: float = 1.0,
+        durability: str = DURABILITY_FLUSH,
+    ):
+        if durability not in (DURABILITY_ENQUEUE, DURABILITY_FLUSH):
+            raise ValueError(f"unknown durability {durability!r}")
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.enqueue_timeout = enqueue_timeout
+        self.durability = durability
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, collection: str, doc: Dict[str, Any], durability: Optional[str] = None) -> None:
+        if self._closed or self._task is None:
+            raise WriteBehindClosed("write-behind queue is not running")
+        durability = durability or self.durability
+        done = asyncio.get_running_loop().create_future() if durability == DURABILITY_FLUSH else None
+        try:
+            await asyncio.wait_for(self._queue.put((collection, dict(doc), done)), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            raise WriteBehindFull(f"write-behind queue full ({self._queue.maxsize} pending)")
+        if done is not None:
+            await done
+
+    async def close(self) -> None:
+        """Stop accepting documents, flush everything queued and wait for the worker."""
+        if self._task is None or self._closed:
+            return
+        self._closed = True
+        await self._queue.put(_STOP)
+        await self._task
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        getter: Optional[asyncio.Future] = None
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(self._queue.get())
+            item = await getter
+            getter = None
+            if item is _STOP:
+                return
+
+            batch = [item]
+            stop = False
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    # Keep a pending getter across batches rather than cancelling
+                    # it, so a document arriving at the deadline is never dropped.
+                    getter = asyncio.ensure_future(self._queue.get())
+                    done, _ = await asyncio.wait({getter}, timeout=remaining)
+                    if not done:
+                        break
+                    item = getter.result()
+                    getter = None
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if stop:
+                return
+
+    async def _flush(self, batch: List[Tuple[str, Dict[str, Any], Optional[asyncio.Future]]]) -> None:
+        groups = defaultdict(list)
+        for collection, doc, done in batch:
+            groups[collection].append((doc, done))
+        for collection, entries in groups.items():
+            errors: Dict[int, Exception] = {}
+            try:
+                await self.db[collection].insert_many([doc for doc, _ in entries], ordered=False)
+            except BulkWriteError as exc:
+                # Unordered: every document without a write error was inserted
+                for error in exc.details.get("writeErrors", []):
+                    cls = DuplicateKeyError if error.get("code") == 11000 else WriteError
+                    errors[error["index"]] = cls(error.get("errmsg"), error.get("code"), error)
+                if exc.details.get("writeConcernErrors"):
+                    # Inserted but not acknowledged as durable; nothing can be confirmed
+                    errors = dict.fromkeys(range(len(entries)), exc)
+                logger.error("write-behind flush into %s: %d of %d docs failed", collection, len(errors), len(entries))
+            except Exception as exc:
+                errors = dict.fromkeys(range(len(entries)), exc)
+                logger.exception("write-behind flush of %d docs into %s failed", len(entries), collection)
+            self.failed += len(errors)
+            self.written += len(entries) - len(errors)
+            for i, (_, done) in enumerate(entries):
+                if done is None or done.done():
+                    continue
+                if i in errors:
+                    done.set_exception(errors[i])
+                else:
+                    done.set_result(None)
+            self.batches += 1
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+In-process benchmark for Rony's Pizza Hub API.
+
+Drives the real FastAPI app from backend/server.py through an ASGI transport
+(no network, no uvicorn) against an in-memory Mongo stand-in (mongomock-motor)
+or a local mongod, and reports per-endpoint p50/p95/p99 latency and throughput.
+
+    python backend_bench.py                          # in-memory Mongo, concurrency 16
+    python backend_bench.py --concurrency 1 4 16 64  # concurrency sweep
+    python backend_bench.py --mongo-url mongodb://localhost:27017
+    python backend_bench.py --save bench/baseline.json
+    python backend_bench.py --compare bench/baseline.json --threshold 0.2
+    python backend_bench.py --only search order_quote events
+
+Admin routes are called with $ADMIN_TOKEN (a throwaway token is set when it is
+unset). /api/images is served from a generated original unless
+IMAGE_ORIGINALS_DIR is set. "events" measures the time to the first SSE event.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+
+def endpoints(item_id="unknown"):
+    """(name, method, path, params, body) for every API route; bytes bodies are sent raw.
+
+    ``item_id`` is a menu item of the benchmarked database, for the order routes.
+    Method "SSE" opens an event stream and reads its first event.
+    """
+    day = (date.today() + timedelta(days=7)).isoformat()
+    cart = {"lines": [{"item_id": item_id, "quantity": 2}, {"item_id": item_id, "quantity": 1}]}
+    # Upserts the same rows every time, so the timeline doesn't grow during the run
+    timeline_rows = "".join(
+        json.dumps({"id": f"bench-{i}", "year": 2000 + i, "title": "Bench", "text": "Benchmark row", "img": ""}) + "\n"
+        for i in range(20)
+    ).encode()
+    return [
+        ("root", "GET", "/api/", None, None),
+        ("menu", "GET", "/api/menu", None, None),
+        ("menu_filtered", "GET", "/api/menu", {"category": "classic", "sort": "price", "limit": 5}, None),
+        ("chefs_choice", "GET", "/api/chefs-choice", None, None),
+        ("special", "GET", "/api/special", None, None),
+        ("reviews", "GET", "/api/reviews", None, None),
+        ("reviews_paged", "GET", "/api/reviews", {"type": "customer", "limit": 10}, None),
+        ("reviews_summary", "GET", "/api/reviews/summary", None, None),
+        ("timeline", "GET", "/api/timeline", None, None),
+        ("video", "GET", "/api/video", None, None),
+        ("assets", "GET", "/api/assets", None, None),
+        ("home", "GET", "/api/home", None, None),
+        ("availability", "GET", "/api/availability", {"start": day, "party_size": 2}, None),
+        ("search", "GET", "/api/search", {"q": "margherita"}, None),
+        ("search_typo", "GET", "/api/search", {"q": "margarita chese"}, None),
+        ("image", "GET", "/api/images", {"src": "bench.jpg", "w": 480, "format": "jpeg"}, None),
+        ("menu_pdf", "GET", "/api/menu.pdf", None, None),
+        ("pricing_rules", "GET", "/api/pricing/rules", None, None),
+        ("events", "SSE", "/api/events", None, None),
+        ("inbox_bookings", "GET", "/api/admin/bookings", {"limit": 50}, None),
+        ("inbox_contact", "GET", "/api/admin/contact-messages", {"limit": 50}, None),
+        ("inbox_orders", "GET", "/api/admin/orders", {"limit": 50}, None),
+        ("export_menu", "GET", "/api/admin/export/menu", {"format": "ndjson"}, None),
+        ("export_timeline_csv", "GET", "/api/admin/export/timeline", {"format": "csv"}, None),
+        ("order_quote", "POST", "/api/orders/quote", None, cart),
+        ("status_list", "GET", "/api/status", None, None),
+        ("status_create", "POST", "/api/status", None, {"client_name": "bench"}),
+        ("contact_create", "POST", "/api/contact-messages", None,
+         {"name": "Bench", "email": "bench@example.com", "message": "Benchmark message"}),
+        # Free-form `when` so bookings don't exhaust slot capacity mid-run
+        ("booking_create", "POST", "/api/bookings", None, {"name": "Bench", "party_size": 2, "when": "soon"}),
+        ("order_create", "POST", "/api/orders", None, {**cart, "name": "Bench"}),
+        ("import_timeline", "POST", "/api/admin/import/timeline", None, timeline_rows),
+    ]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+async def first_event(app, path):
+    """Status of an SSE request once its first event arrives.
+
+    httpx's ASGI transport buffers whole responses, which never end for a
+    stream, so this speaks ASGI directly and disconnects after the first chunk.
+    """
+    status = 500
+    received = asyncio.Event()
+
+    async def receive():
+        await received.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and (message.get("body") or not message.get("more_body")):
+            received.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return status
+
+
+async def run_endpoint(client, app, endpoint, concurrency, requests, warmup):
+    name, method, path, params, body = endpoint
+
+    async def call():
+        started = time.perf_counter()
+        if method == "SSE":
+            status = await first_event(app, path)
+        else:
+            payload = {"content": body} if isinstance(body, bytes) else {"json": body}
+            status = (await client.request(method, path, params=params, **payload)).status_code
+        return time.perf_counter() - started, status
+
+    for _ in range(warmup):
+        await call()
+
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            elapsed, status = await call()
+            # A rejection is fast; timing it would flatter the percentiles
+            if 200 <= status < 300:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda s: round(s * 1000, 3)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1]) if latencies else 0.0,
+    }
+
+
+def use_mongo(args):
+    os.environ["DB_NAME"] = args.db_name
+    # Measure the handlers, not the production write rate limits (override via env)
+    os.environ.setdefault("WRITE_RATE_PER_SEC", "1000000")
+    os.environ.setdefault("WRITE_BURST", "1000000")
+    # ...nor the concurrency pools, which would shed part of every level above their size
+    for pool in ("MAX_CONCURRENT_READS", "MAX_CONCURRENT_EXPORTS", "MAX_CONCURRENT_HEAVY_READS"):
+        os.environ.setdefault(pool, "100000")
+    os.environ.setdefault("ADMIN_TOKEN", "bench-admin-token")
+    use_bench_images()
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+        return
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("In-memory mode needs mongomock-motor (pip install mongomock-motor), or pass --mongo-url")
+    import motor.motor_asyncio
+
+    # server.py builds its client at import time; swap the class in first.
+    motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    os.environ["MONGO_URL"] = "mongodb://in-memory"
+
+
+def use_bench_images():
+    """Point the image routes at a generated original (and a scratch variant cache) unless configured."""
+    if os.environ.get("IMAGE_ORIGINALS_DIR"):
+        return
+    try:
+        from PIL import Image
+    except ImportError:
+        return  # the image endpoint answers 503 and shows up as errors
+    scratch = Path(tempfile.mkdtemp(prefix="pizzahub-bench-"))
+    (scratch / "originals").mkdir()
+    Image.new("RGB", (1600, 1200), (196, 64, 32)).save(scratch / "originals" / "bench.jpg", quality=90)
+    os.environ["IMAGE_ORIGINALS_DIR"] = str(scratch / "originals")
+    os.environ.setdefault("IMAGE_CACHE_DIR", str(scratch / "variants"))
+
+
+async def bench(args):
+    import httpx
+    import server
+
+    # server.py configures INFO logging; per-request client logs would drown the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = {}
+    async with server.app.router.lifespan_context(server.app):
+        if args.synthetic:
+            from seed import load_synthetic
+            await load_synthetic(server.db, args.synthetic, seed=args.seed)
+            server.content_cache.bump(*args.synthetic)
+        item = await server.db.menu_items.find_one({}, {"_id": 0, "id": 1})
+        selected = [e for e in endpoints(item["id"] if item else "unknown") if not args.only or e[0] in args.only]
+
+        transport = httpx.ASGITransport(app=server.app)
+        headers = {"Authorization": f"Bearer {os.environ['ADMIN_TOKEN']}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            for concurrency in args.concurrency:
+                print(f"\n== concurrency {concurrency} ==")
+                print(f"{'endpoint':<20}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+                level = results.setdefault(str(concurrency), {})
+                for endpoint in selected:
+                    stats = await run_endpoint(client, server.app, endpoint, concurrency, args.requests, args.warmup)
+                    level[endpoint[0]] = stats
+                    print(f"{endpoint[0]:<20}{stats['rps']:>10}{stats['p50_ms']:>10}"
+                          f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['errors']:>8}")
+    return results
+
+
+def compare(baseline, results, threshold):
+    """Return regressions where p95 latency grew or throughput fell by more than ``threshold``,
+    or where more requests failed than in the baseline."""
+    regressions = []
+    for concurrency, level in results.items():
+        for name, stats in level.items():
+            old = baseline.get("results", {}).get(concurrency, {}).get(name)
+            if not old:
+                continue
+            if old["p95_ms"] and stats["p95_ms"] > old["p95_ms"] * (1 + threshold):
+                regressions.append(f"{name} @ c={concurrency}: p95 {old['p95_ms']}ms -> {stats['p95_ms']}ms")
+            if old["rps"] and stats["rps"] < old["rps"] * (1 - threshold):
+                regressions.append(f"{name} @ c={concurrency}: rps {old['rps']} -> {stats['rps']}")
+            if stats["errors"] > old.get("errors", 0):
+                regressions.append(f"{name} @ c={concurrency}: errors {old.get('errors', 0)} -> {stats['errors']}")
+    return regressions
+
+
+def parse_volumes(pairs):
+    volumes = {}
+    for pair in pairs or []:
+        kind, _, count = pair.partition("=")
+        volumes[kind] = int(count)
+    return volumes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process latency/throughput benchmark for the API")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16])
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint per concurrency level")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--only", nargs="+", help="endpoint names to run (default: all)")
+    parser.add_argument("--mongo-url", help="local mongod to use instead of the in-memory stand-in")
+    parser.add_argument("--db-name", default="pizzahub_bench")
+    parser.add_argument("--synthetic", nargs="+", metavar="KIND=COUNT",
+                        help="load a synthetic dataset first, e.g. menu_items=5000 reviews=50000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="compare against a JSON baseline; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression (default 0.2)")
+    args = parser.parse_args()
+    args.synthetic = parse_volumes(args.synthetic)
+
+    use_mongo(args)
+    results = asyncio.run(bench(args))
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "mongo": "local" if args.mongo_url else "in-memory",
+        "requests": args.requests,
+        "synthetic": args.synthetic,
+        "results": results,
+    }
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        regressions = compare(json.loads(Path(args.compare).read_text()), results, args.threshold)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\n✅ No regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
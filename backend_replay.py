@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Open-loop traffic replay for Rony's Pizza Hub API.
+
+Replays request traces captured by the server (TRAFFIC_CAPTURE_PATH, see
+backend/traffic_capture.py) against a running server. Requests are fired on a
+schedule regardless of how fast responses come back, so a server that falls
+behind shows growing latency and errors instead of quietly slowing the load
+down the way the closed-loop backend_bench.py does. Latency is measured from
+each request's scheduled time, so time spent queued on the client counts too.
+
+    python backend_replay.py capture.ndjson.gz --describe
+    python backend_replay.py capture-*.ndjson.gz --window "fri 20:00-21:00" --scale 5
+    python backend_replay.py capture.ndjson.gz --window "sat 19:00-22:00" --arrivals recorded --scale 2
+    python backend_replay.py capture.ndjson.gz --url http://localhost:8001 --duration 300 --save bench/fri-5x.json
+
+Arrivals:
+  poisson   requests drawn at random from the window's mix, at exponential
+            intervals averaging the window's real rate times --scale
+  recorded  the window's sampled requests in their original order and spacing,
+            compressed so the rate is the window's real rate times --scale
+            (bursts keep their shape); looped until --duration
+
+Real rates are estimated from the sampled count divided by each capture's
+sample rate. Menu item ids in order bodies are mapped onto the target's menu,
+so a capture from production replays against a freshly seeded local server.
+Staff requests (/admin/ routes and slot capacity) replay only with --admin-token (or $ADMIN_TOKEN).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, time as dt_time, timedelta
+from itertools import accumulate
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+from traffic_capture import expand_shape, read_capture  # noqa: E402
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def parse_window(spec):
+    """"fri 20:00-21:00", "fri,sat 19:00-22:00", "20:00-21:00" or "sun" -> (days or None, start min, end min)."""
+    days, start, end = None, 0, 24 * 60
+    for part in spec.lower().split():
+        if "-" in part and ":" in part:
+            lo, _, hi = part.partition("-")
+            start, end = (int(h) * 60 + int(m) for h, m in (lo.split(":"), hi.split(":")))
+        else:
+            names = part.split(",")
+            unknown = [d for d in names if d[:3] not in DAYS]
+            if unknown:
+                raise ValueError(f"unknown day {unknown[0]!r} in window {spec!r}")
+            days = {DAYS.index(d[:3]) for d in names}
+    if start == end:
+        raise ValueError(f"empty time range in window {spec!r}")
+    return days, start, end
+
+
+def window_occurrence(moment, window):
+    """The date the matching window opened on, or None when ``moment`` is outside it."""
+    days, start, end = window
+    minute = moment.hour * 60 + moment.minute
+    opened = moment.date()
+    if start < end:
+        if not start <= minute < end:
+            return None
+    elif minute < end:
+        # Windows past midnight belong to the day they opened
+        opened -= timedelta(days=1)
+    elif minute < start:
+        return None
+    if days is not None and opened.weekday() not in days:
+        return None
+    return opened
+
+
+def load_traces(paths, window, tz, exclude):
+    """Replayable records as [(occurrence start epoch, records)] per occurrence of the window, and what was skipped."""
+    segments = defaultdict(list)
+    skipped = Counter()
+    for sample, entry in read_capture(paths):
+        if entry.get("bl"):
+            skipped["non-JSON body"] += 1
+            continue
+        if entry["p"].startswith(tuple(exclude)):
+            skipped["excluded"] += 1
+            continue
+        moment = datetime.fromtimestamp(entry["t"], tz)
+        key = window_occurrence(moment, window) if window else "all"
+        if key is None:
+            continue
+        entry["w"] = 1 / sample
+        segments[key].append(entry)
+    occurrences = []
+    for key in sorted(segments, key=str):
+        records = sorted(segments[key], key=lambda e: e["t"])
+        if window:
+            opened = datetime.combine(key, dt_time(window[1] // 60, window[1] % 60), tz).timestamp()
+        else:
+            opened = records[0]["t"]
+        occurrences.append((opened, records))
+    return occurrences, skipped
+
+
+def window_seconds(window):
+    _, start, end = window
+    return ((end - start) % (24 * 60) or 24 * 60) * 60
+
+
+def observed_seconds(segments, window):
+    if window:
+        return len(segments) * window_seconds(window)
+    records = segments[0][1]
+    return max(1.0, records[-1]["t"] - records[0]["t"])
+
+
+def plan_poisson(segments, rate, duration, rng):
+    records = [e for _, seg in segments for e in seg]
+    cumulative = list(accumulate(e["w"] for e in records))
+    plan, offset = [], 0.0
+    while True:
+        offset += rng.expovariate(rate)
+        if offset >= duration:
+            return plan
+        plan.append((offset, rng.choices(records, cum_weights=cumulative)[0]))
+
+
+def plan_recorded(segments, seconds, rate, duration, window):
+    sampled = sum(len(seg) for _, seg in segments)
+    # Sampled arrivals run at sampled/seconds per second; compress time so they arrive at ``rate``
+    factor = sampled / seconds / rate
+    span = window_seconds(window) if window else seconds
+    plan, base = [], 0.0
+    while True:
+        for opened, seg in segments:
+            for entry in seg:
+                offset = base + (entry["t"] - opened) * factor
+                if duration is not None and offset >= duration:
+                    return plan
+                plan.append((offset, entry))
+            base += span * factor
+        if duration is None:
+            return plan
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.lag = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def add(self, route, latency, outcome):
+        if latency is not None:
+            self.latencies[route].append(latency)
+        self.statuses[route][outcome] += 1
+
+    def summary(self, route_keys, wall):
+        rows = {}
+        for route in route_keys:
+            latencies = sorted(self.latencies[route])
+            statuses = self.statuses[route]
+            ms = lambda s: round(s * 1000, 2)
+            rows[route] = {
+                "requests": sum(statuses.values()),
+                "rps": round(sum(statuses.values()) / wall, 2) if wall else 0.0,
+                "p50_ms": ms(percentile(latencies, 50)),
+                "p95_ms": ms(percentile(latencies, 95)),
+                "p99_ms": ms(percentile(latencies, 99)),
+                "max_ms": ms(latencies[-1]) if latencies else 0.0,
+                "4xx": sum(n for s, n in statuses.items() if s.startswith("4") and s != "429"),
+                "5xx": sum(n for s, n in statuses.items() if s.startswith("5") and s != "503"),
+                "shed": statuses["429"] + statuses["503"],
+                "timeouts": statuses["timeout"],
+                "errors": statuses["error"] + statuses["dropped"],
+                "statuses": dict(statuses),
+            }
+        return rows
+
+
+async def target_menu_ids(client):
+    response = await client.get("/api/menu", params={"fields": "id", "limit": 100})
+    response.raise_for_status()
+    data = response.json()
+    return sorted(item["id"] for item in (data["items"] if isinstance(data, dict) else data))
+
+
+def remap_items(body, target_ids, known):
+    """Point captured menu item ids that don't exist on the target at a stable target item."""
+    if isinstance(body, dict):
+        return {
+            k: (_map_id(v, target_ids, known) if k == "item_id" and isinstance(v, str) else remap_items(v, target_ids, known))
+            for k, v in body.items()
+        }
+    if isinstance(body, list):
+        return [remap_items(v, target_ids, known) for v in body]
+    return body
+
+
+def _map_id(item_id, target_ids, known):
+    if item_id in known or not target_ids:
+        return item_id
+    return target_ids[int(hashlib.sha1(item_id.encode()).hexdigest(), 16) % len(target_ids)]
+
+
+async def replay(args, plan):
+    import httpx
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    results = Results()
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        target_ids = await target_menu_ids(client) if args.remap_items else []
+        known = set(target_ids)
+        loop = asyncio.get_running_loop()
+
+        async def fire(entry, scheduled):
+            route = f"{entry['m']} {entry['r']}"
+            query = entry.get("q")
+            url = entry["p"] + (f"?{query}" if isinstance(query, str) else "")
+            params = [(k, expand_shape(v)) for k, v in query] if isinstance(query, list) else None
+            headers = dict(entry.get("h") or {})
+            if entry.get("k"):
+                headers["Idempotency-Key"] = str(uuid.uuid4())
+            if args.admin_token:
+                headers["Authorization"] = f"Bearer {args.admin_token}"
+            body = None
+            if "b" in entry:
+                body = expand_shape(entry["b"])
+                if target_ids:
+                    body = remap_items(body, target_ids, known)
+            try:
+                response = await client.request(entry["m"], url, params=params, json=body, headers=headers)
+                outcome = str(response.status_code)
+            except httpx.TimeoutException:
+                outcome = "timeout"
+            except httpx.HTTPError:
+                outcome = "error"
+            finally:
+                results.in_flight -= 1
+            results.add(route, loop.time() - scheduled, outcome)
+
+        tasks = []
+        start = loop.time() + 0.2
+        for offset, entry in plan:
+            scheduled = start + offset
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            results.lag.append(max(0.0, loop.time() - scheduled))
+            if results.in_flight >= args.max_in_flight:
+                # The client itself is saturated; count it rather than block the schedule
+                results.add(f"{entry['m']} {entry['r']}", None, "dropped")
+                continue
+            results.in_flight += 1
+            results.peak_in_flight = max(results.peak_in_flight, results.in_flight)
+            tasks.append(loop.create_task(fire(entry, scheduled)))
+        await asyncio.gather(*tasks)
+        wall = loop.time() - start
+    return results, wall
+
+
+def describe(segments, tz):
+    by_hour = Counter()
+    mix = Counter()
+    hours = set()
+    for _, seg in segments:
+        for entry in seg:
+            moment = datetime.fromtimestamp(entry["t"], tz)
+            by_hour[(moment.weekday(), moment.hour)] += entry["w"]
+            hours.add((moment.date(), moment.hour))
+            mix[f"{entry['m']} {entry['r']}"] += entry["w"]
+    seen = Counter((day.weekday(), hour) for day, hour in hours)
+    total = sum(mix.values())
+    print(f"\n{'day':<6}{'hour':>6}{'req/s':>10}{'hours seen':>12}")
+    for (day, hour), weight in sorted(by_hour.items()):
+        print(f"{DAYS[day]:<6}{hour:>4}:00{weight / seen[(day, hour)] / 3600:>10.2f}{seen[(day, hour)]:>12}")
+    print(f"\n{'route':<52}{'share':>8}")
+    for route, weight in mix.most_common(25):
+        print(f"{route:<52}{weight / total:>8.1%}")
+
+
+def print_report(rows, results, wall):
+    print(f"\n{'route':<46}{'n':>7}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'4xx':>6}{'5xx':>6}{'shed':>6}{'t/o':>5}{'err':>5}")
+    for route, row in sorted(rows.items(), key=lambda kv: -kv[1]["requests"]):
+        print(f"{route[:45]:<46}{row['requests']:>7}{row['rps']:>8}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+              f"{row['p99_ms']:>9}{row['max_ms']:>9}{row['4xx']:>6}{row['5xx']:>6}{row['shed']:>6}"
+              f"{row['timeouts']:>5}{row['errors']:>5}")
+    lag = sorted(results.lag)
+    print(f"\nachieved {sum(r['requests'] for r in rows.values()) / wall:.1f} req/s over {wall:.1f}s, "
+          f"peak in flight {results.peak_in_flight}, schedule lag p99 {percentile(lag, 99) * 1000:.1f}ms")
+    if lag and percentile(lag, 99) > 0.05:
+        print("⚠️  The driver fell behind its schedule; results understate the offered load (lower --scale or run it on another machine)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop replay of captured traffic against a running server")
+    parser.add_argument("captures", nargs="+", help="capture files written by TRAFFIC_CAPTURE_PATH")
+    parser.add_argument("--url", default="http://localhost:8001", help="server to replay against")
+    parser.add_argument("--window", help='replay only traffic from e.g. "fri 20:00-21:00" (days optional)')
+    parser.add_argument("--tz", help="time zone for --window, e.g. Asia/Kolkata (default: local)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiple of the window's real request rate")
+    parser.add_argument("--arrivals", choices=("poisson", "recorded"), default="poisson")
+    parser.add_argument("--duration", type=float,
+                        help="seconds to replay (default 60 for poisson, one pass of the window for recorded)")
+    parser.add_argument("--admin-token", default=os.environ.get("ADMIN_TOKEN"),
+                        help="sent as a bearer token with every request (default: $ADMIN_TOKEN); captures never record it")
+    parser.add_argument("--exclude", nargs="+", default=[], metavar="PATH_PREFIX", help="skip requests under these paths")
+    parser.add_argument("--no-remap-items", dest="remap_items", action="store_false",
+                        help="send captured menu item ids as they are")
+    parser.add_argument("--connections", type=int, default=256, help="client connection pool size")
+    parser.add_argument("--max-in-flight", type=int, default=5000)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--describe", action="store_true", help="print request rates per hour and the route mix, then exit")
+    parser.add_argument("--save", help="write the report as JSON")
+    args = parser.parse_args()
+
+    tz = None
+    if args.tz:
+        from zoneinfo import ZoneInfo
+        tz = ZoneInfo(args.tz)
+    try:
+        window = parse_window(args.window) if args.window else None
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    segments, skipped = load_traces(args.captures, window, tz, args.exclude)
+    sampled = sum(len(seg) for _, seg in segments)
+    if not sampled:
+        sys.exit("No replayable requests in the capture" + (f" for window {args.window!r}" if window else ""))
+    if args.describe:
+        describe(segments, tz)
+        return 0
+
+    seconds = observed_seconds(segments, window)
+    real_rate = sum(e["w"] for _, seg in segments for e in seg) / seconds
+    rate = real_rate * args.scale
+    if args.arrivals == "poisson":
+        plan = plan_poisson(segments, rate, args.duration or 60.0, random.Random(args.seed))
+    else:
+        plan = plan_recorded(segments, seconds, rate, args.duration, window)
+    if not plan:
+        sys.exit(f"Nothing scheduled within {args.duration:g}s at {args.scale:g}x; raise --duration or --scale")
+    print(f"{sampled} sampled requests over {len(segments)} occurrence(s) of "
+          f"{args.window or 'the capture'} ≈ {real_rate:.2f} req/s real")
+    print(f"replaying {len(plan)} requests at {args.scale:g}x ≈ {rate:.2f} req/s ({args.arrivals}) against {args.url}")
+    if skipped:
+        print("skipped: " + ", ".join(f"{n} {reason}" for reason, n in skipped.items()))
+
+    results, wall = asyncio.run(replay(args, plan))
+    rows = results.summary(sorted(results.statuses), wall)
+    print_report(rows, results, wall)
+
+    if args.save:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "url": args.url,
+            "window": args.window,
+            "scale": args.scale,
+            "arrivals": args.arrivals,
+            "offered_rps": round(rate, 2),
+            "achieved_rps": round(sum(r["requests"] for r in rows.values()) / wall, 2),
+            "schedule_lag_p99_ms": round(percentile(sorted(results.lag), 99) * 1000, 2),
+            "results": rows,
+        }
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nSaved report to {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from routes_content import make_router
+from seed import seed_if_empty
+
+
+def request(db, method, path, token="s3cret", headers=None, **kwargs):
+    async def run():
+        await seed_if_empty(db)
+        app = FastAPI()
+        app.include_router(make_router(db, admin_token=token), prefix="/api")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.request(method, path, headers=headers, **kwargs)
+
+    return asyncio.run(run())
+
+
+# Valid for every route below; the point is that none of them get to validation
+BODY = {"status": "confirmed", "id": "r1", "kind": "discount", "name": "All free", "percent": 100, "capacity": 1}
+
+ADMIN_ROUTES = [
+    ("GET", "/api/admin/bookings"),
+    ("GET", "/api/locations/main/admin/bookings"),
+    ("GET", "/api/admin/contact-messages"),
+    ("POST", "/api/admin/bookings/b1/status"),
+    ("PUT", "/api/admin/pricing/rules/r1"),
+    ("GET", "/api/admin/orders"),
+    ("GET", "/api/locations/main/admin/orders"),
+    ("POST", "/api/admin/import/menu"),
+    ("GET", "/api/admin/export/menu"),
+    ("PUT", "/api/admin/locations/uptown"),
+    ("POST", "/api/reviews"),
+    ("POST", "/api/reviews/summary/rebuild"),
+    ("PUT", "/api/availability/slots/2030-01-01T19:00"),
+]
+
+
+def test_admin_routes_need_the_token(db):
+    for method, path in ADMIN_ROUTES:
+        assert request(db, method, path, json=BODY).status_code == 401, path
+        wrong = {"Authorization": "Bearer nope"}
+        assert request(db, method, path, headers=wrong, json=BODY).status_code == 401, path
+
+
+def test_admin_routes_are_closed_without_a_configured_token(db):
+    for method, path in ADMIN_ROUTES:
+        headers = {"Authorization": "Bearer "}
+        assert request(db, method, path, token=None, headers=headers, json=BODY).status_code == 503
+
+
+def test_admin_token_is_accepted(db):
+    ok = {"Authorization": "Bearer s3cret"}
+    assert request(db, "GET", "/api/admin/bookings", headers=ok).status_code == 200
+    assert request(db, "POST", "/api/admin/bookings/b1/status", headers=ok, json=BODY).status_code == 404
+
+
+def test_pricing_rules_need_the_admin_token(db):
+    rule = {"id": "free", "kind": "discount", "name": "Everything free", "percent": 100}
+    assert request(db, "PUT", "/api/admin/pricing/rules/free", json=rule).status_code == 401
+    ok = {"Authorization": "Bearer s3cret"}
+    assert request(db, "PUT", "/api/admin/pricing/rules/free", headers=ok, json=rule).status_code == 200
+
+
+def test_bulk_import_needs_the_admin_token(db):
+    row = b'{"id": "x1", "name": "Injected", "price": 1, "category": "classic", "img": "", "desc": ""}\n'
+    assert request(db, "POST", "/api/admin/import/menu", content=row).status_code == 401
+    ok = {"Authorization": "Bearer s3cret"}
+    response = request(db, "POST", "/api/admin/import/menu", headers=ok, content=row)
+    assert response.status_code == 200 and response.json()["upserted"] == 1
+
+
+def test_locations_need_the_admin_token(db):
+    branch = {"name": "Uptown", "address": "1 High St"}
+    assert request(db, "PUT", "/api/admin/locations/uptown", json=branch).status_code == 401
+    ok = {"Authorization": "Bearer s3cret"}
+    assert request(db, "PUT", "/api/admin/locations/uptown", headers=ok, json=branch).status_code == 200
+
+
+def test_review_avatar_must_be_a_web_or_site_url(db):
+    ok = {"Authorization": "Bearer s3cret"}
+    review = {"name": "Ravi", "rating": 5, "text": "Great"}
+    for avatar in ("javascript:alert(1)", "data:text/html,x", "//evil.example/a.png"):
+        response = request(db, "POST", "/api/reviews", headers=ok, json={**review, "avatar": avatar})
+        assert response.status_code == 422, avatar
+    for avatar in ("https://cdn.example/a.png", "/images/a.png", ""):
+        response = request(db, "POST", "/api/reviews", headers=ok, json={**review, "avatar": avatar})
+        assert response.status_code == 200, avatar
@@ -0,0 +1,44 @@
+import pytest
+
+from admission import AdmissionControl
+
+
+def test_rate_limit_is_per_client():
+    control = AdmissionControl(rates={"POST /api/bookings": (0.001, 2)})
+    assert control.throttle("POST", "/api/bookings", "10.0.0.1") == 0
+    assert control.throttle("POST", "/api/bookings", "10.0.0.1") == 0
+    assert control.throttle("POST", "/api/bookings", "10.0.0.1") > 0
+    # Another client still has its whole burst
+    assert control.throttle("POST", "/api/bookings", "10.0.0.2") == 0
+    assert control.throttle("GET", "/api/menu", "10.0.0.1") == 0
+
+
+def test_client_buckets_are_bounded():
+    control = AdmissionControl(rates={"POST": (1, 1)}, max_clients=3)
+    for i in range(10):
+        control.throttle("POST", "/api/status", f"10.0.0.{i}")
+    assert control.stats()["clients"] == 3
+
+
+def test_client_comes_from_the_proxy_header_when_configured():
+    scope = {"client": ("127.0.0.1", 5000), "headers": [(b"x-forwarded-for", b"1.2.3.4, 10.0.0.9")]}
+    assert AdmissionControl().client(scope) == "127.0.0.1"
+    assert AdmissionControl(client_header="X-Forwarded-For").client(scope) == "10.0.0.9"
+
+
+def test_heavy_reads_share_a_pool_apart_from_cheap_reads():
+    control = AdmissionControl(
+        concurrency={"GET": 10, "heavy": 2},
+        pools={"GET /api/search": "heavy", "GET /api/menu.pdf": "heavy"},
+    )
+    assert control.acquire("GET", "/api/search") == (True, "heavy")
+    assert control.acquire("GET", "/api/menu.pdf") == (True, "heavy")
+    assert control.acquire("GET", "/api/search") == (False, "heavy")
+    assert control.acquire("GET", "/api/menu") == (True, "GET")
+    control.release("heavy")
+    assert control.acquire("GET", "/api/menu.pdf") == (True, "heavy")
+
+
+def test_pool_needs_a_limit():
+    with pytest.raises(ValueError):
+        AdmissionControl(concurrency={"GET": 1}, pools={"GET /api/search": "heavy"})
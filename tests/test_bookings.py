@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from availability import AvailabilityEngine, SeatsBooked, SlotUnavailable
+from routes_content import make_router
+
+ADMIN = {"Authorization": "Bearer s3cret"}
+
+
+def slot(days=2, hour=19):
+    return (datetime.now() + timedelta(days=days)).replace(hour=hour, minute=0, second=0, microsecond=0)
+
+
+def call(db, *requests):
+    async def run():
+        app = FastAPI()
+        app.include_router(make_router(db, admin_token="s3cret"), prefix="/api")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return [await client.request(method, path, **kwargs) for method, path, kwargs in requests]
+
+    return asyncio.run(run())
+
+
+def test_reserve_is_all_or_nothing(db):
+    async def run():
+        engine = AvailabilityEngine(db)
+        when = slot()
+        await engine.reserve(when, 38)
+        # The last of the three covered slots is full; the first two are handed back
+        with pytest.raises(SlotUnavailable):
+            await engine.reserve(when - timedelta(hours=1), 3)
+        slots = {s["start"]: s["remaining"] for s in await engine.availability(when.date(), when.date())}
+        assert slots[f"{when - timedelta(hours=1):%Y-%m-%dT%H:%M}"] == 40
+        assert slots[f"{when:%Y-%m-%dT%H:%M}"] == 2
+
+    asyncio.run(run())
+
+
+def test_capacity_cannot_drop_below_booked_seats(db):
+    async def run():
+        engine = AvailabilityEngine(db)
+        when = slot()
+        sid = f"{when:%Y-%m-%dT%H:%M}"
+        await engine.reserve(when, 10)
+        assert (await engine.set_capacity(sid, 12))["remaining"] == 2
+        with pytest.raises(SeatsBooked):
+            await engine.set_capacity(sid, 9)
+        assert (await engine.set_capacity(sid, 10))["remaining"] == 0
+
+    asyncio.run(run())
+
+
+def test_capacity_conflict_is_409(db):
+    when = f"{slot():%Y-%m-%dT%H:%M}"
+    booked, lowered = call(
+        db,
+        ("POST", "/api/bookings", {"json": {"name": "Asha", "party_size": 6, "when": when}}),
+        ("PUT", f"/api/availability/slots/{when}", {"headers": ADMIN, "json": {"capacity": 4}}),
+    )
+    assert booked.json()["status"] == "confirmed"
+    assert lowered.status_code == 409
+
+
+def test_party_size_zero_is_rejected_not_defaulted(db):
+    when = f"{slot():%Y-%m-%dT%H:%M}"
+    zero, default = call(
+        db,
+        ("POST", "/api/bookings", {"json": {"name": "Asha", "party_size": 0, "when": when}}),
+        ("POST", "/api/bookings", {"json": {"name": "Ravi", "when": when}}),
+    )
+    assert zero.status_code == 422
+    assert default.status_code == 200
+    doc = asyncio.run(db.bookings.find_one({"name": "Ravi"}))
+    assert doc["party_size"] == 2
+
+
+def test_past_slot_is_rejected(db):
+    (past,) = call(db, ("POST", "/api/bookings", {"json": {"name": "Asha", "when": f"{slot(days=-1):%Y-%m-%dT%H:%M}"}}))
+    assert past.status_code == 400
+    assert asyncio.run(db.booking_slots.count_documents({})) == 0
+
+
+def test_offset_is_converted_to_local_slot_time(db):
+    local = slot()
+    when = local.astimezone().astimezone(timezone(timedelta(hours=5, minutes=30)))
+    (booked,) = call(db, ("POST", "/api/bookings", {"json": {"name": "Asha", "when": when.isoformat()}}))
+    assert booked.json()["slots"][0] == f"{local:%Y-%m-%dT%H:%M}"
+
+
+def test_dates_and_off_boundary_times_are_only_received(db):
+    day = slot().date()
+    responses = call(
+        db,
+        ("POST", "/api/bookings", {"json": {"name": "Asha", "when": day.isoformat()}}),
+        ("POST", "/api/bookings", {"json": {"name": "Ravi", "when": f"{day}T19:10"}}),
+        ("POST", "/api/bookings", {"json": {"name": "Mira", "when": "Friday evening"}}),
+    )
+    assert [r.json()["status"] for r in responses] == ["received"] * 3
+    assert asyncio.run(db.booking_slots.count_documents({})) == 0
@@ -0,0 +1,85 @@
+import asyncio
+import uuid
+
+import pytest
+from pydantic import BaseModel, Field
+from pymongo.errors import DuplicateKeyError
+
+from bulk_io import import_rows, ndjson_rows
+from seed import seed_if_empty
+
+
+class Item(BaseModel):
+    id: str
+    name: str
+    price: float
+
+
+async def chunks(*lines):
+    for line in lines:
+        yield line.encode() + b"\n"
+
+
+async def run_import(db, location, *lines):
+    return await import_rows(db.menu_items, Item, ndjson_rows(chunks(*lines)), extra={"location_id": location})
+
+
+def test_import_leaves_other_locations_alone(db):
+    async def run():
+        await seed_if_empty(db)
+        await run_import(db, "main", '{"id": "m1", "name": "Main pizza", "price": 10}')
+        summary = await run_import(db, "uptown", '{"id": "m1", "name": "Uptown pizza", "price": 12}')
+        assert summary["upserted"] == 1 and summary["modified"] == 0
+
+        main = await db.menu_items.find_one({"location_id": "main", "id": "m1"})
+        uptown = await db.menu_items.find_one({"location_id": "uptown", "id": "m1"})
+        assert main["name"] == "Main pizza" and uptown["name"] == "Uptown pizza"
+
+        summary = await run_import(db, "uptown", '{"id": "m1", "name": "Uptown pizza", "price": 13}')
+        assert summary["upserted"] == 0 and summary["modified"] == 1
+        assert (await db.menu_items.find_one({"location_id": "main", "id": "m1"}))["price"] == 10
+
+    asyncio.run(run())
+
+
+def test_ids_are_unique_per_location(db):
+    async def run():
+        await seed_if_empty(db)
+        for name in ("menu_items", "reviews", "timeline"):
+            indexes = await db[name].index_information()
+            assert indexes["location_id_1_id_1_unique"].get("unique")
+            assert "id_1" not in indexes
+        await db.timeline.insert_one({"location_id": "uptown", "id": "t1"})
+        await db.timeline.insert_one({"location_id": "main", "id": "t1"})
+        with pytest.raises(DuplicateKeyError):
+            await db.timeline.insert_one({"location_id": "main", "id": "t1"})
+
+    asyncio.run(run())
+
+
+def test_upgrade_replaces_global_id_indexes(db):
+    async def run():
+        await db.menu_items.create_index("id", unique=True)
+        await db.menu_items.create_index([("location_id", 1), ("id", 1)])
+        await db.seed_meta.insert_one({"_id": "version", "version": 7})
+        await seed_if_empty(db)
+        indexes = await db.menu_items.index_information()
+        assert "id_1" not in indexes and "location_id_1_id_1" not in indexes
+        assert indexes["location_id_1_id_1_unique"].get("unique")
+
+    asyncio.run(run())
+
+
+def test_rows_need_an_id_even_when_the_model_generates_one(db):
+    class Event(BaseModel):
+        id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+        title: str
+
+    async def run():
+        rows = ndjson_rows(chunks('{"title": "Opened"}', '{"id": "t1", "title": "Moved"}'))
+        summary = await import_rows(db.timeline, Event, rows)
+        assert summary["valid"] == 1 and summary["errors"][0]["row"] == 1
+        assert summary["errors"][0]["errors"][0]["loc"] == ("id",)
+        assert await db.timeline.count_documents({}) == 1
+
+    asyncio.run(run())
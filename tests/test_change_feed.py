@@ -0,0 +1,55 @@
+import asyncio
+
+from change_feed import ChangeFeed
+from content_cache import ContentCache
+
+
+def test_write_reaches_other_worker_for_its_location_only(db):
+    async def run():
+        cache_a, cache_b = ContentCache(), ContentCache()
+        feed_a, feed_b = ChangeFeed(db, cache_a), ChangeFeed(db, cache_b)
+        await feed_a._check(announce=False)
+        await feed_b._check(announce=False)
+        main = feed_b.subscribe({"menu"}, "main")
+        soho = feed_b.subscribe({"menu"}, "soho")
+        before = cache_b.version("menu_items", "soho")
+
+        cache_a.bump("menu_items", partition="soho")
+        await feed_a.record(("menu_items",), "soho")
+        await feed_b._check()
+
+        assert cache_b.version("menu_items", "soho") != before
+        assert feed_b.version("menu", "soho") == feed_a.version("menu", "soho") == "1"
+        assert feed_b.version("menu", "main") == "0"
+        assert main.queue.empty()
+        assert soho.queue.get_nowait()[2] == {"topic": "menu", "version": "1"}
+
+        # A second poll with nothing new changes nothing
+        invalidations = feed_b.invalidations
+        await feed_b._check()
+        assert feed_b.invalidations == invalidations and soho.queue.empty()
+
+    asyncio.run(run())
+
+
+class RecordingDb:
+    def __init__(self, db):
+        self.db = db
+        self.collections = []
+
+    def __getattr__(self, name):
+        self.collections.append(name)
+        return getattr(self.db, name)
+
+
+def test_poll_reads_only_the_version_counters(db):
+    async def run():
+        await db.menu_items.insert_many([{"id": str(i), "location_id": "main"} for i in range(50)])
+        spy = RecordingDb(db)
+        feed = ChangeFeed(spy, ContentCache())
+        await feed.record(("menu_items", "pricing_rules"), "main")
+        await feed._check()
+        await feed.refresh(("pricing_rules",), "main")
+        assert set(spy.collections) == {"content_versions"}
+
+    asyncio.run(run())
@@ -0,0 +1,98 @@
+import asyncio
+
+from content_cache import ContentCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting_loader(calls, value="v"):
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return f"{value}{len(calls)}"
+
+    return load
+
+
+def test_hit_until_bumped_or_expired():
+    async def run():
+        clock, calls = Clock(), []
+        cache = ContentCache(ttls={"menu_items": 10}, clock=clock)
+        load = counting_loader(calls)
+        assert await cache.get("menu_items", "all", load) == "v1"
+        assert await cache.get("menu_items", "all", load) == "v1"
+        cache.bump("menu_items")
+        assert await cache.get("menu_items", "all", load) == "v2"
+        clock.now = 11
+        assert await cache.get("menu_items", "all", load) == "v3"
+        assert (cache.hits, cache.misses) == (1, 3)
+
+    asyncio.run(run())
+
+
+def test_concurrent_misses_share_one_load():
+    async def run():
+        calls = []
+        cache = ContentCache()
+        results = await asyncio.gather(*(cache.get("reviews", "all", counting_loader(calls)) for _ in range(5)))
+        assert results == ["v1"] * 5 and len(calls) == 1 and cache.coalesced == 4
+
+    asyncio.run(run())
+
+
+def test_partition_bump_leaves_other_locations_warm():
+    async def run():
+        calls = []
+        cache = ContentCache()
+        load = counting_loader(calls)
+        await cache.get("menu_items", "all", load, partition="main")
+        await cache.get("menu_items", "all", load, partition="soho")
+        cache.bump("menu_items", partition="soho")
+        assert await cache.get("menu_items", "all", load, partition="main") == "v1"
+        assert await cache.get("menu_items", "all", load, partition="soho") == "v3"
+        # A collection-wide bump reaches every partition
+        cache.bump("menu_items")
+        assert await cache.get("menu_items", "all", load, partition="main") == "v4"
+
+    asyncio.run(run())
+
+
+def test_load_racing_a_bump_is_not_stored():
+    async def run():
+        calls = []
+        cache = ContentCache()
+        gate = asyncio.Event()
+
+        async def slow():
+            await gate.wait()
+            return "old"
+
+        pending = asyncio.ensure_future(cache.get("specials", "one", slow))
+        await asyncio.sleep(0)
+        cache.bump("specials")
+        gate.set()
+        assert await pending == "old"
+        assert await cache.get("specials", "one", counting_loader(calls, "new")) == "new1"
+
+    asyncio.run(run())
+
+
+def test_lru_bound_and_listeners():
+    async def run():
+        seen = []
+        cache = ContentCache(max_entries=2)
+        cache.add_listener(seen.append)
+        for key in ("a", "b", "c"):
+            await cache.get("timeline", key, counting_loader([]))
+        assert cache.stats()["entries"] == 2
+        cache.bump("timeline", "video")
+        cache.bump("timeline", notify=False)
+        assert seen == [("timeline", "video")]
+
+    asyncio.run(run())
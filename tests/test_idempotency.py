@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from idempotency import IdempotencyConflict, IdempotencyStore
+
+
+def test_retry_replays_the_first_response_across_workers(db):
+    async def run():
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            return {"id": len(calls)}
+
+        first, second = IdempotencyStore(db), IdempotencyStore(db)
+        assert await first.run("bookings", "k1", "fp", handler) == ({"id": 1}, False)
+        assert await second.run("bookings", "k1", "fp", handler) == ({"id": 1}, True)
+        assert await first.run("bookings", "k1", "fp", handler) == ({"id": 1}, True)
+        with pytest.raises(IdempotencyConflict) as exc:
+            await second.run("bookings", "k1", "other", handler)
+        assert exc.value.status_code == 422
+        assert len(calls) == 1
+
+    asyncio.run(run())
+
+
+def test_failed_request_releases_the_key(db):
+    async def run():
+        store = IdempotencyStore(db)
+
+        async def broken():
+            raise RuntimeError("boom")
+
+        async def ok():
+            return {"ok": True}
+
+        with pytest.raises(RuntimeError):
+            await store.run("orders", "k", "fp", broken)
+        assert await store.run("orders", "k", "fp", ok) == ({"ok": True}, False)
+
+    asyncio.run(run())
+
+
+def test_pending_claim_blocks_until_its_lease_runs_out(db):
+    async def run():
+        # A worker claimed the key and died before finishing
+        stale = datetime.utcnow() - timedelta(seconds=5)
+        await db.idempotency_keys.insert_one(
+            {"_id": "orders:k", "fingerprint": "fp", "state": "pending", "claim": "dead", "created_at": stale, "claimed_at": stale}
+        )
+
+        async def handler():
+            return {"id": "new"}
+
+        with pytest.raises(IdempotencyConflict) as exc:
+            await IdempotencyStore(db, pending_lease=30).run("orders", "k", "fp", handler)
+        assert exc.value.status_code == 409
+
+        store = IdempotencyStore(db, pending_lease=1)
+        with pytest.raises(IdempotencyConflict) as exc:
+            await store.run("orders", "k", "other", handler)
+        assert exc.value.status_code == 422
+        assert await store.run("orders", "k", "fp", handler) == ({"id": "new"}, False)
+        doc = await db.idempotency_keys.find_one({"_id": "orders:k"})
+        assert doc["state"] == "done" and store.stats()["takeovers"] == 1
+
+    asyncio.run(run())
+
+
+def test_original_holder_cannot_finish_a_claim_it_lost(db):
+    async def run():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return {"by": "original"}
+
+        async def fast():
+            return {"by": "retry"}
+
+        original = asyncio.ensure_future(IdempotencyStore(db, pending_lease=0).run("orders", "k", "fp", slow))
+        await asyncio.sleep(0.01)
+        assert await IdempotencyStore(db, pending_lease=0).run("orders", "k", "fp", fast) == ({"by": "retry"}, False)
+        release.set()
+        await original
+        doc = await db.idempotency_keys.find_one({"_id": "orders:k"})
+        assert doc["response"] == {"by": "retry"}
+
+    asyncio.run(run())
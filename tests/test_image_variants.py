@@ -0,0 +1,46 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from image_variants import ImageVariants, iter_file
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    originals = tmp_path / "originals"
+    originals.mkdir()
+    Image.new("RGB", (800, 600), (200, 80, 40)).save(originals / "pizza.jpg")
+    return str(originals), str(tmp_path / "cache")
+
+
+def variants(dirs, **kwargs):
+    return ImageVariants(*dirs, executor=ThreadPoolExecutor(1), **kwargs)
+
+
+def test_variant_evicted_by_another_worker_is_rendered_again(dirs):
+    async def run():
+        mine, other = variants(dirs), variants(dirs)
+        target, _ = await mine.variant("pizza.jpg", 320, "jpeg")
+        # The other worker finds the file on disk and serves it without rendering
+        assert (await other.variant("pizza.jpg", 320, "jpeg"))[0] == target
+        assert (other.hits, other.renders) == (1, 0)
+
+        target.unlink()
+        fh, _ = await mine.open_variant("pizza.jpg", 320, "jpeg")
+        assert b"".join(iter_file(fh)).startswith(b"\xff\xd8") and fh.closed
+        assert mine.renders == 2
+
+    asyncio.run(run())
+
+
+def test_open_variant_survives_eviction(dirs):
+    async def run():
+        images = variants(dirs)
+        fh, etag = await images.open_variant("pizza.jpg", 160, "jpeg")
+        (images.cache_dir / etag.strip('"')).unlink()
+        assert b"".join(iter_file(fh)).startswith(b"\xff\xd8")
+
+    asyncio.run(run())
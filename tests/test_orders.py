@@ -0,0 +1,37 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from change_feed import ChangeFeed
+from content_cache import ContentCache
+from routes_content import make_router
+from seed import seed_if_empty
+
+ADMIN = {"Authorization": "Bearer s3cret"}
+
+
+def worker(db):
+    """One process's router: its own content cache and change feed over the shared db."""
+    cache = ContentCache()
+    app = FastAPI()
+    app.include_router(make_router(db, cache, feed=ChangeFeed(db, cache), admin_token="s3cret"), prefix="/api")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_order_sees_a_rule_edited_on_another_worker(db):
+    async def run():
+        await seed_if_empty(db)
+        item = await db.menu_items.find_one({"location_id": "main"})
+        cart = {"lines": [{"item_id": item["id"], "quantity": 1}], "name": "Asha"}
+        async with worker(db) as a, worker(db) as b:
+            before = (await b.post("/api/orders/quote", json=cart)).json()["total"]
+            rule = {"id": "all-free", "kind": "discount", "name": "Everything free", "percent": 100}
+            assert (await a.put("/api/admin/pricing/rules/all-free", headers=ADMIN, json=rule)).status_code == 200
+
+            stale = await b.post("/api/orders", json={**cart, "expected_total": before})
+            assert stale.status_code == 409
+            order = await b.post("/api/orders", json=cart)
+            assert order.status_code == 200 and order.json()["total"] == 0
+
+    asyncio.run(run())
@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from pagination import decode_cursor, encode_cursor, keyset_filter, next_cursor
+from routes_content import make_router
+
+
+def test_cursor_round_trips_values_and_dates():
+    ts = datetime(2026, 10, 18, 12, 30, 5, 123000)
+    for value in (299.0, "Margherita", ts, None):
+        assert decode_cursor(encode_cursor(value, "id-1")) == (value, "id-1")
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "W10", encode_cursor(1, "x")[:-3], "WzEsMl0"])
+def test_bad_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_keyset_filter_breaks_ties_on_id():
+    query = keyset_filter("price", -1, encode_cursor(300, "m"))
+    assert query == {"$or": [{"price": {"$lt": 300}}, {"price": 300, "id": {"$lt": "m"}}]}
+    assert keyset_filter("price", 1, None) == {}
+
+
+def test_next_cursor_trims_the_extra_row():
+    docs = [{"id": str(i), "price": i} for i in range(4)]
+    cursor = next_cursor(docs, "price", 3)
+    assert len(docs) == 3 and decode_cursor(cursor) == (2, "2")
+    assert next_cursor(docs, "price", 3) is None
+
+
+def test_menu_pages_cover_every_item_once(db):
+    async def run():
+        # Equal prices force the id tie-break across page boundaries
+        await db.menu_items.insert_many([
+            {"id": f"item-{i:02d}", "name": f"Pizza {i}", "price": 100 + i // 4 * 10, "category": "classic",
+             "img": "", "desc": "", "location_id": "main"}
+            for i in range(23)
+        ])
+        app = FastAPI()
+        app.include_router(make_router(db), prefix="/api")
+        seen, after = [], None
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            while True:
+                params = {"sort": "-price", "limit": 5, **({"after": after} if after else {})}
+                page = (await client.get("/api/menu", params=params)).json()
+                seen.extend(item["id"] for item in page["items"])
+                after = page.get("next_cursor")
+                if not after:
+                    break
+        assert len(seen) == len(set(seen)) == 23
+
+    asyncio.run(run())
@@ -0,0 +1,91 @@
+import pytest
+
+from pricing import PriceIndex, PricingError
+
+ITEMS = [
+    {"id": "marg", "name": "Margherita", "price": 300, "category": "pizza"},
+    {"id": "pep", "name": "Pepperoni", "price": 400, "category": "pizza"},
+    {"id": "bread", "name": "Garlic bread", "price": 100, "category": "sides"},
+    {"id": "cola", "name": "Cola", "price": 60, "category": "drinks"},
+]
+CHEESE = {"id": "cheese", "kind": "addon", "name": "Extra cheese", "price": 50, "categories": ["pizza"]}
+COMBO = {"id": "meal", "kind": "combo", "name": "Meal", "price": 400,
+         "components": [{"category": "pizza"}, {"category": "sides"}, {"category": "drinks"}]}
+PIZZA_OFF = {"id": "pizza-20", "kind": "discount", "name": "20% off pizza", "percent": 20, "categories": ["pizza"]}
+
+
+def quote(rules, lines, code=None):
+    return PriceIndex(ITEMS, rules).quote(lines, code)
+
+
+def test_plain_cart_is_priced_in_exact_amounts():
+    result = quote([], [{"item_id": "cola", "quantity": 3}])
+    assert result["subtotal"] == result["total"] == 180.0 and result["adjustments"] == []
+
+
+def test_unknown_items_and_addons_are_rejected():
+    with pytest.raises(PricingError):
+        quote([], [{"item_id": "nope", "quantity": 1}])
+    with pytest.raises(PricingError):
+        quote([CHEESE], [{"item_id": "cola", "quantity": 1, "addons": ["cheese"]}])
+
+
+def test_combo_takes_the_priciest_units_and_keeps_addons():
+    lines = [
+        {"item_id": "marg", "quantity": 1},
+        {"item_id": "pep", "quantity": 1, "addons": ["cheese"]},
+        {"item_id": "bread", "quantity": 1},
+        {"item_id": "cola", "quantity": 1},
+    ]
+    result = quote([CHEESE, COMBO], lines)
+    # Pepperoni + bread + cola = 560 for 400; the cheese is still charged
+    assert result["adjustments"] == [{"rule_id": "meal", "name": "Meal", "times": 1, "amount": -160.0}]
+    assert result["total"] == 910 - 160
+
+
+def test_category_discount_skips_units_in_a_combo():
+    lines = [
+        {"item_id": "pep", "quantity": 2},
+        {"item_id": "bread", "quantity": 1},
+        {"item_id": "cola", "quantity": 1},
+    ]
+    result = quote([COMBO, PIZZA_OFF], lines)
+    # One pepperoni went into the meal; only the other one is 20% off
+    assert [a["amount"] for a in result["adjustments"]] == [-160.0, -80.0]
+    assert result["total"] == 960 - 160 - 80
+
+
+def test_category_discount_covers_addons_on_leftover_units():
+    lines = [{"item_id": "marg", "quantity": 1, "addons": ["cheese"]}]
+    assert quote([CHEESE, PIZZA_OFF], lines)["total"] == 350 - 70
+
+
+def test_every_unit_in_a_combo_leaves_nothing_to_discount():
+    lines = [{"item_id": item, "quantity": 1} for item in ("pep", "bread", "cola")]
+    result = quote([COMBO, PIZZA_OFF], lines)
+    assert [a["rule_id"] for a in result["adjustments"]] == ["meal"]
+
+
+def test_discount_needs_its_code_and_minimum():
+    coded = {"id": "vip", "kind": "discount", "name": "VIP", "amount_off": 50, "code": "VIP", "min_subtotal": 500}
+    lines = [{"item_id": "pep", "quantity": 1}]
+    assert quote([coded], lines, "vip")["total"] == 400
+    lines = [{"item_id": "pep", "quantity": 2}]
+    assert quote([coded], lines)["total"] == 800
+    assert quote([coded], lines, " vip ")["total"] == 750
+
+
+def test_minimum_is_checked_after_combos():
+    party = {"id": "party", "kind": "discount", "name": "Party", "percent": 10, "min_subtotal": 500}
+    lines = [{"item_id": item, "quantity": 1} for item in ("pep", "bread", "cola")]
+    # 560 before the meal, 400 after it
+    assert quote([COMBO, party], lines)["total"] == 400
+
+
+def test_best_discount_wins_and_never_exceeds_the_eligible_amount():
+    flat = {"id": "flat", "kind": "discount", "name": "Rs 500 off", "amount_off": 500, "categories": ["drinks"]}
+    lines = [{"item_id": "pep", "quantity": 1}, {"item_id": "cola", "quantity": 1}]
+    result = quote([flat, PIZZA_OFF], lines)
+    assert result["adjustments"] == [{"rule_id": "pizza-20", "name": "20% off pizza", "times": 1, "amount": -80.0}]
+    result = quote([flat], lines)
+    assert result["adjustments"][0]["amount"] == -60.0
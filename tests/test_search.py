@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from content_cache import ContentCache
+from routes_content import make_router
+from search import SearchIndex
+from seed import seed_if_empty
+
+
+def test_rebuilt_kind_replaces_the_old_one():
+    index = SearchIndex()
+    index.upsert("menu_item", {"id": "1", "name": "Truffle pizza"})
+    index.swap_kind("menu_item", SearchIndex.build_kind("menu_item", [{"id": "2", "name": "Pesto pizza"}]))
+    assert [hit["id"] for hit in index.search("pizza")] == ["2"]
+
+
+def test_stale_index_keeps_serving_while_it_rebuilds(db):
+    async def run():
+        await seed_if_empty(db)
+        cache = ContentCache()
+        app = FastAPI()
+        app.include_router(make_router(db, cache), prefix="/api")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            async def ids(q):
+                response = await client.get("/api/search", params={"q": q, "kind": "menu_item"})
+                return [hit["id"] for hit in response.json()["items"]]
+
+            # The first build is waited for
+            assert await ids("margherita")
+
+            doc = {"id": "new", "name": "Zucchini special", "price": 1, "category": "classic", "img": "", "desc": ""}
+            await db.menu_items.insert_one({**doc, "location_id": "main"})
+            cache.bump("menu_items", partition="main")
+            # Answered from the old index; the rebuild runs in the background
+            assert await ids("zucchini") == []
+            for _ in range(100):
+                if await ids("zucchini") == ["new"]:
+                    break
+                await asyncio.sleep(0.01)
+            else:
+                raise AssertionError("the index was never rebuilt")
+
+    asyncio.run(run())
+
+
+def test_new_review_is_searchable_at_once(db):
+    async def run():
+        await seed_if_empty(db)
+        app = FastAPI()
+        app.include_router(make_router(db, admin_token="s3cret"), prefix="/api")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.get("/api/search", params={"q": "pizza"})).status_code == 200
+            review = {"name": "Ravi", "rating": 5, "text": "Best quattro formaggi in town"}
+            admin = {"Authorization": "Bearer s3cret"}
+            assert (await client.post("/api/reviews", json=review, headers=admin)).status_code == 200
+            response = await client.get("/api/search", params={"q": "formaggi", "kind": "review"})
+            assert [hit["doc"]["name"] for hit in response.json()["items"]] == ["Ravi"]
+
+    asyncio.run(run())
@@ -0,0 +1,55 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import seed
+from seed import seed_if_empty, synthetic_documents
+
+
+def test_upgrade_backfills_timeline_ids_and_booking_ts_in_bulk(db, monkeypatch):
+    monkeypatch.setattr(seed, "BACKFILL_BATCH", 7)
+
+    async def run():
+        await db.timeline.insert_many([{"year": 2000 + i, "title": "t", "location_id": "main"} for i in range(20)])
+        await db.bookings.insert_many([{"name": f"b{i}", "location_id": "main"} for i in range(20)])
+        await db.seed_meta.insert_one({"_id": "version", "version": 3})
+        await seed_if_empty(db)
+
+        ids = [doc["id"] async for doc in db.timeline.find({}, {"id": 1})]
+        assert len(ids) == 20 and len(set(ids)) == 20
+        assert await db.bookings.count_documents({"ts": {"$exists": False}}) == 0
+        assert await db.seed_meta.find_one({"_id": "lock"}) is None
+
+    asyncio.run(run())
+
+
+def test_seed_lock_lease_is_renewed_until_lost(db, monkeypatch):
+    monkeypatch.setattr(seed, "SEED_LOCK_RENEW", 0.01)
+
+    async def run():
+        await db.seed_meta.insert_one({"_id": "lock", "owner": "me", "expires_at": time.time()})
+        renewal = asyncio.ensure_future(seed._renew_seed_lock(db, "me"))
+        await asyncio.sleep(0.05)
+        lock = await db.seed_meta.find_one({"_id": "lock"})
+        assert lock["expires_at"] > time.time() + seed.SEED_LOCK_TTL / 2
+
+        await db.seed_meta.replace_one({"_id": "lock"}, {"owner": "someone-else", "expires_at": 0})
+        await asyncio.wait_for(renewal, 1)
+        assert (await db.seed_meta.find_one({"_id": "lock"}))["owner"] == "someone-else"
+
+    asyncio.run(run())
+
+
+def test_synthetic_timestamps_are_recent():
+    checks = list(synthetic_documents("status_checks", 1000))
+    messages = list(synthetic_documents("contact_messages", 1000))
+    now = datetime.utcnow()
+    assert all(now - timedelta(hours=9) < doc["timestamp"] <= now for doc in checks)
+    assert all(now - timedelta(days=366) < doc["ts"] <= now for doc in messages)
+    assert [doc["id"] for doc in synthetic_documents("status_checks", 10)] == [doc["id"] for doc in checks[:10]]
+
+
+def test_synthetic_start_can_be_pinned():
+    start = datetime(2025, 1, 1)
+    first = next(iter(synthetic_documents("status_checks", 5, start=start)))
+    assert start <= first["timestamp"] < start + timedelta(seconds=6)
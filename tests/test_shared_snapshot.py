@@ -0,0 +1,71 @@
+import asyncio
+import os
+
+import snapshot as snapshot_module
+from content_cache import ContentCache
+from routes_content import make_router
+from seed import seed_if_empty
+from shared_snapshot import SharedSnapshotStore
+
+
+def test_publish_compresses_only_changed_sections(db, tmp_path, monkeypatch):
+    async def run():
+        await seed_if_empty(db)
+        cache = ContentCache()
+        store = SharedSnapshotStore(str(tmp_path / "content.snap"))
+        make_router(db, cache, shared=store)
+        await store.publish()
+        first = store.get("menu_items")
+
+        compressed = []
+        real = snapshot_module.Snapshot.__init__
+
+        def counting(self, body, media_type="application/json", best=False):
+            compressed.append(body[:20])
+            real(self, body, media_type, best)
+
+        monkeypatch.setattr(snapshot_module.Snapshot, "__init__", counting)
+        await store.publish()
+        assert compressed == [] and store.published == 1
+
+        await db.specials.update_one({"location_id": "main"}, {"$set": {"price": 1.5}})
+        await store.publish()
+        assert len(compressed) == 1 and store.published == 2
+        assert store.get("menu_items").etag == first.etag
+        assert b"1.5" in bytes(store.get("specials").body)
+
+    asyncio.run(run())
+
+
+def test_reads_do_not_stat_on_every_request(db, tmp_path, monkeypatch):
+    async def run():
+        await seed_if_empty(db)
+        store = SharedSnapshotStore(str(tmp_path / "content.snap"), poll=60)
+        make_router(db, ContentCache(), shared=store)
+        await store.publish()
+
+        calls = []
+        real_stat = os.stat
+        monkeypatch.setattr(os, "stat", lambda *a, **k: calls.append(a) or real_stat(*a, **k))
+        for _ in range(100):
+            store.get("menu_items")
+        assert calls == []
+
+    asyncio.run(run())
+
+
+def test_remap_leaves_other_locations_warm(db, tmp_path):
+    async def run():
+        await seed_if_empty(db)
+        cache = ContentCache()
+        store = SharedSnapshotStore(str(tmp_path / "content.snap"))
+        make_router(db, cache, shared=store)
+        await store.publish()
+        before = cache.version("menu_items", "uptown")
+
+        await db.menu_items.update_one({"location_id": "main"}, {"$set": {"price": 99.0}})
+        await store.publish(["menu_items"])
+        assert cache.version("menu_items", "uptown") == before
+        assert cache.version("menu_items", "main") > before
+
+    asyncio.run(run())
@@ -0,0 +1,41 @@
+import asyncio
+import gzip
+import json
+
+import brotli
+
+from snapshot import UPGRADE_MIN_BYTES, Snapshot, _upgrader
+
+
+def body(n=2000):
+    return json.dumps({"items": [{"id": str(i), "desc": "tomato basil mozzarella " * 3} for i in range(n)]}).encode()
+
+
+def test_variants_decode_to_the_body():
+    data = body()
+    snap = Snapshot(data)
+    assert gzip.decompress(snap.gzip) == data
+    assert brotli.decompress(snap.br) == data
+    assert snap.etag == Snapshot(data).etag
+
+
+def test_small_bodies_skip_compression():
+    snap = Snapshot(b'{"a":1}')
+    assert snap.gzip is None and snap.br is None
+
+
+def test_upgrade_runs_off_the_event_loop():
+    data = body()
+    assert len(data) >= UPGRADE_MIN_BYTES
+
+    async def run():
+        snap = Snapshot(data)
+        fast, etag = len(snap.br), snap.etag
+        # The recompression is queued on the background thread; wait for it to drain
+        await asyncio.get_running_loop().run_in_executor(_upgrader, lambda: None)
+        return snap, fast, etag
+
+    snap, fast, etag = asyncio.run(run())
+    assert len(snap.br) < fast
+    assert snap.etag == etag
+    assert brotli.decompress(snap.br) == data
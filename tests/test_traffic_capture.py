@@ -0,0 +1,64 @@
+import asyncio
+import random
+from datetime import datetime
+
+import httpx
+from fastapi import FastAPI
+
+from backend_replay import load_traces, parse_window, plan_poisson, window_occurrence
+from traffic_capture import CaptureMiddleware, TrafficRecorder, expand_shape, read_capture
+
+
+def capture(tmp_path, *requests):
+    app = FastAPI()
+
+    @app.get("/api/search")
+    async def search(q: str, limit: int = 10):
+        return {"items": []}
+
+    @app.post("/api/bookings")
+    async def book(payload: dict):
+        return {"status": "received"}
+
+    recorder = TrafficRecorder(str(tmp_path / "capture-{pid}.ndjson"), sample=1)
+
+    async def run():
+        transport = httpx.ASGITransport(app=CaptureMiddleware(app, recorder))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for method, path, kwargs in requests:
+                await client.request(method, path, **kwargs)
+        await recorder.stop()
+
+    asyncio.run(run())
+    return recorder.path
+
+
+def test_queries_and_bodies_are_recorded_as_shapes(tmp_path):
+    path = capture(
+        tmp_path,
+        ("GET", "/api/search", {"params": {"q": "asha's order", "limit": 5, "after": "cursor"}}),
+        ("POST", "/api/bookings", {"json": {"name": "Asha", "party_size": 4, "when": "2030-01-01T19:00"}}),
+    )
+    # Written as gzip even though the name doesn't say so
+    assert open(path, "rb").read(2) == b"\x1f\x8b"
+    records = [entry for _, entry in read_capture([path])]
+    assert records[0]["q"] == [["q", "~12"], ["limit", "5"]]
+    assert records[1]["b"] == {"name": "~4", "party_size": 4, "when": "2030-01-01T19:00"}
+    assert "Asha" not in open(path, "rb").read().decode("latin-1")
+    assert expand_shape(records[1]["b"])["name"] == "xxxx"
+
+
+def test_replay_weights_records_by_their_sample_rate(tmp_path):
+    path = capture(tmp_path, *[("GET", "/api/search", {"params": {"q": "pizza"}})] * 4)
+    segments, skipped = load_traces([path], None, None, [])
+    records = segments[0][1]
+    assert len(records) == 4 and not skipped
+    assert all(entry["w"] == 1 for entry in records)
+    plan = plan_poisson(segments, rate=100, duration=1, rng=random.Random(0))
+    assert 50 < len(plan) < 150 and all(0 <= offset < 1 for offset, _ in plan)
+
+
+def test_window_past_midnight_belongs_to_the_day_it_opened():
+    window = parse_window("fri 23:00-01:00")
+    assert window_occurrence(datetime(2026, 10, 17, 0, 30), window) == datetime(2026, 10, 16).date()
+    assert window_occurrence(datetime(2026, 10, 17, 23, 30), window) is None
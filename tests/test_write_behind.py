@@ -0,0 +1,88 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from pymongo.errors import DuplicateKeyError
+
+from routes_content import make_router
+from write_behind import DURABILITY_ENQUEUE, WriteBehindQueue
+
+
+class Broken:
+    def __getitem__(self, name):
+        return self
+
+    async def insert_many(self, docs, ordered=True):
+        raise ConnectionError("mongo went away")
+
+
+def post(db, writer, path, body):
+    async def run():
+        app = FastAPI()
+        app.include_router(make_router(db, writer=writer), prefix="/api")
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, json=body)
+
+    return asyncio.run(run())
+
+
+def test_one_bad_document_fails_only_its_own_write(db):
+    async def run():
+        await db.bookings.create_index("id", unique=True)
+        await db.bookings.insert_one({"id": "taken"})
+        queue = WriteBehindQueue(db, max_delay=0.05)
+        queue.start()
+        results = await asyncio.gather(
+            *(queue.submit("bookings", {"id": id_}) for id_ in ("a", "taken", "b")),
+            return_exceptions=True,
+        )
+        await queue.close()
+
+        assert results[0] is None and results[2] is None
+        assert isinstance(results[1], DuplicateKeyError)
+        assert await db.bookings.count_documents({}) == 3
+        assert queue.stats()["batches"] == 1
+        assert (queue.written, queue.failed) == (2, 1)
+
+    asyncio.run(run())
+
+
+def test_failed_batch_fails_every_write(db):
+    async def run():
+        queue = WriteBehindQueue(Broken())
+        queue.start()
+        with pytest.raises(ConnectionError):
+            await queue.submit("bookings", {"id": "a"})
+        await queue.close()
+        assert queue.failed == 1
+
+    asyncio.run(run())
+
+
+def test_closed_queue_is_503(db):
+    async def closed():
+        queue = WriteBehindQueue(db)
+        queue.start()
+        await queue.close()
+        return queue
+
+    response = post(db, asyncio.run(closed()), "/api/contact-messages", {"name": "A", "email": "a@b.c", "message": "hi"})
+    assert response.status_code == 503 and response.headers["retry-after"] == "1"
+
+
+def test_seated_booking_waits_for_its_flush_even_under_enqueue(db):
+    when = (datetime.now() + timedelta(days=2)).replace(hour=19, minute=0, second=0, microsecond=0)
+
+    async def writer():
+        queue = WriteBehindQueue(Broken(), durability=DURABILITY_ENQUEUE)
+        queue.start()
+        return queue
+
+    response = post(db, asyncio.run(writer()), "/api/bookings", {"name": "Asha", "party_size": 4, "when": f"{when:%Y-%m-%dT%H:%M}"})
+    assert response.status_code == 500
+    # The failed write handed its seats back
+    slots = asyncio.run(db.booking_slots.find({}).to_list(None))
+    assert slots and all(s["remaining"] == s["capacity"] for s in slots)